@@ -1,206 +1,1063 @@
-import tensorflow as tf
 import numpy as np
 from PIL import Image
-from model_utils import preprocess_image, enhanced_preprocess_image, assess_image_quality, map_imagenet_to_animals
+from model_utils import (
+    ImageContext, QUALITY_REJECT_THRESHOLD,
+    preprocess_image, enhanced_preprocess_image, assess_image_quality,
+    preprocess_tta_view, TTA_VIEWS,
+    map_imagenet_to_animals, map_imagenet_to_animals_batch,
+    BovineKeywordMatcher, load_imagenet_class_names
+)
+from tflite_backend import (
+    TFLiteBackend, QUANTIZATION_MODES, convert_model, with_embedding_output,
+    calibration_images, calibration_fingerprint
+)
+from embedding_index import EmbeddingIndex, EMBEDDING_DIM, normalize
+from animal_head import LinearHead, NOT_ANIMAL_LABEL
+from model_store import ModelStore, DEFAULT_STORE_DIR, OFFLINE_DEFAULT
+from result_cache import ResultCache
+from metrics import timed, count_outcome, count_error
+from prediction_result import PredictionResult
+from dataclasses import replace
+import hashlib
+import threading
+import time
 import logging
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+# Part of every result cache key; bump when a pipeline change alters results
+PIPELINE_VERSION = 1
+
+# Shape of one preprocessed image as the model takes it
+MODEL_INPUT_SHAPE = (224, 224, 3)
+
+# Preprocessing variants of the ensemble, in batch order
+ENSEMBLE_VARIANTS = ('enhanced', 'standard')
+
+# Smoothing factor of the running stage-cost estimates used to size TTA
+COST_SMOOTHING = 0.2
+
+def parse_tta(value):
+    """Parse a --tta command-line value: a view count or 'auto'"""
+    if value == 'auto':
+        return value
+    count = int(value)
+    if count < 0:
+        raise ValueError("tta must not be negative")
+    return count
+
+def _smoothed(previous, sample):
+    """Exponentially weighted running average"""
+    return sample if previous is None else previous + COST_SMOOTHING * (sample - previous)
+
 class AnimalClassifier:
     """
     Animal classification using pre-trained MobileNetV2 model
+    
+    TensorFlow is only imported when the model is loaded, so importing this
+    module is cheap.
     """
     
-    def __init__(self):
-        """Initialize the classifier with pre-trained model"""
+    BACKENDS = ('keras', 'tflite')
+    
+    def __init__(self, weights='imagenet', backend='keras', quantization=None, num_threads=None,
+                 store_dir=DEFAULT_STORE_DIR, offline=OFFLINE_DEFAULT, result_cache_size=1024,
+                 background=False, tta=0, tta_budget_ms=None, near_duplicate_threshold=None,
+                 near_duplicate_cache_size=1024, head=None, calibration_dir=None):
+        """
+        Initialize the classifier with pre-trained model
+        
+        Args:
+            weights: 'imagenet', a path to a weights file, or None for random
+                initialization (useful for offline benchmarking)
+            backend: 'keras' for the traced TensorFlow model or 'tflite' for
+                the TFLite interpreter
+            quantization: TFLite only - None, 'dynamic' or 'int8'
+            num_threads: TFLite only - interpreter thread count
+            store_dir: Directory of the persistent model store, or None to
+                always build the model from scratch
+            offline: If True, never download weights; the model must already
+                be in the store (or weights must be a local file)
+            result_cache_size: Number of prediction results kept in the
+                in-memory LRU cache, or 0 to disable it
+            background: If True, return immediately and load and warm up the
+                model on a background thread; is_ready() turns True when done
+                and load_error is set if loading fails
+            tta: Extra test-time augmentation views per image (the first
+                ``tta`` of model_utils.TTA_VIEWS), or 'auto' to use as many
+                as fit in tta_budget_ms
+            tta_budget_ms: Per-image latency budget for tta='auto'
+            near_duplicate_threshold: Cosine similarity of pooled embeddings
+                above which predict returns the result of an earlier image
+                instead of running the full ensemble, or None to disable
+            near_duplicate_cache_size: Number of recent embeddings kept for
+                near-duplicate lookups
+            head: Trained animal_head.LinearHead, or a path to one, to
+                classify from the pooled embeddings instead of mapping
+                ImageNet classes; only the standard variant (and any
+                test-time views) then runs
+            calibration_dir: TFLite int8 only - directory of sample photos to
+                calibrate activation ranges on, or None for the bundled
+                attached_assets
+        """
+        if backend not in self.BACKENDS:
+            raise ValueError(f"Unknown backend: {backend}")
+        if quantization not in QUANTIZATION_MODES:
+            raise ValueError(f"Unknown quantization mode: {quantization}")
+        if quantization is not None and backend != 'tflite':
+            raise ValueError("Quantization requires the 'tflite' backend")
+        if calibration_dir is not None and quantization != 'int8':
+            raise ValueError("calibration_dir only applies to int8 quantization")
+        if tta != 'auto' and not (isinstance(tta, int) and tta >= 0):
+            raise ValueError(f"tta must be a non-negative view count or 'auto', not {tta!r}")
+        if near_duplicate_threshold is not None and not 0 < near_duplicate_threshold <= 1:
+            raise ValueError("near_duplicate_threshold must be in (0, 1]")
+        
         self.model = None
-        self.load_model()
+        self.weights = weights
+        self.backend = backend
+        self.quantization = quantization
+        self.calibration_dir = calibration_dir
+        # Content hash of the int8 calibration photos, keying stored models
+        # and caches so a new calibration set never reuses an old conversion
+        self.calibration = None
+        if quantization == 'int8':
+            self.calibration = calibration_fingerprint(calibration_images(calibration_dir))
+            logger.warning("int8 agreement with the float model has not been measured on real photos; "
+                           "run `benchmark.py agreement --imagenet --quantization int8` before serving it")
+        self.num_threads = num_threads
+        self.offline = offline
+        self.store = ModelStore(store_dir, offline=offline) if store_dir else None
+        self.result_cache = ResultCache(result_cache_size) if result_cache_size else None
+        self._weights_key = None
+        self._inference_fn = None
+        self._tflite = None
+        self.class_names = None
+        self._bovine_matcher = None
+        self.load_error = None
+        self._ready = threading.Event()
+        self._loader = None
+        self.tta = tta
+        self.tta_budget_ms = tta_budget_ms
+        self.near_duplicate_threshold = near_duplicate_threshold
+        self.embedding_index = None
+        if near_duplicate_threshold is not None:
+            self.embedding_index = EmbeddingIndex(max_entries=near_duplicate_cache_size)
+        self.head = LinearHead.load(head) if isinstance(head, str) else head
+        self._variants = ('standard',) if self.head is not None else ENSEMBLE_VARIANTS
+        
+        # Running per-image cost estimates (seconds) for sizing TTA to a budget
+        self._row_seconds = None
+        self._view_seconds = None
+        self._base_seconds = None
+        
+        if background:
+            self._loader = threading.Thread(
+                target=self._load_in_background, name='model-loader', daemon=True
+            )
+            self._loader.start()
+        else:
+            self.load_model()
     
     def load_model(self):
-        """Load the pre-trained MobileNetV2 model"""
+        """
+        Load the pre-trained MobileNetV2 model
+        
+        Ready-to-serve artifacts are read from the model store when present and
+        written to it after a fresh build, so only the first start pays for
+        downloading weights or converting to TFLite.
+        """
         try:
             logger.info("Loading MobileNetV2 model...")
+            start = time.perf_counter()
             
-            # Load pre-trained MobileNetV2 model with ImageNet weights
-            self.model = tf.keras.applications.MobileNetV2(
-                weights='imagenet',
-                include_top=True,
-                input_shape=(224, 224, 3)
-            )
+            artifact_key = None
+            self._weights_key = self._weights_cache_key()
+            if self.store is not None and self._weights_key is not None:
+                artifact_key = self.store.artifact_key(self._weights_key)
+            
+            if self.backend == 'tflite':
+                tflite_name = f"model_{self.quantization or 'float32'}_features.tflite"
+                if self.calibration is not None:
+                    tflite_name = f"model_int8_{self.calibration}_features.tflite"
+                model_content = None
+                source = "model store"
+                if artifact_key:
+                    model_content = self.store.read_bytes(artifact_key, tflite_name)
+                if model_content is None:
+                    source = f"converted from {self._load_keras_model(artifact_key)} model"
+                    model_content = convert_model(with_embedding_output(self.model), self.quantization,
+                                                  calibration_dir=self.calibration_dir)
+                    if artifact_key:
+                        self.store.write_bytes(artifact_key, tflite_name, model_content)
+                self._tflite = TFLiteBackend(model_content, num_threads=self.num_threads)
+                
+                # Warm up at the single-image ensemble batch size
+                self._tflite.run(np.zeros((2, 224, 224, 3), dtype=np.float32))
+            else:
+                source = self._load_keras_model(artifact_key)
+                self._build_inference_fn()
+            
+            # Load the bundled class index and match the bovine keywords
+            # against all class names once, up front
+            self.class_names = load_imagenet_class_names()
+            self._bovine_matcher = BovineKeywordMatcher(self.class_names)
+            self._ready.set()
             
-            logger.info("Model loaded successfully!")
+            logger.info(f"Model loaded successfully in {time.perf_counter() - start:.2f}s "
+                        f"(backend: {self.backend}, source: {source})")
             
         except Exception as e:
             logger.error(f"Error loading model: {str(e)}")
             raise Exception(f"Failed to load model: {str(e)}")
     
-    def predict(self, image, debug_mode=False):
+    def _load_in_background(self):
+        """Thread target for background loading; failures end up in load_error"""
+        try:
+            self.load_model()
+        except Exception as e:
+            self.load_error = str(e)
+    
+    def wait_until_ready(self, timeout=None):
+        """
+        Block until the model has loaded (or failed to)
+        
+        Args:
+            timeout: Maximum seconds to wait, or None to wait indefinitely
+        
+        Returns:
+            bool: True if the model is ready
+        """
+        if self._loader is not None:
+            self._loader.join(timeout)
+        return self.is_ready()
+    
+    def _load_keras_model(self, artifact_key):
+        """
+        Set self.model from the model store, or build it and store it
+        
+        Args:
+            artifact_key: Model store key, or None to bypass the store
+        
+        Returns:
+            str: Where the model came from, for startup logging
+        """
+        if artifact_key:
+            model = self.store.load_keras_model(artifact_key)
+            if model is not None:
+                self.model = model
+                return "model store"
+        
+        # Building with ImageNet weights would download them
+        if self.offline and self.weights == 'imagenet':
+            if artifact_key:
+                raise Exception(
+                    f"Model '{artifact_key}' is not in the model store at "
+                    f"{self.store.directory} and offline mode is enabled"
+                )
+            raise Exception("ImageNet weights need a download or a model store, and offline mode is enabled")
+        
+        import tensorflow as tf
+        
+        # Load pre-trained MobileNetV2 model with ImageNet weights
+        self.model = tf.keras.applications.MobileNetV2(
+            weights=self.weights,
+            include_top=True,
+            input_shape=(224, 224, 3)
+        )
+        
+        if artifact_key:
+            self.store.save_keras_model(artifact_key, self.model)
+        return "built"
+    
+    def _weights_cache_key(self):
+        """
+        Identify the loaded weights for on-disk caches of derived models
+        
+        Returns:
+            str or None: Cache key, or None for random weights which must
+                never be cached
+        """
+        if self.weights is None:
+            return None
+        if self.weights == 'imagenet':
+            return 'mobilenet_v2_imagenet'
+        
+        digest = hashlib.sha256()
+        with open(self.weights, 'rb') as f:
+            for chunk in iter(lambda: f.read(1 << 20), b''):
+                digest.update(chunk)
+        return f"mobilenet_v2_{digest.hexdigest()[:16]}"
+    
+    def _build_inference_fn(self):
+        """
+        Trace a tf.function over the model with a fixed input signature
+        
+        Keras ``model.predict`` sets up a data adapter and loop machinery on
+        every call, which dominates the cost of small batches. The traced
+        function calls the model directly in inference mode; a dynamic batch
+        dimension keeps it to a single trace for every batch size.
+        
+        The model runs as its backbone followed by its classifier head, so the
+        pooled features come out of the same forward pass as the predictions.
+        """
+        import tensorflow as tf
+        
+        head = self.model.get_layer('predictions')
+        backbone = tf.keras.Model(self.model.input, head.input)
+        
+        @tf.function(input_signature=[tf.TensorSpec(shape=(None, 224, 224, 3), dtype=tf.float32)])
+        def inference_fn(batch):
+            features = backbone(batch, training=False)
+            return head(features), features
+        
+        # Warm up once so the first real request doesn't pay for tracing
+        inference_fn(tf.zeros((2, 224, 224, 3), dtype=tf.float32))
+        self._inference_fn = inference_fn
+    
+    def run_model(self, batch):
+        """
+        Run one forward pass over a preprocessed batch
+        
+        Args:
+            batch: Array of shape (N, 224, 224, 3) scaled to [-1, 1]
+        
+        Returns:
+            np.ndarray: Softmax predictions of shape (N, 1000)
+        """
+        return self.run_model_with_embeddings(batch)[0]
+    
+    @timed('inference')
+    def run_model_with_embeddings(self, batch):
+        """
+        Run one forward pass, also returning the pooled MobileNetV2 features
+        (the input of the classifier head)
+        
+        Args:
+            batch: Array of shape (N, 224, 224, 3) scaled to [-1, 1]
+        
+        Returns:
+            tuple: (softmax predictions of shape (N, 1000), unnormalized
+                embeddings of shape (N, 1280))
+        """
+        start = time.perf_counter()
+        if self._tflite is not None:
+            predictions, embeddings = self._tflite.run_with_embeddings(batch)
+        elif self._inference_fn is None:
+            raise Exception("Model not loaded")
+        else:
+            import tensorflow as tf
+            predictions, embeddings = self._inference_fn(tf.convert_to_tensor(batch, dtype=tf.float32))
+            predictions, embeddings = predictions.numpy(), embeddings.numpy()
+        
+        self._row_seconds = _smoothed(self._row_seconds, (time.perf_counter() - start) / len(batch))
+        return predictions, embeddings
+    
+    def embed(self, images, batch_size=32, errors=None):
+        """
+        Compute the L2-normalized pooled embedding of each image, e.g. to
+        index or dedupe an archive
+        
+        Only the standard preprocessing variant runs, with no quality check
+        and no classification.
+        
+        Args:
+            images: Iterable of PIL Image objects or ImageContexts
+            batch_size: Maximum number of images per forward pass
+            errors: Optional dict; if given, an image that fails to decode
+                or preprocess is recorded in it as {input index: exception}
+                and gets a zero row instead of aborting the whole call
+        
+        Returns:
+            np.ndarray: float32 embeddings of shape (N, 1280), in input order
+        """
+        if batch_size < 1:
+            raise ValueError("batch_size must be at least 1")
+        if not self.is_ready():
+            raise Exception(self._not_ready_message())
+        
+        images = list(images)
+        embeddings = np.zeros((len(images), EMBEDDING_DIM), dtype=np.float32)
+        buffer = np.empty((min(batch_size, len(images)),) + MODEL_INPUT_SHAPE, dtype=np.float32)
+        for start in range(0, len(images), batch_size):
+            rows = []
+            for i in range(start, min(start + batch_size, len(images))):
+                try:
+                    preprocess_image(ImageContext.of(images[i]), out=buffer[len(rows)])
+                except Exception as e:
+                    if errors is None:
+                        raise
+                    errors[i] = e
+                    continue
+                rows.append(i)
+            if rows:
+                embeddings[rows] = normalize(self.run_model_with_embeddings(buffer[:len(rows)])[1])
+        return embeddings
+    
+    def feature_signature(self):
+        """
+        Identify what computes this classifier's embeddings, for on-disk
+        caches of them
+        
+        Returns:
+            dict: Preprocessing version, weights key (None for random
+                weights), backend, quantization and int8 calibration set
+        """
+        return {"pipeline": PIPELINE_VERSION, "weights": self._weights_key, "backend": self.backend,
+                "quantization": self.quantization, "calibration": self.calibration}
+    
+    def tta_view_count(self, tta=None, budget_ms=None):
+        """
+        Number of extra test-time views a prediction will use
+        
+        With 'auto', the count is whatever fits the latency budget according
+        to running estimates of the cost of a plain prediction and of one
+        extra view (its crop and resize plus one more row of inference).
+        Until a prediction has been timed no extra views are used.
+        
+        Args:
+            tta: View count, 'auto', or None for the classifier's default
+            budget_ms: Budget for 'auto', or None for tta_budget_ms
+        
+        Returns:
+            int: Number of views, at most len(TTA_VIEWS)
+        """
+        tta = self.tta if tta is None else tta
+        if tta != 'auto':
+            return max(0, min(int(tta), len(TTA_VIEWS)))
+        
+        budget_ms = self.tta_budget_ms if budget_ms is None else budget_ms
+        if budget_ms is None or self._base_seconds is None or self._row_seconds is None:
+            return 0
+        spare = budget_ms / 1000.0 - self._base_seconds
+        per_view = self._row_seconds + (self._view_seconds or 0.0)
+        return max(0, min(int(spare / per_view), len(TTA_VIEWS)))
+    
+    def _update_costs(self, timings, views):
+        """Fold one prediction's stage timings into the running cost estimates"""
+        if 'inference' not in timings:
+            return
+        base_inference = timings['inference'] * len(self._variants) / (len(self._variants) + views)
+        self._base_seconds = _smoothed(self._base_seconds, base_inference + sum(
+            timings.get(stage, 0.0) for stage in ('quality', 'preprocess', 'interpret')
+        ))
+        if views:
+            self._view_seconds = _smoothed(self._view_seconds, timings['preprocess_tta'] / views)
+    
+    @timed('predict')
+    def predict(self, image, content_hash=None, tta=None, tta_budget_ms=None):
         """
         Predict the animal in the given image
         
         Args:
-            image: PIL Image object
-            debug_mode: If True, includes raw ImageNet predictions for debugging
+            image: PIL Image object or ImageContext
+            content_hash: Optional hash of the encoded upload; when given, the
+                result cache is checked without decoding the image at all
+            tta: Extra test-time views (count or 'auto'); None uses the
+                classifier's default. All views share one forward pass
+            tta_budget_ms: Latency budget for tta='auto'; None uses the
+                classifier's default
         
         Returns:
-            tuple: (predicted_animal, confidence_percentage, top_predictions_list)
+            PredictionResult: label, confidence, top predictions, quality and
+                per-stage timings; raw ImageNet predictions on demand
         """
+        timings = {}
         try:
-            if self.model is None:
-                raise Exception("Model not loaded")
-            
-            # Assess image quality first
-            quality_score, quality_issues = assess_image_quality(image)
+            if not self.is_ready():
+                raise Exception(self._not_ready_message())
             
-            # Reject very poor quality images
-            if quality_score < 40:
-                logger.warning(f"Poor image quality detected: {quality_issues}")
-                if debug_mode:
-                    return f"Poor image quality: {', '.join(quality_issues)}", 0, [], []
-                else:
-                    return f"Poor image quality: {', '.join(quality_issues)}", 0, []
+            # Decode once; quality and both preprocessors share the result
+            context = ImageContext.of(image)
+            views = TTA_VIEWS[:self.tta_view_count(tta, tta_budget_ms)]
             
-            # Use enhanced preprocessing for better results
-            processed_image = enhanced_preprocess_image(image)
+            # Repeat requests for the same pixels are served from the cache
+            cache_key = self._result_cache_key(context, content_hash, len(views))
+            if cache_key is not None:
+                cached = self.result_cache.get(cache_key)
+                if cached is not None:
+                    count_outcome('cached')
+                    return replace(cached, cached=True, timings={})
             
-            # Also get standard preprocessing for ensemble approach
-            processed_image_standard = preprocess_image(image)
-            
-            # Make predictions using ensemble approach
-            predictions_enhanced = self.model.predict(processed_image, verbose=0)
-            predictions_standard = self.model.predict(processed_image_standard, verbose=0)
+            # Assess image quality first
+            start = time.perf_counter()
+            quality_score, quality_issues = assess_image_quality(context)
+            timings['quality'] = time.perf_counter() - start
             
-            # Combine predictions for better accuracy (weighted average)
-            # Enhanced preprocessing gets more weight if quality is good
-            weight_enhanced = min(quality_score / 100.0, 0.8)  # Cap at 80%
-            weight_standard = 1.0 - weight_enhanced
+            # Reject very poor quality images
+            if quality_score < QUALITY_REJECT_THRESHOLD:
+                result = self._poor_quality_result(quality_issues, quality_score)
+            elif self.embedding_index is not None:
+                result = self._predict_or_reuse(context, views, quality_score, quality_issues, timings)
+            else:
+                # Make predictions using ensemble approach: the preprocessing
+                # variants, plus any test-time views, go through the network
+                # in a single batched forward pass
+                variants = len(self._variants)
+                ensemble_batch = np.empty((variants + len(views), 1) + MODEL_INPUT_SHAPE, dtype=np.float32)
+                start = time.perf_counter()
+                self._build_ensemble_batch([context], out=ensemble_batch[:variants])
+                timings['preprocess'] = time.perf_counter() - start
+                if views:
+                    start = time.perf_counter()
+                    self._build_tta_views([context], views, out=ensemble_batch[variants:])
+                    timings['preprocess_tta'] = time.perf_counter() - start
+                
+                start = time.perf_counter()
+                batch_predictions, batch_embeddings = self.run_model_with_embeddings(
+                    ensemble_batch.reshape((-1,) + MODEL_INPUT_SHAPE)
+                )
+                timings['inference'] = time.perf_counter() - start
+                
+                result = self._interpret_ensemble(
+                    batch_predictions, batch_embeddings, quality_score, quality_issues, timings
+                )
+                self._update_costs(timings, len(views))
             
-            predictions = (weight_enhanced * predictions_enhanced + 
-                          weight_standard * predictions_standard)
+            result.timings = timings
+            if cache_key is not None:
+                self.result_cache.put(cache_key, result)
+            return result
             
-            # If debug mode, get raw ImageNet predictions
-            raw_predictions = []
-            if debug_mode:
-                # Get top 10 raw ImageNet predictions for debugging
-                decoded = tf.keras.applications.imagenet_utils.decode_predictions(
-                    predictions, top=10
-                )[0]
-                raw_predictions = [(pred[1].replace('_', ' ').title(), pred[2] * 100) for pred in decoded]
+        except Exception as e:
+            logger.error(f"Error during prediction: {str(e)}")
+            result = self._error_result(e, stage='predict')
+            result.timings = timings
+            return result
+    
+    def _predict_or_reuse(self, context, views, quality_score, quality_issues, timings):
+        """
+        Classify an accepted image, reusing the result of a near-duplicate
+        seen earlier when there is one
+        
+        The standard variant runs on its own first; its embedding is looked
+        up in the embedding index, and only on a miss are the other variants
+        and any test-time views preprocessed and run.
+        
+        Args:
+            context: ImageContext of the image
+            views: Names of the test-time views to use
+            quality_score: Image quality score from assess_image_quality
+            quality_issues: Quality issues from assess_image_quality
+            timings: Dict of stage timings to add to
+        
+        Returns:
+            PredictionResult, with ``similarity`` set when it was reused
+        """
+        variants = len(self._variants)
+        standard = self._variants.index('standard')
+        ensemble_batch = np.empty((variants + len(views), 1) + MODEL_INPUT_SHAPE, dtype=np.float32)
+        start = time.perf_counter()
+        preprocess_image(context, out=ensemble_batch[standard, 0])
+        timings['preprocess'] = time.perf_counter() - start
+        
+        start = time.perf_counter()
+        standard_predictions, standard_embeddings = self.run_model_with_embeddings(ensemble_batch[standard])
+        timings['inference'] = time.perf_counter() - start
+        embedding = normalize(standard_embeddings[0])
+        
+        hit = self.embedding_index.nearest(embedding, self.near_duplicate_threshold)
+        if hit is not None:
+            row, similarity = hit
+            payload = self.embedding_index.payload(row)
+            # Results computed with a different number of views are not reused
+            if payload is not None and payload[0] == len(views):
+                count_outcome('near_duplicate')
+                return replace(payload[1], cached=True, similarity=similarity, embedding=embedding)
+        
+        start = time.perf_counter()
+        if 'enhanced' in self._variants:
+            enhanced_preprocess_image(context, out=ensemble_batch[self._variants.index('enhanced'), 0])
+        timings['preprocess'] += time.perf_counter() - start
+        if views:
+            start = time.perf_counter()
+            self._build_tta_views([context], views, out=ensemble_batch[variants:])
+            timings['preprocess_tta'] = time.perf_counter() - start
+        
+        batch_predictions, batch_embeddings = standard_predictions, standard_embeddings
+        others = [row for row in range(len(ensemble_batch)) if row != standard]
+        if others:
+            start = time.perf_counter()
+            predictions, embeddings = self.run_model_with_embeddings(
+                ensemble_batch[others].reshape((-1,) + MODEL_INPUT_SHAPE)
+            )
+            timings['inference'] += time.perf_counter() - start
             
-            # Map predictions to animal names (specialized for cow/buffalo)
-            animal_predictions = map_imagenet_to_animals(predictions, top_k=3)
+            # Back into ensemble order: the variants, then the views
+            batch_predictions = np.concatenate((predictions[:standard], standard_predictions, predictions[standard:]))
+            batch_embeddings = np.concatenate((embeddings[:standard], standard_embeddings, embeddings[standard:]))
+        
+        result = self._interpret_ensemble(batch_predictions, batch_embeddings, quality_score, quality_issues, timings)
+        self.embedding_index.add(embedding, payload=(len(views), result))
+        self._update_costs(timings, len(views))
+        return result
+    
+    def _interpret_ensemble(self, batch_predictions, batch_embeddings, quality_score, quality_issues, timings):
+        """Combine one image's ensemble outputs and interpret them, timing it as 'interpret'"""
+        start = time.perf_counter()
+        predictions, mapped, embeddings = self._combine_ensemble(batch_predictions, batch_embeddings, [quality_score])
+        result = self._interpret_predictions(predictions, quality_score, quality_issues, animal_predictions=mapped[0])
+        result.embedding = embeddings[0]
+        timings['interpret'] = time.perf_counter() - start
+        return result
+    
+    @timed('predict_batch')
+    def predict_batch(self, images, batch_size=32, content_hashes=None, tta=None, tta_budget_ms=None):
+        """
+        Predict the animal in each of many images
+        
+        Quality assessment and preprocessing run per image, then every chunk of
+        up to ``batch_size`` accepted images is classified with one forward
+        pass over both preprocessing variants.
+        
+        Args:
+            images: Iterable of PIL Image objects or ImageContexts
+            batch_size: Maximum number of images per forward pass
+            content_hashes: Optional list of encoded-upload hashes, one per
+                image (entries may be None), used like predict's content_hash
+            tta: Extra test-time views per image, as for predict; chosen once
+                for the whole call
+            tta_budget_ms: Per-image latency budget for tta='auto'
+        
+        Returns:
+            list: One PredictionResult per input image, in input order, each
+                equal to what ``predict`` would return for that image; the
+                'inference' timing is the image's share of its batch
+        """
+        if batch_size < 1:
+            raise ValueError("batch_size must be at least 1")
+        
+        images = list(images)
+        results = [None] * len(images)
+        views = TTA_VIEWS[:self.tta_view_count(tta, tta_budget_ms)]
+        
+        # Every variant of each accepted image is written straight into one
+        # buffer reused for every chunk: one block of rows per ensemble
+        # variant, then one block of rows per test-time view
+        chunk_size = min(batch_size, len(images))
+        variants = len(self._variants)
+        buffer = np.empty((variants + len(views), chunk_size) + MODEL_INPUT_SHAPE, dtype=np.float32)
+        
+        for start in range(0, len(images), batch_size):
+            accepted = []
             
-            if not animal_predictions:
-                # Enhanced fallback for cow/buffalo detection
-                # Look for bovine-related terms in raw predictions
-                decoded = tf.keras.applications.imagenet_utils.decode_predictions(
-                    predictions, top=20  # Check more predictions for bovine terms
-                )[0]
-                
-                bovine_keywords = [
-                    # Primary bovine terms
-                    'ox', 'bull', 'cow', 'cattle', 'buffalo', 'bison', 'zebu', 'water_buffalo',
-                    'bovine', 'steer', 'heifer', 'calf', 'dairy', 'beef', 'holstein', 'jersey',
-                    'angus', 'brahman', 'hereford', 'longhorn', 'shorthorn', 'highland',
+            for i in range(start, min(start + batch_size, len(images))):
+                timings = {}
+                try:
+                    if not self.is_ready():
+                        raise Exception(self._not_ready_message())
                     
-                    # Wild bovines
-                    'yak', 'gaur', 'banteng', 'gayal', 'kouprey', 'aurochs',
-                    'cape_buffalo', 'african_buffalo', 'water_ox', 'swamp_buffalo',
-                    'carabao', 'murrah', 'nili_ravi', 'surti',
+                    context = ImageContext.of(images[i])
+                    content_hash = content_hashes[i] if content_hashes is not None else None
+                    cache_key = self._result_cache_key(context, content_hash, len(views))
+                    if cache_key is not None:
+                        cached = self.result_cache.get(cache_key)
+                        if cached is not None:
+                            count_outcome('cached')
+                            results[i] = replace(cached, cached=True, timings={})
+                            continue
                     
-                    # Related terms that might appear
-                    'farm', 'livestock', 'ranch', 'pasture', 'grazing', 'herbivore',
-                    'udder', 'horn', 'horned', 'mammal', 'large_mammal', 'domesticated',
-                    'milk', 'leather', 'meat', 'agricultural'
-                ]
-                
-                for pred in decoded:
-                    class_name = pred[1].lower().replace('_', ' ')
-                    confidence = pred[2] * 100
+                    stage_start = time.perf_counter()
+                    quality_score, quality_issues = assess_image_quality(context)
+                    timings['quality'] = time.perf_counter() - stage_start
+                    if quality_score < QUALITY_REJECT_THRESHOLD:
+                        results[i] = self._poor_quality_result(quality_issues, quality_score)
+                        results[i].timings = timings
+                        if cache_key is not None:
+                            self.result_cache.put(cache_key, results[i])
+                        continue
                     
-                    # Check if any bovine keywords are in the class name
-                    for keyword in bovine_keywords:
-                        if keyword in class_name:
-                            if 'buffalo' in class_name or 'bison' in class_name or 'water' in class_name:
-                                result_animal = 'Buffalo'
-                            else:
-                                result_animal = 'Cow'
-                            
-                            # Advanced confidence boosting based on multiple factors
-                            base_boost = 2.8  # Increased from 2.5
-                            
-                            # Quality-based boost
-                            quality_boost = 1.0 + (quality_score / 200.0)  # Up to 1.5x boost for high quality
-                            
-                            # Keyword relevance boost
-                            keyword_count = sum(1 for kw in bovine_keywords if kw in class_name)
-                            keyword_boost = 1.0 + (keyword_count * 0.15)  # Boost for multiple keywords
-                            
-                            # Calculate final boosted confidence
-                            boosted_confidence = confidence * base_boost * quality_boost * keyword_boost
-                            boosted_confidence = min(boosted_confidence, 96.0)  # Cap at 96%
-                            
-                            # Extra boost for very specific bovine terms
-                            specific_terms = ['cow', 'cattle', 'buffalo', 'bison', 'ox', 'bull']
-                            if any(term in class_name for term in specific_terms):
-                                boosted_confidence = min(boosted_confidence * 1.15, 98.0)
-                            
-                            if debug_mode:
-                                raw_predictions = [(p[1].replace('_', ' ').title(), p[2] * 100) for p in decoded[:5]]
-                                return result_animal, boosted_confidence, [(result_animal, boosted_confidence)], raw_predictions
-                            else:
-                                return result_animal, boosted_confidence, [(result_animal, boosted_confidence)]
-                
-                # If no bovine terms found, reject the image
-                if debug_mode:
-                    raw_predictions = [(pred[1].replace('_', ' ').title(), pred[2] * 100) for pred in decoded[:5]]
-                    return "Not a cow or buffalo", 0, [("Not a cow or buffalo", 0)], raw_predictions
-                else:
-                    return "Not a cow or buffalo", 0, [("Not a cow or buffalo", 0)]
+                    stage_start = time.perf_counter()
+                    row = len(accepted)
+                    self._build_ensemble_batch([context], out=buffer[:variants, row:row + 1])
+                    timings['preprocess'] = time.perf_counter() - stage_start
+                    if views:
+                        stage_start = time.perf_counter()
+                        self._build_tta_views([context], views, out=buffer[variants:, row:row + 1])
+                        timings['preprocess_tta'] = time.perf_counter() - stage_start
+                    accepted.append((i, quality_score, quality_issues, cache_key, timings))
+                except Exception as e:
+                    logger.error(f"Error during prediction: {str(e)}")
+                    results[i] = self._error_result(e, stage='preprocess')
+                    results[i].timings = timings
             
-            # Enhanced accuracy logic with stricter thresholds
-            if animal_predictions:
-                top_animal, top_confidence = animal_predictions[0]
-                
-                # Apply quality-adjusted confidence thresholds
-                high_threshold = 88 if quality_score >= 80 else 92
-                medium_threshold = 75 if quality_score >= 70 else 85
-                
-                # Apply stricter confidence thresholds for 99% accuracy goal
-                if top_confidence >= high_threshold:
-                    confidence_level = "High"
-                elif top_confidence >= medium_threshold:
-                    confidence_level = "Medium"
-                else:
-                    confidence_level = "Low"
-                    # For low confidence, be more conservative
-                    if top_confidence < 60:
-                        top_animal = f"Uncertain - possibly {top_animal}"
-                
-                # Additional validation: check if confidence makes sense with quality
-                if quality_score < 60 and top_confidence > 85:
-                    # High confidence with poor quality is suspicious - reduce it
-                    top_confidence = min(top_confidence * 0.8, 75)
-                    top_animal = f"Uncertain - possibly {top_animal}"
-                
-                if debug_mode:
-                    return top_animal, top_confidence, animal_predictions, raw_predictions
-                else:
-                    return top_animal, top_confidence, animal_predictions
-            else:
-                if debug_mode:
-                    return "Not a cow or buffalo", 0, [], raw_predictions
+            if not accepted:
+                continue
+            
+            try:
+                stage_start = time.perf_counter()
+                n = len(accepted)
+                if n == chunk_size:
+                    batch = buffer.reshape((-1,) + MODEL_INPUT_SHAPE)
                 else:
-                    return "Not a cow or buffalo", 0, []
+                    batch = np.concatenate(buffer[:, :n])
+                blended, mapped, embeddings = self._run_ensemble_batch(batch, [item[1] for item in accepted])
+                inference_share = (time.perf_counter() - stage_start) / len(accepted)
+            except Exception as e:
+                logger.error(f"Error during batch prediction: {str(e)}")
+                for item in accepted:
+                    results[item[0]] = self._error_result(e, stage='inference')
+                continue
             
+            for row, (i, quality_score, quality_issues, cache_key, timings) in enumerate(accepted):
+                timings['inference'] = inference_share
+                try:
+                    stage_start = time.perf_counter()
+                    results[i] = self._interpret_predictions(
+                        blended[row:row + 1], quality_score, quality_issues, animal_predictions=mapped[row]
+                    )
+                    timings['interpret'] = time.perf_counter() - stage_start
+                    results[i].timings = timings
+                    results[i].embedding = embeddings[row]
+                    # Each image's share of the batch feeds the estimates tta='auto' uses
+                    self._update_costs(timings, len(views))
+                    if cache_key is not None:
+                        self.result_cache.put(cache_key, results[i])
+                    if self.embedding_index is not None:
+                        self.embedding_index.add(embeddings[row], payload=(len(views), results[i]))
+                except Exception as e:
+                    logger.error(f"Error during prediction: {str(e)}")
+                    results[i] = self._error_result(e, stage='interpret')
+        
+        return results
+    
+    def classify_ensembles(self, ensembles, quality_scores, quality_issues=None):
+        """
+        Classify images that were already quality-checked and preprocessed,
+        e.g. by the worker processes of a ParallelPipeline
+        
+        Args:
+            ensembles: List of arrays of shape (variants, 224, 224, 3), each
+                holding one row per variant the classifier uses (enhanced
+                then standard, or standard only with a trained head); full
+                two-variant ensembles are accepted either way
+            quality_scores: Quality score of each image
+            quality_issues: Optional list of quality issues of each image
+        
+        Returns:
+            list: One PredictionResult per image, as predict would return
+        """
+        if not ensembles:
+            return []
+        if quality_issues is None:
+            quality_issues = [[] for _ in ensembles]
+        
+        try:
+            blended, mapped, embeddings = self._run_ensembles(ensembles, quality_scores)
         except Exception as e:
-            logger.error(f"Error during prediction: {str(e)}")
-            if debug_mode:
-                return f"Error: {str(e)}", 0, [], []
-            else:
-                return f"Error: {str(e)}", 0, []
+            logger.error(f"Error during batch prediction: {str(e)}")
+            return [self._error_result(e, stage='inference') for _ in ensembles]
+        
+        results = []
+        for row, (quality_score, issues) in enumerate(zip(quality_scores, quality_issues)):
+            try:
+                result = self._interpret_predictions(
+                    blended[row:row + 1], quality_score, issues, animal_predictions=mapped[row]
+                )
+                result.embedding = embeddings[row]
+                if self.embedding_index is not None:
+                    self.embedding_index.add(embeddings[row], payload=(0, result))
+                results.append(result)
+            except Exception as e:
+                logger.error(f"Error during prediction: {str(e)}")
+                results.append(self._error_result(e, stage='interpret'))
+        return results
+    
+    def _run_ensembles(self, ensembles, quality_scores):
+        """
+        Run one forward pass over the ensemble variants of many images, then
+        blend and map the predictions for all of them at once
+        
+        Args:
+            ensembles: List of arrays of shape (variants, 224, 224, 3), or
+                (2, 224, 224, 3) for full ensembles
+            quality_scores: Quality score of each image
+        
+        Returns:
+            tuple: (blended predictions of shape (N, 1000), mapped animal
+                predictions per row, normalized embeddings of shape (N, 1280))
+        """
+        # All rows of the first variant, then all rows of the next; with a
+        # trained head only the standard variant is used
+        if len(ensembles[0]) == len(self._variants):
+            rows = range(len(self._variants))
+        else:
+            rows = [ENSEMBLE_VARIANTS.index(variant) for variant in self._variants]
+        batch = np.concatenate(
+            [ensemble[row:row + 1] for row in rows for ensemble in ensembles], axis=0
+        )
+        return self._run_ensemble_batch(batch, quality_scores)
+    
+    def _run_ensemble_batch(self, batch, quality_scores):
+        """
+        Run one forward pass over an assembled ensemble batch, then blend and
+        map the predictions
+        
+        Args:
+            batch: Array of shape ((variants + views) * N, 224, 224, 3)
+                holding N rows per ensemble variant (enhanced then standard,
+                or standard only with a trained head), then N rows per
+                test-time view
+            quality_scores: Quality score of each of the N images
+        
+        Returns:
+            tuple: as _combine_ensemble
+        """
+        batch_predictions, batch_embeddings = self.run_model_with_embeddings(batch)
+        return self._combine_ensemble(batch_predictions, batch_embeddings, quality_scores)
+    
+    def _combine_ensemble(self, batch_predictions, batch_embeddings, quality_scores):
+        """
+        Combine the model outputs of an ensemble batch into one prediction
+        per image
+        
+        Without a head, the enhanced and standard predictions are blended by
+        quality and the ImageNet classes mapped to animals. With a trained
+        head, its probabilities for the standard variant and test-time views
+        are averaged instead.
+        
+        Args:
+            batch_predictions: Model output of shape ((variants + views) * N, 1000)
+            batch_embeddings: Pooled features of the same rows
+            quality_scores: Quality score of each of the N images
+        
+        Returns:
+            tuple: (predictions of shape (N, 1000), animal predictions per
+                row as (animal_name, confidence_percentage) lists,
+                normalized embeddings of the standard variants, of shape
+                (N, 1280))
+        """
+        n = len(quality_scores)
+        standard = self._variants.index('standard') * n
+        embeddings = normalize(batch_embeddings[standard:standard + n])
+        
+        if self.head is not None:
+            probabilities = self._merge_views(self.head.probabilities(normalize(batch_embeddings)), n)
+            return (self._merge_views(batch_predictions, n), [self.head.rank(row) for row in probabilities],
+                    embeddings)
+        
+        blended = self._blend_ensemble(
+            batch_predictions[:n], self._merge_views(batch_predictions[n:], n), np.array(quality_scores)
+        )
+        return blended, map_imagenet_to_animals_batch(blended, top_k=3), embeddings
+    
+    def _result_cache_key(self, context, content_hash=None, views=0):
+        """
+        Build the result cache key for an image under the current model
+        
+        Args:
+            context: ImageContext of the image
+            content_hash: Optional hash of the encoded upload
+            views: Number of test-time views the result uses
+        
+        Returns:
+            str or None: Cache key, or None when caching is disabled
+        """
+        if self.result_cache is None:
+            return None
+        
+        namespace = (f"v{PIPELINE_VERSION}|{self._weights_key or id(self)}|{self.backend}|"
+                     f"{self.quantization}")
+        if self.calibration is not None:
+            namespace += f"|cal:{self.calibration}"
+        if views:
+            namespace += f"|tta{views}"
+        if self.head is not None:
+            namespace += f"|head:{self.head.fingerprint}"
+        if content_hash is not None:
+            return f"{namespace}|upload:{content_hash}"
+        return ResultCache.image_key(context, namespace)
+    
+    def _build_ensemble_batch(self, images, out=None):
+        """
+        Preprocess images with each pipeline of the ensemble: enhanced and
+        standard, or standard only with a trained head
+        
+        Each variant is scaled straight into its row of the batch buffer, so
+        no per-image arrays are allocated and concatenated.
+        
+        Args:
+            images: List of PIL Image objects or ImageContexts
+            out: Optional float32 buffer of shape (variants, len(images),
+                224, 224, 3) to fill; allocated when not given
+        
+        Returns:
+            np.ndarray: Batch of shape (variants * len(images), 224, 224, 3)
+                holding all rows of each variant in turn
+        """
+        if out is None:
+            out = np.empty((len(self._variants), len(images)) + MODEL_INPUT_SHAPE, dtype=np.float32)
+        
+        for i, image in enumerate(images):
+            for v, variant in enumerate(self._variants):
+                if variant == 'enhanced':
+                    # Use enhanced preprocessing for better results
+                    enhanced_preprocess_image(image, out=out[v, i])
+                else:
+                    # Also get standard preprocessing for ensemble approach
+                    preprocess_image(image, out=out[v, i])
+        
+        return out.reshape((-1,) + MODEL_INPUT_SHAPE)
+    
+    def _build_tta_views(self, images, views, out):
+        """
+        Preprocess the test-time views of images into a batch buffer
+        
+        Args:
+            images: List of PIL Image objects or ImageContexts
+            views: Names from TTA_VIEWS
+            out: float32 buffer of shape (len(views), len(images), 224, 224, 3)
+        """
+        for i, image in enumerate(images):
+            for v, view in enumerate(views):
+                preprocess_tta_view(image, view, out=out[v, i])
+    
+    @staticmethod
+    def _merge_views(predictions, n):
+        """
+        Average the standard variant's predictions with those of its test-time
+        views, so the quality-based blend weights them as one
+        
+        Args:
+            predictions: Model output of shape ((1 + views) * n, 1000), the
+                standard rows followed by one block of n rows per view
+            n: Number of images
+        
+        Returns:
+            np.ndarray: Predictions of shape (n, 1000)
+        """
+        if len(predictions) == n:
+            return predictions
+        return predictions.reshape((-1, n) + predictions.shape[1:]).mean(axis=0)
+    
+    @staticmethod
+    def _blend_ensemble(predictions_enhanced, predictions_standard, quality_score):
+        """
+        Combine enhanced and standard predictions for better accuracy
+        
+        Args:
+            predictions_enhanced: Model output for the enhanced variant(s)
+            predictions_standard: Model output for the standard variant(s)
+            quality_score: Image quality score from assess_image_quality, or
+                an array with one score per prediction row
+        
+        Returns:
+            np.ndarray: Weighted average of the two prediction arrays
+        """
+        # Enhanced preprocessing gets more weight if quality is good
+        weight_enhanced = np.minimum(np.asarray(quality_score, dtype=np.float64) / 100.0, 0.8)  # Cap at 80%
+        weight_standard = 1.0 - weight_enhanced
+        if weight_enhanced.ndim:
+            weight_enhanced = weight_enhanced[:, None]
+            weight_standard = weight_standard[:, None]
+        
+        dtype = predictions_enhanced.dtype
+        return (weight_enhanced.astype(dtype) * predictions_enhanced + 
+                weight_standard.astype(dtype) * predictions_standard)
+    
+    @staticmethod
+    def _poor_quality_result(quality_issues, quality_score=None):
+        """Build the result returned for images rejected on quality"""
+        logger.warning(f"Poor image quality detected: {quality_issues}")
+        count_outcome('rejected')
+        return PredictionResult(
+            f"Poor image quality: {', '.join(quality_issues)}", 0, [], status='rejected',
+            quality_score=quality_score, quality_issues=list(quality_issues)
+        )
+    
+    @staticmethod
+    def _error_result(error, stage='predict'):
+        """Build the result returned when prediction fails in the given stage"""
+        count_outcome('error')
+        count_error(stage)
+        return PredictionResult(f"Error: {str(error)}", 0, [], status='error', error=str(error))
+    
+    def _interpret_predictions(self, predictions, quality_score, quality_issues=(), animal_predictions=None):
+        """
+        Turn blended ImageNet predictions into a cow/buffalo result
+        
+        Args:
+            predictions: Blended model output of shape (1, 1000)
+            quality_score: Image quality score from assess_image_quality
+            quality_issues: Quality issues from assess_image_quality
+            animal_predictions: Precomputed map_imagenet_to_animals output,
+                e.g. from a batched mapping call, or the trained head's
+                ranking when there is one
+        
+        Returns:
+            PredictionResult keeping the prediction row, so raw ImageNet
+                labels can be decoded later if requested
+        """
+        # Raw predictions are only decoded if the caller reads them
+        result = PredictionResult(
+            "Not a cow or buffalo", 0, [], status='not_animal', quality_score=quality_score,
+            quality_issues=list(quality_issues), predictions=np.array(predictions[0])
+        )
+        
+        # Map predictions to animal names (specialized for cow/buffalo)
+        if animal_predictions is None:
+            animal_predictions = map_imagenet_to_animals(predictions, top_k=3)
+        
+        # A trained head has its own not-an-animal class and no keyword fallback
+        if self.head is not None:
+            if not animal_predictions or animal_predictions[0][0] == NOT_ANIMAL_LABEL:
+                count_outcome('not_animal')
+                result.top_predictions = [("Not a cow or buffalo", 0)]
+                return result
+            animal_predictions = [p for p in animal_predictions if p[0] != NOT_ANIMAL_LABEL]
+        
+        if not animal_predictions:
+            # Enhanced fallback for cow/buffalo detection
+            # Look for bovine-related terms in the top raw predictions
+            bovine_match = self._bovine_matcher.match(
+                predictions, quality_score, top=20  # Check more predictions for bovine terms
+            )
+            
+            # The fallback path has always reported the top 5 raw labels
+            result.raw_top_k = 5
+            
+            if bovine_match is not None:
+                count_outcome('fallback')
+                result_animal, boosted_confidence = bovine_match
+                result.label, result.confidence, result.status = result_animal, boosted_confidence, 'fallback'
+                result.top_predictions = [(result_animal, boosted_confidence)]
+                return result
+            
+            # If no bovine terms found, reject the image
+            count_outcome('not_animal')
+            result.top_predictions = [("Not a cow or buffalo", 0)]
+            return result
+        
+        # Enhanced accuracy logic with stricter thresholds
+        count_outcome('classified')
+        top_animal, top_confidence = animal_predictions[0]
+        
+        # Apply quality-adjusted confidence thresholds
+        high_threshold = 88 if quality_score >= 80 else 92
+        medium_threshold = 75 if quality_score >= 70 else 85
+        
+        # Apply stricter confidence thresholds for 99% accuracy goal
+        if top_confidence >= high_threshold:
+            confidence_level = "High"
+        elif top_confidence >= medium_threshold:
+            confidence_level = "Medium"
+        else:
+            confidence_level = "Low"
+            # For low confidence, be more conservative
+            if top_confidence < 60:
+                top_animal = f"Uncertain - possibly {top_animal}"
+        
+        # Additional validation: check if confidence makes sense with quality
+        if quality_score < 60 and top_confidence > 85:
+            # High confidence with poor quality is suspicious - reduce it
+            top_confidence = min(top_confidence * 0.8, 75)
+            top_animal = f"Uncertain - possibly {top_animal}"
+        
+        result.label, result.confidence, result.status = top_animal, top_confidence, 'classified'
+        result.top_predictions = animal_predictions
+        return result
     
     def get_model_info(self):
         """
@@ -209,14 +1066,25 @@ class AnimalClassifier:
         Returns:
             dict: Model information
         """
+        if not self.is_ready():
+            return {"status": self._not_ready_message()}
+        
+        # A TFLite model read from the store runs without the Keras model
         if self.model is None:
-            return {"status": "Model not loaded"}
+            input_shape, output_shape, total_params = (None, 224, 224, 3), (None, 1000), None
+        else:
+            input_shape = self.model.input_shape
+            output_shape = self.model.output_shape
+            total_params = self.model.count_params()
         
         return {
             "model_name": "MobileNetV2",
-            "input_shape": self.model.input_shape,
-            "output_shape": self.model.output_shape,
-            "total_params": self.model.count_params(),
+            "backend": self.backend,
+            "quantization": self.quantization or "none",
+            "head": ", ".join(self.head.labels) if self.head is not None else "imagenet mapping",
+            "input_shape": input_shape,
+            "output_shape": output_shape,
+            "total_params": total_params,
             "status": "Loaded and ready"
         }
     
@@ -227,4 +1095,20 @@ class AnimalClassifier:
         Returns:
             bool: True if ready, False otherwise
         """
-        return self.model is not None
+        return self._ready.is_set()
+    
+    def is_warming(self):
+        """
+        Check if the model is still loading on the background thread
+        
+        Returns:
+            bool: True while background loading is in progress
+        """
+        return self._loader is not None and self._loader.is_alive()
+    
+    def _not_ready_message(self):
+        if self.is_warming():
+            return "Model is still warming up"
+        if self.load_error:
+            return f"Model failed to load: {self.load_error}"
+        return "Model not loaded"
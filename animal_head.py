@@ -0,0 +1,258 @@
+#!/usr/bin/env python3
+"""
+Trained Cow/Buffalo head on frozen MobileNetV2 features
+
+Instead of mapping the 1000 ImageNet classes to animals by hand, a small
+softmax-regression head is trained on the pooled backbone embeddings of
+labelled images. Training data is a directory (or archive) with one folder
+per class, e.g. ``Cow/``, ``Buffalo/`` and ``Other/`` for images that are
+neither; images in ``Other`` train the head to report 'not_animal'. Usage:
+
+    python animal_head.py training_data/ --cache features/train --output head.npz
+    python classify.py photos/ --head head.npz --output results.jsonl
+
+Embeddings are extracted once into a memory-mapped cache (an EmbeddingIndex
+keyed by image id); reruns only embed images not in the cache, so retraining
+with other settings costs seconds on a CPU. The cache records the weights,
+backend and quantization that filled it and is refused by any other model.
+"""
+import argparse
+import hashlib
+import logging
+import os
+import time
+import zlib
+
+import numpy as np
+
+from embedding_index import EmbeddingIndex
+
+logger = logging.getLogger(__name__)
+
+# Training folder whose images are neither a cow nor a buffalo
+NOT_ANIMAL_LABEL = 'Other'
+
+
+class LinearHead:
+    """
+    Softmax regression over L2-normalized pooled embeddings
+
+    Feature standardization is folded into the weights, so serving is one
+    (N, 1280) x (1280, classes) product and a softmax.
+    """
+
+    def __init__(self, labels, weights, bias):
+        """
+        Args:
+            labels: Class names, one per output column
+            weights: Array of shape (dim, len(labels))
+            bias: Array of shape (len(labels),)
+        """
+        self.labels = [str(label) for label in labels]
+        self.weights = np.ascontiguousarray(weights, dtype=np.float32)
+        self.bias = np.asarray(bias, dtype=np.float32)
+        if self.weights.shape[1] != len(self.labels) or self.bias.shape != (len(self.labels),):
+            raise ValueError("Head weights and bias don't match its labels")
+
+        digest = hashlib.sha256(self.weights.tobytes() + self.bias.tobytes())
+        digest.update('|'.join(self.labels).encode())
+        self.fingerprint = digest.hexdigest()[:16]
+
+    @classmethod
+    def load(cls, path):
+        with np.load(path) as data:
+            return cls(data['labels'], data['weights'], data['bias'])
+
+    def save(self, path):
+        np.savez(path, labels=np.array(self.labels), weights=self.weights, bias=self.bias)
+
+    def probabilities(self, embeddings):
+        """
+        Class probabilities for normalized embeddings
+
+        Args:
+            embeddings: Array of shape (N, dim)
+
+        Returns:
+            np.ndarray: float32 probabilities of shape (N, len(labels))
+        """
+        return _softmax(np.asarray(embeddings, dtype=np.float32) @ self.weights + self.bias)
+
+    def rank(self, probabilities, top_k=3):
+        """
+        Classes of one probability row, most likely first
+
+        Args:
+            probabilities: Array of shape (len(labels),)
+            top_k: Number of classes to return
+
+        Returns:
+            list: (label, confidence_percentage) tuples, which may include
+                NOT_ANIMAL_LABEL
+        """
+        order = np.argsort(probabilities)[::-1][:top_k]
+        return [(self.labels[i], float(probabilities[i]) * 100) for i in order.tolist()]
+
+
+def _softmax(logits):
+    logits = logits - logits.max(axis=-1, keepdims=True)
+    exp = np.exp(logits)
+    return exp / exp.sum(axis=-1, keepdims=True)
+
+
+def train_head(features, labels, l2=1e-3, epochs=500, learning_rate=0.5):
+    """
+    Fit a softmax-regression head by full-batch gradient descent on the CPU
+
+    Args:
+        features: Normalized embeddings of shape (N, dim)
+        labels: Class name of each row
+        l2: L2 penalty on the standardized weights
+        epochs: Gradient steps
+        learning_rate: Step size
+
+    Returns:
+        LinearHead
+    """
+    features = np.asarray(features, dtype=np.float32)
+    classes, targets = np.unique(np.asarray(labels), return_inverse=True)
+    if len(classes) < 2:
+        raise ValueError("Training needs images of at least two classes")
+
+    # Standardized features make one step size work for every dimension
+    mean = features.mean(axis=0)
+    std = features.std(axis=0) + 1e-6
+    x = (features - mean) / std
+    onehot = np.eye(len(classes), dtype=np.float32)[targets]
+
+    weights = np.zeros((x.shape[1], len(classes)), dtype=np.float32)
+    bias = np.zeros(len(classes), dtype=np.float32)
+    for _ in range(epochs):
+        error = (_softmax(x @ weights + bias) - onehot) / len(x)
+        weights -= learning_rate * (x.T @ error + l2 * weights)
+        bias -= learning_rate * error.sum(axis=0)
+
+    # Fold the standardization in: ((f - mean) / std) @ W + b
+    folded = weights / std[:, None]
+    return LinearHead(classes, folded, bias - mean @ folded)
+
+
+def label_of(source_id):
+    """Class of a training image: the name of the folder it is in"""
+    member = source_id.split('::')[-1]
+    return os.path.basename(os.path.dirname(member.replace('\\', '/')))
+
+
+def extract_features(classifier, items, cache, batch_size=32, checkpoint_every=1000):
+    """
+    Embed every image not already in the feature cache
+
+    Args:
+        classifier: Loaded AnimalClassifier
+        items: Iterable of (id, loader) as from classify.iter_sources
+        cache: EmbeddingIndex keyed by image id
+        batch_size: Images per forward pass
+        checkpoint_every: Images between flushes of the cache to disk
+
+    Returns:
+        int: Number of images embedded; unreadable images are logged and
+            skipped
+    """
+    from classify import open_payload
+
+    cached = set(cache.keys())
+    added = unflushed = 0
+    chunk = []
+
+    def embed_chunk():
+        # Truncated or corrupt images only fail once they are decoded
+        errors = {}
+        embeddings = classifier.embed([image for _, image in chunk], batch_size=batch_size, errors=errors)
+        for row, (source_id, _) in enumerate(chunk):
+            if row in errors:
+                logger.warning(f"Skipping {source_id}: {str(errors[row])}")
+            else:
+                cache.add(embeddings[row], key=source_id)
+        return len(chunk) - len(errors)
+
+    try:
+        for source_id, load in items:
+            if source_id in cached:
+                continue
+            # Archive members must be read before the stream advances
+            try:
+                chunk.append((source_id, open_payload(load())))
+            except Exception as e:
+                logger.warning(f"Skipping {source_id}: {str(e)}")
+                continue
+            if len(chunk) == batch_size:
+                count = embed_chunk()
+                added += count
+                unflushed += count
+                chunk = []
+                if unflushed >= checkpoint_every:
+                    cache.flush()
+                    unflushed = 0
+                    logger.info(f"{added} images embedded")
+        if chunk:
+            added += embed_chunk()
+    finally:
+        # An interrupted run keeps everything embedded so far
+        cache.flush()
+    return added
+
+
+def split_validation(ids, fraction, seed=0):
+    """Deterministic train/validation mask from image ids, stable as the data grows"""
+    if fraction <= 0:
+        return np.zeros(len(ids), dtype=bool)
+    scores = np.array([zlib.crc32(f"{seed}:{source_id}".encode()) for source_id in ids], dtype=np.float64)
+    return scores / 2**32 < fraction
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Train a Cow/Buffalo head on frozen MobileNetV2 features")
+    parser.add_argument("inputs", nargs="+", help="Directories or archives with one folder per class")
+    parser.add_argument("--cache", required=True, help="File prefix of the feature cache")
+    parser.add_argument("--output", required=True, help="Head file to write (.npz)")
+    parser.add_argument("--validation-fraction", type=float, default=0.2,
+                        help="Share of images held out to report accuracy")
+    parser.add_argument("--l2", type=float, default=1e-3, help="L2 penalty")
+    parser.add_argument("--epochs", type=int, default=500, help="Gradient steps")
+    parser.add_argument("--batch-size", type=int, default=32, help="Images per forward pass")
+    parser.add_argument("--backend", choices=["keras", "tflite"], default="keras", help="Inference backend")
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO)
+
+    from animal_classifier import AnimalClassifier
+    from classify import iter_sources
+
+    start = time.perf_counter()
+    classifier = AnimalClassifier(backend=args.backend, result_cache_size=0)
+    cache = EmbeddingIndex(path=args.cache, metadata=classifier.feature_signature())
+    added = extract_features(classifier, iter_sources(args.inputs), cache, args.batch_size)
+    logger.info(f"Embedded {added} new images in {time.perf_counter() - start:.1f}s "
+                f"({len(cache)} in the cache)")
+
+    # Only images under the given inputs train the head, even if the cache holds more
+    wanted = {source_id for source_id, _ in iter_sources(args.inputs)}
+    ids = cache.keys()
+    rows = np.array([row for row, source_id in enumerate(ids) if source_id in wanted], dtype=np.int64)
+    features = np.asarray(cache.vectors()[rows])
+    labels = np.array([label_of(ids[row]) for row in rows])
+    held_out = split_validation([ids[row] for row in rows], args.validation_fraction)
+
+    start = time.perf_counter()
+    head = train_head(features[~held_out], labels[~held_out], l2=args.l2, epochs=args.epochs)
+    logger.info(f"Trained on {int((~held_out).sum())} images in {time.perf_counter() - start:.1f}s")
+    if held_out.any():
+        predicted = np.array(head.labels)[head.probabilities(features[held_out]).argmax(axis=1)]
+        print(f"Validation accuracy: {np.mean(predicted == labels[held_out]) * 100:.1f}% "
+              f"on {int(held_out.sum())} images")
+
+    head.save(args.output)
+    print(f"Wrote {args.output} (classes: {', '.join(head.labels)})")
+
+
+if __name__ == "__main__":
+    main()
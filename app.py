@@ -1,8 +1,13 @@
 import streamlit as st
 import numpy as np
-from PIL import Image
 import io
+import hashlib
+import os
+import tempfile
+import time
 from animal_classifier import AnimalClassifier
+from image_ingest import ingest_upload
+from clip_classifier import ClipClassifier, VIDEO_EXTENSIONS
 import traceback
 
 # Configure page
@@ -12,17 +17,57 @@ st.set_page_config(
     layout="wide"
 )
 
+# Latency budget for robust mode: as many test-time views as fit in it
+ROBUST_MODE_BUDGET_MS = 1000
+
 # Initialize the classifier
 @st.cache_resource
 def load_classifier():
-    """Load and cache the animal classifier model"""
+    """
+    Create and cache the animal classifier
+    
+    The model loads and warms up on a background thread, so the page renders
+    immediately instead of blocking on TensorFlow.
+    """
     try:
-        classifier = AnimalClassifier()
+        classifier = AnimalClassifier(background=True)
         return classifier
     except Exception as e:
         st.error(f"Failed to load the AI model: {str(e)}")
         return None
 
+@st.cache_resource(max_entries=8, show_spinner=False)
+def ingest_cached(content_hash, _data):
+    """
+    Decode an upload once per content hash
+    
+    Streamlit reruns the script on every widget change; keyed by the upload's
+    hash, reruns skip decoding entirely. Only the hash is hashed by Streamlit.
+    """
+    return ingest_upload(_data)
+
+@st.cache_data(max_entries=16, show_spinner=False)
+def classify_clip(_classifier, content_hash, _data, filename, is_video):
+    """
+    Classify an uploaded video or animated image as one clip
+    
+    OpenCV reads video from a file, so video uploads are spooled to a
+    temporary file first; animated images are decoded straight from memory.
+    The ClipResult is cached by content hash, so reruns don't re-decode or
+    re-classify the clip. The underscored arguments are not hashed.
+    """
+    clips = ClipClassifier(_classifier)
+    if not is_video:
+        return clips.classify(_data)
+    
+    suffix = os.path.splitext(filename)[1].lower()
+    with tempfile.NamedTemporaryFile(suffix=suffix, delete=False) as f:
+        f.write(_data)
+    try:
+        return clips.classify(f.name)
+    finally:
+        os.remove(f.name)
+
 def add_custom_css():
     """Add custom CSS for modern UI design"""
     st.markdown("""
@@ -287,10 +332,19 @@ def main():
     # Load the classifier
     classifier = load_classifier()
     
-    if classifier is None:
+    if classifier is None or classifier.load_error:
         st.error("Unable to load the AI model. Please try again later.")
         return
     
+    if classifier.is_warming():
+        st.markdown("""
+        <div class="main-container">
+            <div class="alert-warning">
+                <strong>🔥 Model warming up:</strong> The AI model is loading in the background. You can upload a photo now; it will be analyzed as soon as the model is ready.
+            </div>
+        </div>
+        """, unsafe_allow_html=True)
+    
     # Main content container
     st.markdown('<div class="main-container">', unsafe_allow_html=True)
     
@@ -305,15 +359,23 @@ def main():
     # File uploader
     uploaded_file = st.file_uploader(
         "Choose a cow or buffalo photo...",
-        type=['jpg', 'jpeg', 'png', 'bmp', 'gif'],
-        help="Upload clear photos of cows or buffalo for best results. Supported formats: JPG, JPEG, PNG, BMP, GIF",
+        type=['jpg', 'jpeg', 'png', 'bmp', 'gif', 'mp4', 'mov', 'avi'],
+        help="Upload clear photos of cows or buffalo for best results. Supported formats: JPG, JPEG, PNG, BMP, GIF, and MP4, MOV or AVI clips",
         label_visibility="collapsed"
     )
     
     if uploaded_file is not None:
         try:
-            # Display the uploaded image
-            image = Image.open(uploaded_file)
+            # Hash the raw upload so reruns and re-uploads hit the result cache
+            data = uploaded_file.getvalue()
+            content_hash = hashlib.sha256(data).hexdigest()
+            
+            # Clips are streamed frame by frame later; images are decoded within
+            # pixel limits: JPEGs at reduced scale, first frame only, rotated
+            # upright, and the original is never kept at full size
+            is_video = uploaded_file.name.lower().endswith(VIDEO_EXTENSIONS)
+            ingested = None if is_video else ingest_cached(content_hash, data)
+            is_clip = is_video or ingested.animated
             
             # Create modern grid layout
             col1, col2 = st.columns([1, 1], gap="large")
@@ -324,7 +386,12 @@ def main():
                     <h3 style="margin-bottom: 1rem; color: #2d3748; font-weight: 600;">📸 Uploaded Image</h3>
                 </div>
                 """, unsafe_allow_html=True)
-                st.image(image, caption="Your uploaded photo", width="stretch")
+                if is_video:
+                    st.video(data)
+                else:
+                    st.image(ingested.thumbnail, caption="Your uploaded photo", width="stretch")
+                if is_clip:
+                    st.caption("Clip: sampled frames are classified and combined into one verdict")
             
             with col2:
                 st.markdown("""
@@ -335,14 +402,26 @@ def main():
                 
                 # Add debug mode toggle
                 debug_mode = st.checkbox("🔍 Show debug info (raw AI predictions)", help="See what the AI model actually detected before animal mapping")
+                robust_mode = st.checkbox("🧪 Robust mode (extra views, slower)", help="Also classify flipped, cropped and zoomed views of the photo in the same pass and combine them")
                 
                 # Show loading spinner while processing
                 with st.spinner("Analyzing the image..."):
+                    # An upload made during warm-up waits for the model here
+                    if classifier.is_warming():
+                        classifier.wait_until_ready()
+                    
                     # Get prediction from the classifier
-                    if debug_mode:
-                        prediction, confidence, top_predictions, raw_predictions = classifier.predict(image, debug_mode=True)
+                    if is_clip:
+                        result = None
+                        clip = classify_clip(classifier, content_hash, data, uploaded_file.name, is_video)
+                        prediction, confidence = clip.label, clip.confidence
+                        top_predictions = sorted(clip.scores.items(), key=lambda item: item[1], reverse=True)
                     else:
-                        prediction, confidence, top_predictions = classifier.predict(image)
+                        result = classifier.predict(
+                            ingested.context(), content_hash=content_hash,
+                            tta='auto' if robust_mode else 0, tta_budget_ms=ROBUST_MODE_BUDGET_MS
+                        )
+                        prediction, confidence, top_predictions = result.label, result.confidence, result.top_predictions
                 
                 if prediction:
                     # Display main prediction with modern styling
@@ -361,15 +440,34 @@ def main():
                         st.markdown(f"**{i}.** {animal}: **{conf:.1f}%**")
                     
                     # Show debug information if enabled
-                    if debug_mode and 'raw_predictions' in locals():
+                    if debug_mode and result is None:
+                        st.caption(
+                            f"Clip: {clip.frames_read} frames read, {clip.frames_sampled} sampled after dropping "
+                            f"near-duplicates, {clip.frames_animal}/{clip.frames_classified} recognised as an animal, "
+                            f"{clip.frames_rejected} rejected for quality; frame votes {clip.votes}"
+                        )
+                    elif debug_mode:
                         st.markdown("""
                         <div class="debug-section">
                             <h4 style="margin-bottom: 1rem;">🔍 Debug: Raw AI Detections</h4>
                             <p><strong>What the AI model originally detected:</strong></p>
                         </div>
                         """, unsafe_allow_html=True)
-                        for i, (raw_class, raw_conf) in enumerate(raw_predictions[:5], 1):
+                        # Raw labels are only decoded here, when debug info is shown
+                        for i, (raw_class, raw_conf) in enumerate(result.raw_predictions[:5], 1):
                             st.write(f"**{i}.** {raw_class}: **{raw_conf:.1f}%**")
+                        
+                        if result.timings:
+                            st.caption("Stage timings: " + ", ".join(
+                                f"{stage} {seconds * 1000:.0f} ms" for stage, seconds in result.timings.items()
+                            ))
+                        
+                        if classifier.result_cache is not None:
+                            cache_stats = classifier.result_cache.stats()
+                            st.caption(
+                                f"Result cache: {cache_stats['hits']} hits, {cache_stats['misses']} misses, "
+                                f"{cache_stats['entries']}/{cache_stats['max_entries']} entries"
+                            )
                     
                     # Enhanced confidence interpretation with modern styling
                     if confidence >= 85:
@@ -488,6 +586,11 @@ def main():
     
     # Close main container
     st.markdown('</div>', unsafe_allow_html=True)
+    
+    # Re-render once the model is ready so the warming notice goes away
+    if classifier.is_warming():
+        time.sleep(1)
+        st.rerun()
 
 if __name__ == "__main__":
     main()
@@ -0,0 +1,586 @@
+#!/usr/bin/env python3
+"""
+Latency benchmarks for the Animal Classify inference pipeline
+
+Runs entirely on CPU and, by default, with randomly initialized weights so
+no ImageNet download is needed. Usage:
+
+    python benchmark.py ensemble --runs 50
+    python benchmark.py inference --runs 50
+    python benchmark.py agreement --imagenet --quantization int8 --threads 4
+    python benchmark.py preprocess --width 4000 --height 3000
+    python benchmark.py quality --width 4000 --height 3000
+    python benchmark.py scaling --images 32
+    python benchmark.py pipeline --images 128 --workers 4
+    python benchmark.py suite --output results.json --baseline baseline.json
+    python benchmark.py compare --output results.json --baseline baseline.json
+"""
+import argparse
+import io
+import json
+import os
+import platform
+import resource
+import sys
+import time
+
+# Benchmarks are CPU numbers; hide any GPU before TensorFlow is imported
+os.environ.setdefault("CUDA_VISIBLE_DEVICES", "-1")
+os.environ.setdefault("TF_CPP_MIN_LOG_LEVEL", "2")
+
+import numpy as np
+from PIL import Image, ImageFilter, ImageEnhance
+
+
+def make_synthetic_image(width=640, height=480, seed=0):
+    """
+    Build a deterministic RGB test image with natural-image statistics
+
+    Sums value-noise octaves with amplitude growing with their scale (a
+    roughly 1/f spectrum, like photographs), so sharpness and edge metrics
+    behave similarly at full and reduced resolution.
+
+    Args:
+        width: Image width in pixels
+        height: Image height in pixels
+        seed: Random seed
+
+    Returns:
+        PIL Image object
+    """
+    rng = np.random.default_rng(seed)
+    luma = np.zeros((height, width), dtype=np.float32)
+    cell = 2
+    while cell <= max(width, height) // 2:
+        grid = rng.normal(0.0, 1.0, size=(height // cell + 2, width // cell + 2)).astype(np.float32)
+        octave = Image.fromarray(grid, "F").resize(
+            (width, height), Image.Resampling.BILINEAR,
+            box=(0, 0, width / cell, height / cell)
+        )
+        luma += np.asarray(octave) * np.sqrt(cell)
+        cell *= 2
+
+    luma = (luma - luma.mean()) / (luma.std() + 1e-6)
+    tint = rng.uniform(0.8, 1.2, size=3).astype(np.float32)
+    rgb = 120.0 + 50.0 * luma[..., None] * tint
+    return Image.fromarray(np.clip(rgb, 0, 255).astype(np.uint8), "RGB")
+
+
+def summarize(samples_ms):
+    """
+    Summarize a list of latency samples
+
+    Args:
+        samples_ms: Latencies in milliseconds
+
+    Returns:
+        dict: mean and percentile latencies in milliseconds
+    """
+    samples = np.asarray(samples_ms, dtype=np.float64)
+    return {
+        "mean_ms": float(samples.mean()),
+        "p50_ms": float(np.percentile(samples, 50)),
+        "p95_ms": float(np.percentile(samples, 95)),
+        "p99_ms": float(np.percentile(samples, 99)),
+        "runs": int(samples.size),
+    }
+
+
+def time_call(fn, runs, warmup=3):
+    """
+    Time repeated calls of a zero-argument function
+
+    Args:
+        fn: Callable to benchmark
+        runs: Number of timed calls
+        warmup: Number of untimed calls made first
+
+    Returns:
+        list: Per-call latencies in milliseconds
+    """
+    for _ in range(warmup):
+        fn()
+    samples = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        fn()
+        samples.append((time.perf_counter() - start) * 1000.0)
+    return samples
+
+
+def peak_rss_mb():
+    """Peak resident set size of this process so far, in MB"""
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is in bytes on macOS and kilobytes elsewhere
+    return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
+
+
+def print_summary(name, stats):
+    """Print one benchmark row"""
+    print(f"{name:<32} mean {stats['mean_ms']:8.2f} ms   "
+          f"p50 {stats['p50_ms']:8.2f} ms   p95 {stats['p95_ms']:8.2f} ms")
+
+
+def bench_ensemble(classifier, image, runs):
+    """
+    Compare two batch-1 forward passes against one batched pass over the
+    enhanced and standard preprocessing variants
+    """
+    from model_utils import preprocess_image, enhanced_preprocess_image
+
+    enhanced = np.asarray(enhanced_preprocess_image(image))
+    standard = np.asarray(preprocess_image(image))
+    model = classifier.model
+
+    def sequential():
+        model.predict(enhanced, verbose=0)
+        model.predict(standard, verbose=0)
+
+    def batched():
+        model.predict(np.concatenate([enhanced, standard], axis=0), verbose=0)
+
+    seq = summarize(time_call(sequential, runs))
+    bat = summarize(time_call(batched, runs))
+    e2e = summarize(time_call(lambda: classifier.predict(image), runs))
+
+    print_summary("forward x2 (batch 1 each)", seq)
+    print_summary("forward x1 (batch 2)", bat)
+    print_summary("predict() end to end", e2e)
+    print(f"Forward-pass saving: {seq['mean_ms'] - bat['mean_ms']:.2f} ms/image "
+          f"({(1 - bat['mean_ms'] / seq['mean_ms']) * 100:.1f}%)")
+
+
+def bench_inference(classifier, image, runs):
+    """
+    Compare Keras model.predict against the traced tf.function path at the
+    batch sizes predict and predict_batch actually use
+    """
+    from model_utils import preprocess_image
+
+    single = np.asarray(preprocess_image(image))
+    model = classifier.model
+
+    for batch_size in (1, 2, 16):
+        batch = np.repeat(single, batch_size, axis=0)
+        keras_stats = summarize(time_call(lambda: model.predict(batch, verbose=0), runs))
+        traced_stats = summarize(time_call(lambda: classifier.run_model(batch), runs))
+        print_summary(f"model.predict (batch {batch_size})", keras_stats)
+        print_summary(f"tf.function (batch {batch_size})", traced_stats)
+        print(f"Speedup: {keras_stats['mean_ms'] / traced_stats['mean_ms']:.2f}x\n")
+
+
+def bench_agreement(classifier, args):
+    """
+    Report how closely a TFLite backend tracks the Keras backend on the same
+    preprocessed inputs
+
+    Inputs are the real photos in --images-dir, each as the standard view
+    and every test-time view; int8 is calibrated on --calibration-dir.
+    """
+    from model_utils import ImageContext, TTA_VIEWS, preprocess_image, preprocess_tta_view, map_imagenet_to_animals
+    from tflite_backend import TFLiteBackend, agreement_report, calibration_images, convert_model
+
+    candidate = TFLiteBackend(convert_model(classifier.model, args.quantization,
+                                            calibration_dir=args.calibration_dir),
+                              num_threads=args.threads)
+
+    def batches():
+        for path in calibration_images(args.images_dir):
+            context = ImageContext(Image.open(path))
+            yield np.concatenate([np.asarray(preprocess_image(context))] + [
+                np.asarray(preprocess_tta_view(context, view)) for view in TTA_VIEWS
+            ], axis=0)
+
+    def top_label(row):
+        mapped = map_imagenet_to_animals(row, top_k=1)
+        return mapped[0][0] if mapped else None
+
+    report = agreement_report(classifier.run_model, candidate.run, batches(), map_fn=top_label)
+    print(f"TFLite ({args.quantization or 'float32'}, threads={args.threads}) vs Keras "
+          f"over {report['images']} images")
+    for key, value in report.items():
+        if key != "images":
+            print(f"  {key:<24} {value:.4f}")
+
+
+def bench_preprocess(classifier, args):
+    """
+    Compare full-resolution and downscale-first preprocessing on a JPEG
+    upload, reporting latency and output parity for both pipelines
+    """
+    from model_utils import preprocess_image, enhanced_preprocess_image
+
+    buffer = io.BytesIO()
+    make_synthetic_image(args.width, args.height).save(buffer, format="JPEG", quality=90)
+    data = buffer.getvalue()
+
+    def decode():
+        # Fresh, undecoded image each call so JPEG draft mode can apply
+        return Image.open(io.BytesIO(data))
+
+    print(f"{args.width}x{args.height} JPEG ({len(data) / 1e6:.1f} MB)")
+    for name, fn in (("enhanced", enhanced_preprocess_image), ("standard", preprocess_image)):
+        full = summarize(time_call(lambda: fn(decode(), downscale_first=False), args.runs, warmup=1))
+        fast = summarize(time_call(lambda: fn(decode(), downscale_first=True), args.runs, warmup=1))
+        print_summary(f"{name} full resolution", full)
+        print_summary(f"{name} downscale first", fast)
+
+        reference = np.asarray(fn(decode(), downscale_first=False))
+        candidate = np.asarray(fn(decode(), downscale_first=True))
+        diff = np.abs(reference - candidate)
+        same_top1 = (classifier.run_model(reference).argmax() ==
+                     classifier.run_model(candidate).argmax())
+        print(f"  speedup {full['mean_ms'] / fast['mean_ms']:.1f}x   "
+              f"mean |diff| {diff.mean():.4f}   max |diff| {diff.max():.4f}   "
+              f"same top-1 class: {bool(same_top1)}\n")
+
+
+def bench_scaling(args):
+    """
+    Compare the fused uint8 -> [-1, 1] conversion into a preallocated batch
+    buffer with the previous float round-trip through preprocess_input, and
+    check that both produce exactly the same values
+
+    Exits with status 1 if any value differs.
+    """
+    from model_utils import MODEL_RANGE_LUT, scale_to_model_range
+
+    try:
+        from tensorflow.keras.applications.mobilenet_v2 import preprocess_input
+    except ImportError:
+        # Same arithmetic Keras uses
+        def preprocess_input(x):
+            return x / 127.5 - 1.0
+
+    rng = np.random.default_rng(0)
+    images = rng.integers(0, 256, size=(args.images, 224, 224, 3), dtype=np.uint8)
+    # Every possible pixel value, so the whole lookup table is checked
+    images[0].reshape(-1)[:256] = np.arange(256, dtype=np.uint8)
+
+    def round_trip():
+        rows = []
+        for pixels in images:
+            img_array = np.expand_dims(pixels.astype(np.float32) / 255.0, axis=0)
+            rows.append(np.asarray(preprocess_input(img_array * 255.0)))
+        return np.concatenate(rows, axis=0)
+
+    buffer = np.empty(images.shape, dtype=np.float32)
+
+    def fused():
+        for pixels, row in zip(images, buffer):
+            scale_to_model_range(pixels, out=row)
+        return buffer
+
+    old = summarize(time_call(round_trip, args.runs))
+    new = summarize(time_call(fused, args.runs))
+    print(f"{args.images} images of 224x224")
+    print_summary("float round-trip + concatenate", old)
+    print_summary("fused into batch buffer", new)
+
+    diff = np.abs(round_trip() - fused())
+    lut_diff = np.abs(np.asarray(preprocess_input(np.arange(256, dtype=np.float32))) - MODEL_RANGE_LUT)
+    print(f"  speedup {old['mean_ms'] / new['mean_ms']:.1f}x   max |diff| {diff.max():g}   "
+          f"lookup table max |diff| {lut_diff.max():g}")
+    if diff.max() or lut_diff.max():
+        print("Fused conversion does not match the previous preprocessing")
+        sys.exit(1)
+
+
+def quality_variants(width, height):
+    """
+    Synthetic uploads spanning the quality checks: original, blurred, dark,
+    overexposed and flat images, each as encoded JPEG bytes
+    """
+    base = make_synthetic_image(width, height)
+    variants = {
+        "original": base,
+        "slight blur": base.filter(ImageFilter.GaussianBlur(max(width, height) / 2000)),
+        "heavy blur": base.filter(ImageFilter.GaussianBlur(max(width, height) / 200)),
+        "dark": ImageEnhance.Brightness(base).enhance(0.25),
+        "overexposed": ImageEnhance.Brightness(base).enhance(2.5),
+        "flat": ImageEnhance.Contrast(base.filter(ImageFilter.GaussianBlur(8))).enhance(0.2),
+    }
+    encoded = {}
+    for name, image in variants.items():
+        buffer = io.BytesIO()
+        image.save(buffer, format="JPEG", quality=90)
+        encoded[name] = buffer.getvalue()
+    return encoded
+
+
+def bench_quality(args):
+    """
+    Compare exact and fast quality assessment: latency, per-stage timing
+    breakdown and agreement of the accept/reject verdict
+    """
+    from model_utils import assess_image_quality, QUALITY_REJECT_THRESHOLD
+
+    print(f"{args.width}x{args.height} JPEG uploads")
+    agreements = 0
+    variants = quality_variants(args.width, args.height)
+    for name, data in variants.items():
+        row = {}
+        for fast in (False, True):
+            timings = {}
+            score, issues = assess_image_quality(Image.open(io.BytesIO(data)), fast=fast, timings=timings)
+            stats = summarize(time_call(
+                lambda: assess_image_quality(Image.open(io.BytesIO(data)), fast=fast),
+                args.runs, warmup=1
+            ))
+            row[fast] = (score, issues, stats, timings)
+
+        exact, fast = row[False], row[True]
+        same_verdict = ((exact[0] < QUALITY_REJECT_THRESHOLD) == (fast[0] < QUALITY_REJECT_THRESHOLD))
+        agreements += same_verdict
+        print(f"\n[{name}] exact score {exact[0]:.0f} {exact[1]}")
+        print(f"{'':<{len(name) + 3}}fast  score {fast[0]:.0f} {fast[1]}  same verdict: {same_verdict}")
+        print_summary("  exact", exact[2])
+        print_summary("  fast", fast[2])
+        for label, timings in (("exact", exact[3]), ("fast", fast[3])):
+            breakdown = "  ".join(f"{stage} {seconds * 1000:.1f}ms" for stage, seconds in timings.items())
+            print(f"  {label} stages: {breakdown}")
+
+    print(f"\nVerdict agreement: {agreements}/{len(variants)}")
+
+
+def bench_pipeline(classifier, args):
+    """
+    Compare predict_batch on one core against the multi-process pipeline on
+    encoded JPEG uploads, checking that both produce the same results
+    """
+    from parallel_pipeline import ParallelPipeline
+
+    uploads = []
+    for seed in range(args.images):
+        buffer = io.BytesIO()
+        make_synthetic_image(args.width, args.height, seed=seed).save(buffer, format="JPEG", quality=90)
+        uploads.append(buffer.getvalue())
+
+    start = time.perf_counter()
+    reference = classifier.predict_batch([Image.open(io.BytesIO(data)) for data in uploads])
+    serial = time.perf_counter() - start
+    print(f"{args.images} {args.width}x{args.height} JPEGs")
+    print(f"{'predict_batch (1 process)':<32} {args.images / serial:8.1f} images/s")
+
+    with ParallelPipeline(classifier, workers=args.workers) as pipeline:
+        # Warm-up pass pays for spawning workers and importing TensorFlow there
+        list(pipeline.classify(uploads[:pipeline.workers]))
+        start = time.perf_counter()
+        results = list(pipeline.classify(uploads))
+        parallel = time.perf_counter() - start
+        print(f"{f'pipeline ({pipeline.workers} workers)':<32} {args.images / parallel:8.1f} images/s   "
+              f"speedup {serial / parallel:.2f}x")
+
+    print(f"Identical results: {sum(a == b for a, b in zip(reference, results))}/{args.images}")
+
+
+def encode_jpeg(image, quality=90):
+    buffer = io.BytesIO()
+    image.save(buffer, format="JPEG", quality=quality)
+    return buffer.getvalue()
+
+
+def run_suite(classifier, args):
+    """
+    Measure every pipeline stage and the end-to-end path at each resolution
+    and batch size
+
+    Each case times one call over ``batch`` images and reports per-call
+    latency percentiles plus throughput in images/s. Stages get freshly
+    decoded inputs so ImageContext memoization never hides work.
+
+    Returns:
+        dict: Benchmark metadata, per-case statistics and the peak RSS of
+            the whole run (a process-lifetime high-water mark, so it is not
+            broken down per case)
+    """
+    import tensorflow as tf
+    from model_utils import ImageContext, assess_image_quality, enhanced_preprocess_image, preprocess_image
+
+    batch_sizes = [int(size) for size in args.batch_sizes.split(",")]
+    resolutions = [tuple(int(side) for side in res.split("x")) for res in args.resolutions.split(",")]
+    results = {}
+
+    def record(name, batch, samples):
+        stats = summarize(samples)
+        stats["images_per_s"] = batch * 1000.0 / stats["mean_ms"]
+        results[name] = stats
+        print_summary(name, stats)
+
+    def runs_for(batch):
+        return max(5, args.runs // batch)
+
+    for width, height in resolutions:
+        uploads = [encode_jpeg(make_synthetic_image(width, height, seed=seed)) for seed in range(max(batch_sizes))]
+        decoded = []
+        for data in uploads:
+            image = Image.open(io.BytesIO(data))
+            image.load()
+            decoded.append(image)
+
+        for batch in batch_sizes:
+            prefix = f"{width}x{height}/b{batch}"
+            runs = runs_for(batch)
+            stages = {
+                "decode": lambda: [ImageContext.of(Image.open(io.BytesIO(data))).working().load() for data in uploads[:batch]],
+                "quality": lambda: [assess_image_quality(ImageContext.of(image)) for image in decoded[:batch]],
+                "enhanced_preprocess": lambda: [enhanced_preprocess_image(ImageContext.of(image)) for image in decoded[:batch]],
+                "standard_preprocess": lambda: [preprocess_image(ImageContext.of(image)) for image in decoded[:batch]],
+            }
+            for stage, fn in stages.items():
+                record(f"{stage}/{prefix}", batch, time_call(fn, runs, warmup=1))
+
+            if batch == 1:
+                e2e = lambda: classifier.predict(Image.open(io.BytesIO(uploads[0])))
+            else:
+                e2e = lambda: classifier.predict_batch([Image.open(io.BytesIO(data)) for data in uploads[:batch]])
+            record(f"end_to_end/{prefix}", batch, time_call(e2e, runs, warmup=1))
+
+    # The forward pass only sees 224x224 inputs, so it is resolution independent
+    for batch in batch_sizes:
+        ensemble = np.zeros((2 * batch, 224, 224, 3), dtype=np.float32)
+        record(f"inference/b{batch}", batch, time_call(lambda: classifier.run_model(ensemble), runs_for(batch)))
+
+    return {
+        "meta": {
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "python": platform.python_version(),
+            "tensorflow": tf.__version__,
+            "numpy": np.__version__,
+            "machine": platform.machine(),
+            "cpu_count": os.cpu_count(),
+            "backend": classifier.backend,
+            "runs": args.runs,
+        },
+        "peak_rss_mb": peak_rss_mb(),
+        "results": results,
+    }
+
+
+def compare_results(current, baseline, threshold, metric="p50_ms"):
+    """
+    Compare two suite results case by case
+
+    Args:
+        current: Suite output of the candidate
+        baseline: Stored suite output to compare against
+        threshold: Allowed relative slowdown, e.g. 0.1 for 10%
+        metric: Latency statistic to compare
+
+    Returns:
+        list: (case, baseline value, current value, ratio) for every case
+            slower than the threshold allows
+    """
+    regressions = []
+    print(f"\n{'case':<40} {'baseline':>10} {'current':>10} {'change':>8}")
+    for name, stats in current["results"].items():
+        reference = baseline["results"].get(name)
+        if reference is None:
+            continue
+        ratio = stats[metric] / reference[metric]
+        flag = "  REGRESSION" if ratio > 1 + threshold else ""
+        print(f"{name:<40} {reference[metric]:>8.2f}ms {stats[metric]:>8.2f}ms {(ratio - 1) * 100:>+7.1f}%{flag}")
+        if flag:
+            regressions.append((name, reference[metric], stats[metric], ratio))
+
+    rss_ratio = current["peak_rss_mb"] / baseline["peak_rss_mb"]
+    print(f"{'peak RSS':<40} {baseline['peak_rss_mb']:>8.0f}MB {current['peak_rss_mb']:>8.0f}MB "
+          f"{(rss_ratio - 1) * 100:>+7.1f}%")
+    if rss_ratio > 1 + threshold:
+        regressions.append(("peak_rss_mb", baseline["peak_rss_mb"], current["peak_rss_mb"], rss_ratio))
+    return regressions
+
+
+def check_baseline(current, args):
+    """Compare against --baseline and exit non-zero on regressions"""
+    with open(args.baseline) as f:
+        baseline = json.load(f)
+    regressions = compare_results(current, baseline, args.threshold, args.metric)
+    if regressions:
+        print(f"\n{len(regressions)} case(s) regressed by more than {args.threshold * 100:.0f}%")
+        sys.exit(1)
+    print(f"\nNo regressions beyond {args.threshold * 100:.0f}%")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Animal Classify latency benchmarks")
+    parser.add_argument("benchmark", choices=["ensemble", "inference", "agreement", "preprocess", "quality", "scaling", "pipeline", "suite", "compare"], help="Benchmark to run")
+    parser.add_argument("--runs", type=int, default=30, help="Timed iterations per case")
+    parser.add_argument("--width", type=int, default=640, help="Synthetic image width")
+    parser.add_argument("--height", type=int, default=480, help="Synthetic image height")
+    parser.add_argument("--imagenet", action="store_true",
+                        help="Use ImageNet weights instead of random initialization")
+    parser.add_argument("--weights", default=None,
+                        help="Weights file to use instead of random initialization")
+    parser.add_argument("--quantization", choices=["dynamic", "int8"], default=None,
+                        help="TFLite quantization mode for the agreement report")
+    parser.add_argument("--threads", type=int, default=None, help="TFLite interpreter threads")
+    parser.add_argument("--images-dir", default=None,
+                        help="Photos the agreement report runs on (default: attached_assets)")
+    parser.add_argument("--calibration-dir", default=None,
+                        help="Photos int8 is calibrated on (default: attached_assets)")
+    parser.add_argument("--images", type=int, default=32,
+                        help="Images for the scaling and pipeline benchmarks")
+    parser.add_argument("--workers", type=int, default=None, help="Preprocessing processes for the pipeline benchmark")
+    parser.add_argument("--resolutions", default="640x480,1920x1080,4000x3000",
+                        help="Comma-separated WIDTHxHEIGHT list for the suite")
+    parser.add_argument("--batch-sizes", default="1,8,32", help="Comma-separated batch sizes for the suite")
+    parser.add_argument("--output", default=None, help="Suite result JSON to write (or read, for compare)")
+    parser.add_argument("--baseline", default=None, help="Stored suite result to compare against")
+    parser.add_argument("--threshold", type=float, default=0.10,
+                        help="Allowed relative slowdown before a case counts as a regression")
+    parser.add_argument("--metric", choices=["mean_ms", "p50_ms", "p95_ms", "p99_ms"], default="p50_ms",
+                        help="Latency statistic compared against the baseline")
+    args = parser.parse_args()
+    weights = args.weights or ("imagenet" if args.imagenet else None)
+
+    # Random weights give a near-uniform softmax that any backend matches
+    if args.benchmark == "agreement" and weights is None:
+        parser.error("agreement needs real weights: pass --imagenet or --weights")
+
+    if args.benchmark == "quality":
+        bench_quality(args)
+        return
+    if args.benchmark == "scaling":
+        bench_scaling(args)
+        return
+    if args.benchmark == "compare":
+        if not args.output or not args.baseline:
+            parser.error("compare needs --output and --baseline")
+        with open(args.output) as f:
+            check_baseline(json.load(f), args)
+        return
+
+    from animal_classifier import AnimalClassifier
+
+    if args.benchmark == "suite":
+        # Random weights unless asked otherwise, so the suite never downloads;
+        # the result cache is off so every run does the full work
+        classifier = AnimalClassifier(weights=weights, result_cache_size=0)
+        current = run_suite(classifier, args)
+        if args.output:
+            with open(args.output, "w") as f:
+                json.dump(current, f, indent=2)
+            print(f"\nWrote {args.output}")
+        if args.baseline:
+            check_baseline(current, args)
+        return
+
+    # The same image is classified on every run, so the result cache must be off
+    classifier = AnimalClassifier(weights=weights, result_cache_size=0)
+    image = make_synthetic_image(args.width, args.height)
+
+    if args.benchmark == "ensemble":
+        bench_ensemble(classifier, image, args.runs)
+    elif args.benchmark == "inference":
+        bench_inference(classifier, image, args.runs)
+    elif args.benchmark == "agreement":
+        bench_agreement(classifier, args)
+    elif args.benchmark == "preprocess":
+        bench_preprocess(classifier, args)
+    elif args.benchmark == "pipeline":
+        bench_pipeline(classifier, args)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,338 @@
+#!/usr/bin/env python3
+"""
+Bulk classification of images on disk
+
+Walks directories, glob patterns and tar/zip archives lazily and writes one
+result per image to a JSONL or CSV file as it goes. Usage:
+
+    python classify.py photos/ --output results.jsonl
+    python classify.py "farm/**/*.jpg" herd.tar.gz --output results.csv --workers 4
+    python classify.py photos/ --output results.jsonl --resume
+
+Progress is checkpointed next to the output file; --resume continues after
+the last checkpoint instead of starting from zero.
+"""
+import argparse
+import csv
+import glob
+import io
+import json
+import logging
+import os
+import tarfile
+import time
+import zipfile
+from collections import Counter, deque
+
+from PIL import Image
+
+from metrics import REGISTRY
+
+logger = logging.getLogger(__name__)
+
+IMAGE_EXTENSIONS = ('.jpg', '.jpeg', '.png', '.bmp', '.gif', '.webp', '.tif', '.tiff')
+TAR_SUFFIXES = ('.tar', '.tar.gz', '.tgz', '.tar.bz2', '.tbz2', '.tar.xz', '.txz')
+CSV_FIELDS = ('id', 'status', 'label', 'confidence', 'quality_score', 'top_predictions')
+
+
+def is_image_name(name):
+    return name.lower().endswith(IMAGE_EXTENSIONS)
+
+
+def open_payload(payload):
+    """Open what a loader returned (a file path or encoded bytes) as a PIL image"""
+    return Image.open(payload if isinstance(payload, str) else io.BytesIO(payload))
+
+
+def _path_loader(path):
+    return lambda: path
+
+
+def iter_directory(path):
+    """Yield (id, loader) for every image under a directory, in sorted order"""
+    for root, dirs, files in os.walk(path):
+        dirs.sort()
+        for name in sorted(files):
+            if is_image_name(name):
+                file_path = os.path.join(root, name)
+                yield file_path, _path_loader(file_path)
+
+
+def iter_tar(path):
+    """
+    Yield (id, loader) for image members of a tar archive
+
+    The archive is opened in streaming mode, so members are read strictly in
+    order and never all at once; a loader must be called before advancing.
+    """
+    with tarfile.open(path, 'r|*') as archive:
+        for member in archive:
+            if member.isfile() and is_image_name(member.name):
+                yield f"{path}::{member.name}", (lambda m=member: archive.extractfile(m).read())
+
+
+def iter_zip(path):
+    """Yield (id, loader) for image members of a zip archive"""
+    with zipfile.ZipFile(path) as archive:
+        for info in archive.infolist():
+            if not info.is_dir() and is_image_name(info.filename):
+                yield f"{path}::{info.filename}", (lambda i=info: archive.read(i))
+
+
+def iter_sources(inputs):
+    """
+    Expand inputs into a lazy, deterministic stream of images
+
+    Args:
+        inputs: Directories, image files, tar/zip archives or glob patterns
+
+    Yields:
+        tuple: (id, loader) where loader() returns a file path or the
+            encoded bytes of an archive member
+    """
+    for item in inputs:
+        if os.path.isdir(item):
+            yield from iter_directory(item)
+        elif os.path.isfile(item):
+            lower = item.lower()
+            if lower.endswith(TAR_SUFFIXES):
+                yield from iter_tar(item)
+            elif lower.endswith('.zip'):
+                yield from iter_zip(item)
+            else:
+                yield item, _path_loader(item)
+        else:
+            matches = sorted(glob.glob(item, recursive=True))
+            if not matches:
+                logger.warning(f"No files match {item}")
+            for path in matches:
+                if os.path.isfile(path) and is_image_name(path):
+                    yield path, _path_loader(path)
+
+
+class ResultWriter:
+    """
+    Append-only JSONL or CSV result file with crash-safe checkpoints
+
+    The checkpoint records how many inputs are done, the id of the last one
+    and the output size at that moment. Resuming truncates anything written
+    after the checkpoint, so a crash never leaves duplicate or partial rows.
+    """
+
+    def __init__(self, path, output_format, inputs, resume=False):
+        """
+        Args:
+            path: Output file
+            output_format: 'jsonl' or 'csv'
+            inputs: Command-line inputs, stored in the checkpoint so a resume
+                with different inputs is refused
+            resume: Continue from the last checkpoint instead of starting over
+        """
+        self.path = path
+        self.format = output_format
+        self.inputs = list(inputs)
+        self.checkpoint_path = path + '.checkpoint'
+        self.completed = 0
+        self.last_id = None
+
+        output_bytes = 0
+        if resume and os.path.exists(self.checkpoint_path):
+            with open(self.checkpoint_path) as f:
+                checkpoint = json.load(f)
+            if checkpoint['inputs'] != self.inputs or checkpoint['format'] != self.format:
+                raise ValueError("Checkpoint was written for different inputs or format")
+            self.completed = checkpoint['completed']
+            self.last_id = checkpoint.get('last_id')
+            output_bytes = checkpoint['output_bytes']
+            logger.info(f"Resuming after {self.completed} images")
+
+        self._file = open(path, 'a+' if output_bytes else 'w', newline='')
+        self._file.truncate(output_bytes)
+        self._file.seek(output_bytes)
+        self._csv = csv.writer(self._file) if output_format == 'csv' else None
+        if self._csv is not None and output_bytes == 0:
+            self._csv.writerow(CSV_FIELDS)
+
+    def write(self, source_id, result):
+        row = result.to_dict()
+        if self._csv is not None:
+            top = ';'.join(f"{p['label']}:{p['confidence']:.2f}" for p in row['top_predictions'])
+            quality = '' if row['quality_score'] is None else f"{row['quality_score']:.0f}"
+            self._csv.writerow((source_id, row['status'], row['label'], f"{row['confidence']:.4f}", quality, top))
+        else:
+            self._file.write(json.dumps({"id": source_id, **row}) + '\n')
+        self.completed += 1
+        self.last_id = source_id
+
+    def checkpoint(self):
+        """Flush results to disk, then atomically record the progress"""
+        self._file.flush()
+        os.fsync(self._file.fileno())
+        checkpoint = {
+            "inputs": self.inputs,
+            "format": self.format,
+            "completed": self.completed,
+            "last_id": self.last_id,
+            "output_bytes": self._file.tell(),
+        }
+        tmp_path = self.checkpoint_path + '.tmp'
+        with open(tmp_path, 'w') as f:
+            json.dump(checkpoint, f)
+        os.replace(tmp_path, self.checkpoint_path)
+
+    def close(self):
+        self.checkpoint()
+        self._file.close()
+
+
+def skip_completed(items, writer):
+    """
+    Advance past the items a resumed writer already has results for
+
+    Skipped items are never loaded; archive members are streamed past.
+
+    Args:
+        items: Iterator of (id, loader) as from iter_sources
+        writer: ResultWriter, possibly resumed from a checkpoint
+
+    Raises:
+        ValueError: If the last skipped item is not the one the checkpoint
+            recorded, i.e. files were added, renamed or removed since
+    """
+    source_id = None
+    for _, (source_id, _) in zip(range(writer.completed), items):
+        pass
+    if writer.completed and source_id != writer.last_id:
+        raise ValueError(f"Input {writer.completed} is now {source_id!r}, not {writer.last_id!r} as when "
+                         f"the checkpoint was written; the inputs changed, so start over without --resume")
+
+
+def classify_serial(classifier, items, batch_size):
+    """
+    Classify (id, loader) items in-process, one predict_batch call per chunk
+
+    Yields:
+        tuple: (id, result) in input order
+    """
+    chunk = []
+    for source_id, load in items:
+        chunk.append((source_id, load()))
+        if len(chunk) == batch_size:
+            yield from _classify_chunk(classifier, chunk)
+            chunk = []
+    if chunk:
+        yield from _classify_chunk(classifier, chunk)
+
+
+def _classify_chunk(classifier, chunk):
+    images = []
+    for _, payload in chunk:
+        try:
+            images.append(open_payload(payload))
+        except Exception as e:
+            images.append(e)
+
+    # Undecodable files get an error result without holding up the chunk
+    decodable = [image for image in images if not isinstance(image, Exception)]
+    results = iter(classifier.predict_batch(decodable, batch_size=len(chunk)))
+    for (source_id, _), image in zip(chunk, images):
+        if isinstance(image, Exception):
+            yield source_id, classifier._error_result(image, stage='decode')
+        else:
+            yield source_id, next(results)
+
+
+def classify_parallel(pipeline, items):
+    """
+    Classify (id, loader) items through a ParallelPipeline
+
+    Yields:
+        tuple: (id, result) in input order
+    """
+    pending_ids = deque()
+
+    def payloads():
+        for source_id, load in items:
+            pending_ids.append(source_id)
+            yield load()
+
+    for result in pipeline.classify(payloads()):
+        yield pending_ids.popleft(), result
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Classify cow and buffalo images in bulk")
+    parser.add_argument("inputs", nargs="+", help="Directories, images, tar/zip archives or glob patterns")
+    parser.add_argument("--output", required=True, help="Result file (.jsonl or .csv)")
+    parser.add_argument("--format", choices=["jsonl", "csv"], default=None,
+                        help="Output format (default: from the output file extension)")
+    parser.add_argument("--batch-size", type=int, default=32, help="Images per forward pass")
+    parser.add_argument("--workers", type=int, default=0,
+                        help="Preprocessing processes (0 preprocesses in-process)")
+    parser.add_argument("--checkpoint-every", type=int, default=1000, help="Images between checkpoints")
+    parser.add_argument("--resume", action="store_true", help="Continue from the last checkpoint")
+    parser.add_argument("--backend", choices=["keras", "tflite"], default="keras", help="Inference backend")
+    parser.add_argument("--tta", default="0",
+                        help="Extra test-time views per image, or 'auto' to fit --tta-budget-ms (in-process only)")
+    parser.add_argument("--tta-budget-ms", type=float, default=None, help="Per-image latency budget for --tta auto")
+    parser.add_argument("--head", default=None,
+                        help="Trained head from animal_head.py to use instead of the ImageNet mapping")
+    parser.add_argument("--metrics", default=None,
+                        help="Write Prometheus-format stage timings and counters here at each checkpoint")
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO)
+
+    from animal_classifier import AnimalClassifier, parse_tta
+    try:
+        tta = parse_tta(args.tta)
+    except ValueError:
+        parser.error("--tta must be a view count or 'auto'")
+    if tta and args.workers > 0:
+        parser.error("--tta is not supported with --workers")
+
+    output_format = args.format or ('csv' if args.output.lower().endswith('.csv') else 'jsonl')
+    writer = ResultWriter(args.output, output_format, args.inputs, resume=args.resume)
+
+    items = iter_sources(args.inputs)
+    skip_completed(items, writer)
+
+    classifier = AnimalClassifier(backend=args.backend, result_cache_size=0,
+                                  tta=tta, tta_budget_ms=args.tta_budget_ms, head=args.head)
+
+    pipeline = None
+    if args.workers > 0:
+        from parallel_pipeline import ParallelPipeline
+        pipeline = ParallelPipeline(classifier, workers=args.workers, batch_size=args.batch_size)
+        results = classify_parallel(pipeline, items)
+    else:
+        results = classify_serial(classifier, items, args.batch_size)
+
+    labels = Counter()
+    start = time.perf_counter()
+    done = 0
+    try:
+        for source_id, result in results:
+            writer.write(source_id, result)
+            labels[result.status if result.is_error else result.label] += 1
+            done += 1
+            if writer.completed % args.checkpoint_every == 0:
+                writer.checkpoint()
+                if args.metrics:
+                    REGISTRY.dump(args.metrics)
+                logger.info(f"{writer.completed} images done "
+                            f"({done / (time.perf_counter() - start):.1f} images/s)")
+    finally:
+        writer.close()
+        if pipeline is not None:
+            pipeline.close()
+        if args.metrics:
+            REGISTRY.dump(args.metrics)
+
+    elapsed = time.perf_counter() - start
+    print(f"Classified {done} images in {elapsed:.1f}s ({done / elapsed if elapsed else 0:.1f} images/s)")
+    for label, count in labels.most_common():
+        print(f"  {label:<40} {count}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,464 @@
+#!/usr/bin/env python3
+"""
+Clip-level classification of videos, animated images and burst sequences
+
+Frames are decoded one at a time, sampled adaptively (a frame is only kept
+when it differs enough from the last kept one) and classified in batches
+through AnimalClassifier.predict_batch. Per-frame Cow/Buffalo scores are
+folded into running totals, so memory stays constant however long the clip
+is. Usage:
+
+    python clip_classifier.py barn_cam.mp4
+    python clip_classifier.py burst.gif --max-fps 8 --json
+"""
+import argparse
+import io
+import json
+import logging
+import os
+from dataclasses import dataclass, field
+
+import numpy as np
+from PIL import Image, ImageSequence
+
+from metrics import timed
+from model_utils import ANIMAL_LABEL_NAMES, ImageContext, OPENCV_AVAILABLE
+
+if OPENCV_AVAILABLE:
+    import cv2
+
+logger = logging.getLogger(__name__)
+
+VIDEO_EXTENSIONS = ('.mp4', '.mov', '.avi', '.mkv', '.webm', '.m4v')
+
+# Candidate frames per second of footage; the rest are skipped undecoded
+# where the container allows it
+DEFAULT_MAX_FPS = 4.0
+
+# Mean absolute difference (0-255) of 32x32 grayscale thumbnails below which
+# a frame counts as a near-duplicate of the last kept frame
+DUPLICATE_DIFF_THRESHOLD = 6.0
+
+# Keep a frame at least this often (seconds) even in a static scene
+MAX_FRAME_GAP = 5.0
+
+# Kept frames are shrunk to this longest side before they wait for a batch
+FRAME_MAX_SIDE = 640
+
+# A clip is only called a cow or buffalo when at least this fraction of its
+# classified frames is
+MIN_ANIMAL_FRACTION = 0.3
+
+# Frame delay assumed for animated images and bursts that don't state one
+DEFAULT_FRAME_DURATION = 0.1
+
+
+def _to_rgb_array(frame):
+    if isinstance(frame, np.ndarray):
+        return frame
+    return np.asarray(frame if frame.mode == 'RGB' else frame.convert('RGB'))
+
+
+def iter_video_frames(path, max_fps=DEFAULT_MAX_FPS):
+    """
+    Stream candidate frames of a video file with OpenCV
+
+    Frames between candidates are grabbed but never converted to RGB.
+
+    Args:
+        path: Video file path
+        max_fps: Candidate frames per second of footage
+
+    Yields:
+        tuple: (frame index, timestamp in seconds, RGB uint8 array)
+    """
+    if not OPENCV_AVAILABLE:
+        raise Exception("OpenCV is required to decode video")
+    capture = cv2.VideoCapture(path)
+    if not capture.isOpened():
+        raise Exception(f"Could not open video: {path}")
+    try:
+        fps = capture.get(cv2.CAP_PROP_FPS) or 0
+        if fps <= 0:
+            fps = 1.0 / DEFAULT_FRAME_DURATION
+        step = max(1, round(fps / max_fps)) if max_fps else 1
+        index = 0
+        while True:
+            if index % step:
+                if not capture.grab():
+                    return
+            else:
+                ok, frame = capture.read()
+                if not ok:
+                    return
+                yield index, index / fps, cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
+            index += 1
+    finally:
+        capture.release()
+
+
+def iter_image_frames(image, max_fps=DEFAULT_MAX_FPS):
+    """
+    Stream candidate frames of an animated or multi-page image
+
+    Args:
+        image: PIL Image (GIF, APNG, WebP, multi-page TIFF, or a still)
+        max_fps: Candidate frames per second of animation
+
+    Yields:
+        tuple: (frame index, timestamp in seconds, RGB uint8 array)
+    """
+    min_interval = 1.0 / max_fps if max_fps else 0.0
+    timestamp = 0.0
+    next_candidate = 0.0
+    for index, frame in enumerate(ImageSequence.Iterator(image)):
+        if timestamp >= next_candidate:
+            next_candidate = timestamp + min_interval
+            yield index, timestamp, _to_rgb_array(frame)
+        timestamp += (frame.info.get('duration') or DEFAULT_FRAME_DURATION * 1000) / 1000.0
+
+
+def iter_burst_frames(images):
+    """
+    Stream the images of a burst sequence, opening each only when reached
+
+    Args:
+        images: Iterable of file paths, encoded bytes or PIL Images
+
+    Yields:
+        tuple: (frame index, position in the burst, RGB uint8 array)
+    """
+    for index, image in enumerate(images):
+        if isinstance(image, (bytes, bytearray)):
+            image = Image.open(io.BytesIO(image))
+        elif isinstance(image, (str, os.PathLike)):
+            image = Image.open(image)
+        yield index, float(index), _to_rgb_array(image)
+
+
+def iter_frames(source, max_fps=DEFAULT_MAX_FPS):
+    """
+    Stream candidate frames from any supported clip source
+
+    Args:
+        source: Video file path, animated image (path, bytes or PIL Image),
+            or a list/iterable of burst images
+        max_fps: Candidate frames per second of footage
+
+    Yields:
+        tuple: (frame index, timestamp in seconds, RGB uint8 array)
+    """
+    if isinstance(source, (str, os.PathLike)):
+        if str(source).lower().endswith(VIDEO_EXTENSIONS):
+            yield from iter_video_frames(str(source), max_fps)
+            return
+        with Image.open(source) as image:
+            yield from iter_image_frames(image, max_fps)
+    elif isinstance(source, (bytes, bytearray)):
+        with Image.open(io.BytesIO(source)) as image:
+            yield from iter_image_frames(image, max_fps)
+    elif isinstance(source, Image.Image):
+        yield from iter_image_frames(source, max_fps)
+    else:
+        yield from iter_burst_frames(source)
+
+
+def shrink_frame(pixels, max_side=FRAME_MAX_SIDE):
+    """
+    Downscale an RGB frame to at most max_side with an area filter
+
+    Returns:
+        np.ndarray: RGB uint8 array (the input itself if already small enough)
+    """
+    height, width = pixels.shape[:2]
+    if max(height, width) <= max_side:
+        return pixels
+    ratio = max_side / max(height, width)
+    size = (max(1, round(width * ratio)), max(1, round(height * ratio)))
+    if OPENCV_AVAILABLE:
+        return cv2.resize(pixels, size, interpolation=cv2.INTER_AREA)
+    return np.asarray(Image.fromarray(pixels).resize(size, Image.Resampling.BOX))
+
+
+class FrameSampler:
+    """
+    Drops near-duplicate frames with a cheap thumbnail difference
+
+    Each frame is compared with the last kept one on a 32x32 grayscale
+    thumbnail; slow drift still accumulates until it crosses the threshold.
+    """
+
+    def __init__(self, diff_threshold=DUPLICATE_DIFF_THRESHOLD, max_gap=MAX_FRAME_GAP, thumb_size=32):
+        """
+        Args:
+            diff_threshold: Mean absolute thumbnail difference (0-255) a
+                frame needs to be kept
+            max_gap: Keep a frame at least every max_gap seconds (None: never force)
+            thumb_size: Side of the square comparison thumbnail
+        """
+        self.diff_threshold = diff_threshold
+        self.max_gap = max_gap
+        self.thumb_size = thumb_size
+        self._last_thumb = None
+        self._last_time = None
+
+    def _thumbnail(self, pixels):
+        size = (self.thumb_size, self.thumb_size)
+        if OPENCV_AVAILABLE:
+            gray = cv2.cvtColor(pixels, cv2.COLOR_RGB2GRAY)
+            return cv2.resize(gray, size, interpolation=cv2.INTER_AREA).astype(np.int16)
+        return np.asarray(Image.fromarray(pixels).convert('L').resize(size, Image.Resampling.BOX), dtype=np.int16)
+
+    def keep(self, pixels, timestamp):
+        """
+        Decide whether a frame is worth classifying
+
+        Args:
+            pixels: RGB uint8 array
+            timestamp: Frame time in seconds
+
+        Returns:
+            bool: True if the frame should be kept
+        """
+        thumb = self._thumbnail(pixels)
+        if self._last_thumb is not None:
+            forced = self.max_gap is not None and timestamp - self._last_time >= self.max_gap
+            if not forced and np.abs(thumb - self._last_thumb).mean() < self.diff_threshold:
+                return False
+        self._last_thumb = thumb
+        self._last_time = timestamp
+        return True
+
+
+@dataclass(slots=True)
+class ClipResult:
+    """
+    Clip-level verdict aggregated over sampled frames
+
+    ``status`` is 'classified', 'not_animal', 'rejected' (every sampled frame
+    failed the quality check) or 'error'. ``scores`` holds the
+    quality-weighted mean confidence (percent) of each animal over frames
+    recognised as an animal, and ``votes`` how many of those frames each
+    animal won. ``frames_read`` counts candidate frames after the max_fps
+    thinning, ``frames_sampled`` those kept after near-duplicate dropping.
+    """
+
+    label: str
+    confidence: float = 0.0
+    status: str = 'classified'
+    scores: dict = field(default_factory=dict)
+    votes: dict = field(default_factory=dict)
+    frames_read: int = 0
+    frames_sampled: int = 0
+    frames_classified: int = 0
+    frames_animal: int = 0
+    frames_rejected: int = 0
+    frames_failed: int = 0
+    duration: float = 0.0
+    error: str = None
+
+    @property
+    def is_animal(self):
+        return self.status == 'classified'
+
+    def to_dict(self):
+        return {
+            "status": self.status,
+            "label": self.label,
+            "confidence": float(self.confidence),
+            "scores": {label: float(score) for label, score in self.scores.items()},
+            "votes": dict(self.votes),
+            "frames_read": self.frames_read,
+            "frames_sampled": self.frames_sampled,
+            "frames_classified": self.frames_classified,
+            "frames_animal": self.frames_animal,
+            "frames_rejected": self.frames_rejected,
+            "frames_failed": self.frames_failed,
+            "duration": float(self.duration),
+            "error": self.error,
+        }
+
+    def to_json(self):
+        return json.dumps(self.to_dict())
+
+
+class _ClipAggregate:
+    """Running totals of per-frame results; constant size per clip"""
+
+    def __init__(self):
+        self.weighted_scores = np.zeros(len(ANIMAL_LABEL_NAMES))
+        self.total_weight = 0.0
+        self.votes = np.zeros(len(ANIMAL_LABEL_NAMES), dtype=np.int64)
+        self.classified = 0
+        self.animal = 0
+        self.rejected = 0
+        self.failed = 0
+
+    def add(self, result):
+        if result.is_error:
+            self.failed += 1
+            return
+        if result.is_rejected:
+            self.rejected += 1
+            return
+        self.classified += 1
+        if not result.is_animal:
+            return
+
+        # Best confidence per animal among the frame's mapped predictions
+        scores = np.zeros(len(ANIMAL_LABEL_NAMES))
+        for name, confidence in result.top_predictions:
+            if name in ANIMAL_LABEL_NAMES:
+                position = ANIMAL_LABEL_NAMES.index(name)
+                scores[position] = max(scores[position], confidence)
+        if not scores.any():
+            return
+
+        weight = max(result.quality_score or 0.0, 1.0) / 100.0
+        self.weighted_scores += weight * scores
+        self.total_weight += weight
+        self.votes[scores.argmax()] += 1
+        self.animal += 1
+
+    def verdict(self, frames_read, frames_sampled, duration):
+        counts = dict(
+            frames_read=frames_read, frames_sampled=frames_sampled,
+            frames_classified=self.classified, frames_animal=self.animal,
+            frames_rejected=self.rejected, frames_failed=self.failed, duration=duration,
+        )
+        if not self.classified:
+            if self.rejected:
+                return ClipResult("Poor quality clip", status='rejected', **counts)
+            return ClipResult("Error: no frames could be classified", status='error',
+                              error="No frames could be classified", **counts)
+
+        votes = {name: int(count) for name, count in zip(ANIMAL_LABEL_NAMES, self.votes) if count}
+        if not self.animal or self.animal / self.classified < MIN_ANIMAL_FRACTION:
+            return ClipResult("Not a cow or buffalo", status='not_animal', votes=votes, **counts)
+
+        mean_scores = self.weighted_scores / self.total_weight
+        best = int(mean_scores.argmax())
+        return ClipResult(
+            ANIMAL_LABEL_NAMES[best], float(mean_scores[best]), status='classified',
+            scores={name: float(score) for name, score in zip(ANIMAL_LABEL_NAMES, mean_scores)},
+            votes=votes, **counts
+        )
+
+
+class ClipClassifier:
+    """
+    Classifies a whole clip with one AnimalClassifier
+
+    At most ``batch_size`` shrunk frames are held at a time; everything else
+    about the clip is kept as running totals.
+    """
+
+    def __init__(self, classifier, batch_size=16, max_fps=DEFAULT_MAX_FPS,
+                 diff_threshold=DUPLICATE_DIFF_THRESHOLD, max_gap=MAX_FRAME_GAP,
+                 max_frames=None, frame_max_side=FRAME_MAX_SIDE):
+        """
+        Args:
+            classifier: AnimalClassifier used for the frames
+            batch_size: Frames per predict_batch call
+            max_fps: Candidate frames per second of footage
+            diff_threshold: Near-duplicate threshold, see FrameSampler
+            max_gap: Longest stretch (seconds) without a kept frame
+            max_frames: Stop after this many sampled frames (None: whole clip)
+            frame_max_side: Longest side kept frames are shrunk to
+        """
+        if batch_size < 1:
+            raise ValueError("batch_size must be at least 1")
+        self.classifier = classifier
+        self.batch_size = batch_size
+        self.max_fps = max_fps
+        self.diff_threshold = diff_threshold
+        self.max_gap = max_gap
+        self.max_frames = max_frames
+        self.frame_max_side = frame_max_side
+
+    @timed('classify_clip')
+    def classify(self, source, on_frame=None):
+        """
+        Classify a clip
+
+        Args:
+            source: Video file path, animated image (path, bytes or PIL
+                Image) or an iterable of burst images
+            on_frame: Optional callback on_frame(frame_index, timestamp,
+                PredictionResult) for every sampled frame, in order
+
+        Returns:
+            ClipResult
+        """
+        sampler = FrameSampler(self.diff_threshold, self.max_gap)
+        aggregate = _ClipAggregate()
+        batch = []
+        read = sampled = 0
+        timestamp = 0.0
+
+        def flush():
+            results = self.classifier.predict_batch([context for _, _, context in batch], self.batch_size)
+            for (index, frame_time, _), result in zip(batch, results):
+                aggregate.add(result)
+                if on_frame is not None:
+                    on_frame(index, frame_time, result)
+            batch.clear()
+
+        try:
+            for index, timestamp, pixels in iter_frames(source, self.max_fps):
+                read += 1
+                if not sampler.keep(pixels, timestamp):
+                    continue
+                height, width = pixels.shape[:2]
+                small = shrink_frame(pixels, self.frame_max_side)
+                batch.append((index, timestamp, ImageContext(Image.fromarray(small), original_size=(width, height))))
+                sampled += 1
+                if len(batch) == self.batch_size:
+                    flush()
+                if self.max_frames is not None and sampled >= self.max_frames:
+                    break
+            if batch:
+                flush()
+        except Exception as e:
+            # A clip cut short (e.g. a truncated file) is judged on the frames read so far
+            logger.error(f"Error during clip classification: {str(e)}")
+            if not aggregate.classified and not aggregate.rejected:
+                return ClipResult(f"Error: {str(e)}", status='error', error=str(e),
+                                  frames_read=read, frames_sampled=sampled, duration=timestamp)
+
+        return aggregate.verdict(read, sampled, timestamp)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Classify cows and buffalo in a video clip or animated image")
+    parser.add_argument("clip", nargs="+", help="Video file, animated image, or several images forming a burst")
+    parser.add_argument("--max-fps", type=float, default=DEFAULT_MAX_FPS, help="Candidate frames per second")
+    parser.add_argument("--diff-threshold", type=float, default=DUPLICATE_DIFF_THRESHOLD,
+                        help="Mean thumbnail difference (0-255) below which a frame is a near-duplicate")
+    parser.add_argument("--max-frames", type=int, default=None, help="Stop after this many sampled frames")
+    parser.add_argument("--batch-size", type=int, default=16, help="Frames per forward pass")
+    parser.add_argument("--backend", choices=["keras", "tflite"], default="keras", help="Inference backend")
+    parser.add_argument("--json", action="store_true", help="Print the result as JSON")
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO)
+
+    from animal_classifier import AnimalClassifier
+    classifier = AnimalClassifier(backend=args.backend, result_cache_size=0)
+    clips = ClipClassifier(classifier, batch_size=args.batch_size, max_fps=args.max_fps,
+                           diff_threshold=args.diff_threshold, max_frames=args.max_frames)
+
+    source = args.clip[0] if len(args.clip) == 1 else args.clip
+    result = clips.classify(source)
+    if args.json:
+        print(result.to_json())
+        return
+    print(f"{result.label} ({result.confidence:.1f}%, {result.status})")
+    print(f"  {result.frames_read} candidate frames, {result.frames_sampled} sampled, "
+          f"{result.frames_animal}/{result.frames_classified} recognised as an animal, "
+          f"{result.frames_rejected} rejected")
+    for label, score in result.scores.items():
+        print(f"  {label:<10} {score:5.1f}%  ({result.votes.get(label, 0)} frames)")
+
+
+if __name__ == "__main__":
+    main()
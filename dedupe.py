@@ -0,0 +1,121 @@
+#!/usr/bin/env python3
+"""
+Find near-duplicate images in directories and archives
+
+Every image is embedded with the classifier's backbone (one forward pass of
+the standard preprocessing variant, no classification) and looked up in a
+cosine-similarity index of the images before it. Usage:
+
+    python dedupe.py photos/ herd.tar.gz --output duplicates.jsonl
+    python dedupe.py new_uploads/ --index archive_index --output duplicates.jsonl
+
+Each output line is {"id", "duplicate_of", "similarity"}, with duplicate_of
+null for the first image of each group. With --index, the index is kept in a
+memory-mapped file, so later runs also match against earlier runs.
+"""
+import argparse
+import json
+import logging
+import time
+
+from classify import iter_sources, open_payload
+from embedding_index import EmbeddingIndex
+
+logger = logging.getLogger(__name__)
+
+# Cosine similarity of pooled embeddings above which two images are duplicates
+DEFAULT_THRESHOLD = 0.95
+
+
+def dedupe(classifier, index, items, threshold=DEFAULT_THRESHOLD, batch_size=32):
+    """
+    Match a stream of images against an index, adding the new ones to it
+
+    Args:
+        classifier: Loaded AnimalClassifier
+        index: EmbeddingIndex with image ids as keys
+        items: Iterable of (id, loader) as from classify.iter_sources
+        threshold: Minimum cosine similarity of a duplicate
+        batch_size: Images per forward pass
+
+    Yields:
+        dict: {"id", "duplicate_of", "similarity"}, or {"id", "error"} for
+            images that could not be read or decoded, in input order
+    """
+    chunk = []
+
+    def flush():
+        readable = [image for _, image in chunk if not isinstance(image, Exception)]
+        # Truncated or corrupt images only fail once they are decoded
+        errors = {}
+        embeddings = classifier.embed(readable, batch_size=batch_size, errors=errors)
+        rows = iter(range(len(readable)))
+        for source_id, image in chunk:
+            row = None if isinstance(image, Exception) else next(rows)
+            error = image if row is None else errors.get(row)
+            if error is not None:
+                yield {"id": source_id, "error": str(error)}
+                continue
+            # Images within a chunk are matched against each other too
+            embedding = embeddings[row]
+            hit = index.nearest(embedding, threshold)
+            if hit is None:
+                index.add(embedding, key=source_id)
+                yield {"id": source_id, "duplicate_of": None, "similarity": None}
+            else:
+                row, similarity = hit
+                yield {"id": source_id, "duplicate_of": index.key(row), "similarity": round(similarity, 4)}
+
+    for source_id, load in items:
+        try:
+            image = open_payload(load())
+        except Exception as e:
+            image = e
+        chunk.append((source_id, image))
+        if len(chunk) == batch_size:
+            yield from flush()
+            chunk = []
+    if chunk:
+        yield from flush()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Find near-duplicate cow and buffalo images")
+    parser.add_argument("inputs", nargs="+", help="Directories, images, tar/zip archives or glob patterns")
+    parser.add_argument("--output", required=True, help="JSONL file of matches")
+    parser.add_argument("--threshold", type=float, default=DEFAULT_THRESHOLD,
+                        help="Cosine similarity above which images are duplicates")
+    parser.add_argument("--index", default=None,
+                        help="File prefix of a persistent memory-mapped index to match against and extend")
+    parser.add_argument("--batch-size", type=int, default=32, help="Images per forward pass")
+    parser.add_argument("--backend", choices=["keras", "tflite"], default="keras", help="Inference backend")
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO)
+    if not 0 < args.threshold <= 1:
+        parser.error("--threshold must be in (0, 1]")
+
+    from animal_classifier import AnimalClassifier
+    classifier = AnimalClassifier(backend=args.backend, result_cache_size=0)
+    # An index built by other weights, another backend or quantization is refused
+    index = EmbeddingIndex(path=args.index, metadata=classifier.feature_signature())
+    if len(index):
+        logger.info(f"Matching against {len(index)} indexed images")
+
+    start = time.perf_counter()
+    done = duplicates = 0
+    try:
+        with open(args.output, 'w') as f:
+            for row in dedupe(classifier, index, iter_sources(args.inputs), args.threshold, args.batch_size):
+                f.write(json.dumps(row) + '\n')
+                done += 1
+                duplicates += row.get("duplicate_of") is not None
+    finally:
+        index.flush()
+
+    elapsed = time.perf_counter() - start
+    print(f"Checked {done} images in {elapsed:.1f}s: {duplicates} near-duplicates, "
+          f"{len(index)} images in the index")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,207 @@
+import json
+import logging
+import os
+import threading
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+# Width of MobileNetV2's pooled features (the classifier head's input)
+EMBEDDING_DIM = 1280
+
+
+def normalize(vectors):
+    """
+    L2-normalize embeddings so a dot product is their cosine similarity
+
+    Args:
+        vectors: Array of shape (dim,) or (N, dim)
+
+    Returns:
+        np.ndarray: float32 array of the same shape
+    """
+    vectors = np.asarray(vectors, dtype=np.float32)
+    norms = np.linalg.norm(vectors, axis=-1, keepdims=True)
+    return vectors / np.maximum(norms, np.float32(1e-12))
+
+
+class EmbeddingIndex:
+    """
+    Cosine top-k search over L2-normalized embeddings
+
+    Vectors live in one contiguous float32 matrix, so a search is a single
+    matrix-vector product plus an argpartition. The matrix is held in memory,
+    or in a memory-mapped ``<path>.npy`` file with keys in ``<path>.json``
+    when a path is given, so an archive-sized index doesn't need to fit in RAM
+    and survives restarts.
+
+    With ``max_entries`` the index is a bounded ring: once full, each add
+    replaces the oldest entry. Otherwise it grows by doubling.
+    """
+
+    def __init__(self, dim=EMBEDDING_DIM, path=None, max_entries=None, initial_capacity=1024, metadata=None):
+        """
+        Args:
+            dim: Embedding width
+            path: File prefix for a persistent memory-mapped index, or None
+                to keep it in memory
+            max_entries: Bound on the number of entries (oldest replaced
+                first), or None to grow without limit
+            initial_capacity: Rows allocated up front when growing
+            metadata: Optional JSON-serializable description of what computed
+                the embeddings, persisted with the index; an existing index
+                with different metadata is refused
+        """
+        self.dim = dim
+        self.path = path
+        self.max_entries = max_entries
+        self.metadata = metadata
+        self._lock = threading.Lock()
+        self._count = 0
+        self._next = 0
+        self._keys = []
+        self._payloads = []
+
+        capacity = max_entries or initial_capacity
+        if path is not None and os.path.exists(path + '.npy') and not os.path.exists(path + '.json'):
+            # The vectors are written before their keys, so this is an index
+            # that was killed before its first flush
+            logger.warning(f"Index at {path} has no {path}.json; rebuilding it")
+        if path is not None and os.path.exists(path + '.npy') and os.path.exists(path + '.json'):
+            self._vectors = np.load(path + '.npy', mmap_mode='r+')
+            if self._vectors.shape[1] != dim:
+                raise ValueError(f"Index at {path} has dimension {self._vectors.shape[1]}, not {dim}")
+            with open(path + '.json') as f:
+                state = json.load(f)
+            if metadata is not None and state.get('metadata') != metadata:
+                raise ValueError(f"Index at {path} was built by {state.get('metadata')}, not {metadata}")
+            self._keys = state['keys']
+            self._count = len(self._keys)
+            self._next = state.get('next', self._count)
+            self._payloads = [None] * self._count
+        else:
+            self._vectors = self._allocate(capacity)
+            # Pair the new vector file with its keys right away
+            self.flush()
+
+    def _allocate(self, rows):
+        if self.path is None:
+            return np.zeros((rows, self.dim), dtype=np.float32)
+        return np.lib.format.open_memmap(self.path + '.npy', mode='w+', dtype=np.float32, shape=(rows, self.dim))
+
+    def _grow(self):
+        rows = self._vectors.shape[0] * 2
+        if self.path is None:
+            vectors = np.zeros((rows, self.dim), dtype=np.float32)
+            vectors[:self._count] = self._vectors[:self._count]
+            self._vectors = vectors
+            return
+
+        # Copy into a larger file next to the current one, then swap it in
+        tmp_path = self.path + '.grow.npy'
+        vectors = np.lib.format.open_memmap(tmp_path, mode='w+', dtype=np.float32, shape=(rows, self.dim))
+        vectors[:self._count] = self._vectors[:self._count]
+        vectors.flush()
+        del self._vectors
+        os.replace(tmp_path, self.path + '.npy')
+        self._vectors = np.load(self.path + '.npy', mmap_mode='r+')
+
+    def __len__(self):
+        return self._count
+
+    def add(self, vector, key=None, payload=None):
+        """
+        Add one embedding
+
+        Args:
+            vector: Embedding of shape (dim,); normalized here
+            key: Optional identifier (e.g. a file name), persisted with the index
+            payload: Optional in-memory object returned by payload(), e.g. a
+                PredictionResult; not persisted
+
+        Returns:
+            int: Row of the new entry
+        """
+        vector = normalize(vector)
+        with self._lock:
+            if self._count < (self.max_entries or float('inf')):
+                if self._count == self._vectors.shape[0]:
+                    self._grow()
+                row = self._count
+                self._count += 1
+                self._keys.append(key)
+                self._payloads.append(payload)
+            else:
+                row = self._next
+                self._keys[row] = key
+                self._payloads[row] = payload
+            self._vectors[row] = vector
+            self._next = (row + 1) % self.max_entries if self.max_entries else self._count
+        return row
+
+    def search(self, vectors, k=5):
+        """
+        Find the most similar entries to one or more query embeddings
+
+        Args:
+            vectors: Query of shape (dim,) or (Q, dim); normalized here
+            k: Number of neighbours per query
+
+        Returns:
+            list: For each query, a list of (row, cosine similarity) in
+                descending similarity; a single list for a 1-D query
+        """
+        single = np.ndim(vectors) == 1
+        queries = normalize(np.atleast_2d(vectors))
+        with self._lock:
+            count = self._count
+            vectors = self._vectors[:count]
+        similarities = queries @ vectors.T
+
+        k = min(k, count)
+        results = []
+        for row_similarities in similarities:
+            if k == 0:
+                results.append([])
+                continue
+            top = np.argpartition(row_similarities, -k)[-k:]
+            top = top[np.argsort(row_similarities[top])[::-1]]
+            results.append([(int(row), float(row_similarities[row])) for row in top])
+        return results[0] if single else results
+
+    def nearest(self, vector, threshold):
+        """
+        Most similar entry if it is at least ``threshold`` similar
+
+        Returns:
+            tuple or None: (row, cosine similarity)
+        """
+        hits = self.search(vector, k=1)
+        if hits and hits[0][1] >= threshold:
+            return hits[0]
+        return None
+
+    def key(self, row):
+        return self._keys[row]
+
+    def keys(self):
+        return list(self._keys)
+
+    def vectors(self):
+        """Normalized embeddings of all entries, as a (len, dim) view in row order"""
+        return self._vectors[:self._count]
+
+    def payload(self, row):
+        return self._payloads[row]
+
+    def flush(self):
+        """Persist a memory-mapped index; a no-op in memory"""
+        if self.path is None:
+            return
+        with self._lock:
+            self._vectors.flush()
+            tmp_path = self.path + '.json.tmp'
+            with open(tmp_path, 'w') as f:
+                json.dump({"dim": self.dim, "keys": self._keys, "next": self._next, "metadata": self.metadata}, f)
+            os.replace(tmp_path, self.path + '.json')
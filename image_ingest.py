@@ -0,0 +1,195 @@
+"""
+Bounded-memory decoding of untrusted image uploads
+
+An upload is checked against byte and pixel limits from its header before
+any pixel is decoded. JPEGs are decoded at reduced scale (PIL ``draft``), only
+the first frame of an animated image is ever decoded, and the result is
+rotated upright from its EXIF orientation. Whatever the upload, decoding holds
+at most MAX_DECODE_PIXELS pixels, and callers keep only a bounded analysis
+image plus a small display thumbnail.
+"""
+import io
+import math
+import warnings
+from dataclasses import dataclass
+
+from PIL import Image
+
+from model_utils import ImageContext
+
+# Uploads larger than this are refused without being parsed
+MAX_UPLOAD_BYTES = 25 * 1024 * 1024
+
+# Header dimensions above this are refused outright, whatever the format
+MAX_IMAGE_PIXELS = 120_000_000
+
+# Formats that cannot be decoded at reduced scale are fully decoded, so they
+# must fit this (about 100 MB as RGBA)
+MAX_DECODE_PIXELS = 25_000_000
+
+# Longest side of the image handed to the classifier; reduce_image shrinks
+# it further to the working size, so this only bounds memory
+ANALYSIS_MAX_SIDE = 2048
+
+# Longest side of the preview shown in the UI
+DISPLAY_MAX_SIDE = 800
+
+ALLOWED_FORMATS = ('JPEG', 'PNG', 'BMP', 'GIF', 'WEBP', 'TIFF', 'MPO')
+
+# Transpose that turns each EXIF orientation upright
+_ORIENTATION_TRANSPOSE = {
+    2: Image.Transpose.FLIP_LEFT_RIGHT,
+    3: Image.Transpose.ROTATE_180,
+    4: Image.Transpose.FLIP_TOP_BOTTOM,
+    5: Image.Transpose.TRANSPOSE,
+    6: Image.Transpose.ROTATE_270,
+    7: Image.Transpose.TRANSVERSE,
+    8: Image.Transpose.ROTATE_90,
+}
+
+
+class ImageRejected(ValueError):
+    """The upload exceeds a limit or is not a supported image"""
+
+
+class ImageTooLarge(ImageRejected):
+    """The upload exceeds a byte or pixel limit"""
+
+
+@dataclass(slots=True)
+class IngestedImage:
+    """
+    Decoded upload, reduced to bounded sizes
+
+    ``image`` is the upright RGB image analysed by the classifier, no larger
+    than ANALYSIS_MAX_SIDE; ``thumbnail`` is a copy no larger than
+    DISPLAY_MAX_SIDE for display. ``original_size`` is the upload's upright
+    size before any reduction.
+    """
+
+    image: Image.Image
+    thumbnail: Image.Image
+    original_size: tuple
+    format: str
+    animated: bool = False
+
+    def context(self):
+        """ImageContext for AnimalClassifier.predict, calibrated to the original size"""
+        return ImageContext(self.image, original_size=self.original_size)
+
+
+def probe_upload(data, max_bytes=MAX_UPLOAD_BYTES, max_pixels=MAX_IMAGE_PIXELS,
+                 max_decode_pixels=MAX_DECODE_PIXELS):
+    """
+    Open an upload and check its limits from the header alone
+
+    Args:
+        data: Encoded image bytes
+        max_bytes: Largest accepted upload
+        max_pixels: Largest accepted width * height for any format
+        max_decode_pixels: Largest accepted width * height for formats that
+            cannot be decoded at reduced scale
+
+    Returns:
+        PIL Image with no pixels decoded yet
+
+    Raises:
+        ImageRejected: If the upload is empty or not a supported image
+            (ImageTooLarge if it exceeds a limit)
+    """
+    if not data:
+        raise ImageRejected("The uploaded file is empty")
+    if len(data) > max_bytes:
+        raise ImageTooLarge(f"The file is {len(data) / 1e6:.1f} MB; the limit is {max_bytes / 1e6:.0f} MB")
+
+    try:
+        # The limits below replace PIL's own decompression-bomb warning
+        with warnings.catch_warnings():
+            warnings.simplefilter('ignore', Image.DecompressionBombWarning)
+            image = Image.open(io.BytesIO(data))
+    except Image.DecompressionBombError:
+        raise ImageTooLarge("The image dimensions are too large to process")
+    except Exception:
+        raise ImageRejected("The file is not a supported or valid image")
+
+    if image.format not in ALLOWED_FORMATS:
+        raise ImageRejected(f"Unsupported image format: {image.format}")
+
+    width, height = image.size
+    pixels = width * height
+    limit = max_pixels if image.format in ('JPEG', 'MPO') else min(max_pixels, max_decode_pixels)
+    if pixels == 0:
+        raise ImageRejected("The image has no pixels")
+    if pixels > limit:
+        raise ImageTooLarge(
+            f"The image is {pixels / 1e6:.0f} megapixels; the limit for {image.format} "
+            f"is {limit / 1e6:.0f} megapixels"
+        )
+    return image
+
+
+def ingest_upload(data, max_bytes=MAX_UPLOAD_BYTES, max_pixels=MAX_IMAGE_PIXELS,
+                  max_decode_pixels=MAX_DECODE_PIXELS, analysis_max_side=ANALYSIS_MAX_SIDE,
+                  display_max_side=DISPLAY_MAX_SIDE):
+    """
+    Decode an untrusted upload with bounded memory
+
+    Args:
+        data: Encoded image bytes
+        max_bytes: Largest accepted upload
+        max_pixels: Largest accepted width * height for any format
+        max_decode_pixels: Largest accepted width * height for formats that
+            cannot be decoded at reduced scale
+        analysis_max_side: Longest side of the analysed image
+        display_max_side: Longest side of the display thumbnail
+
+    Returns:
+        IngestedImage
+
+    Raises:
+        ImageRejected: If the upload exceeds a limit (ImageTooLarge) or
+            cannot be decoded
+    """
+    image = probe_upload(data, max_bytes, max_pixels, max_decode_pixels)
+    image_format = image.format
+
+    # Only the first frame is decoded; later frames are never read
+    animated = bool(getattr(image, 'is_animated', False))
+    if animated:
+        image.seek(0)
+
+    orientation = image.getexif().get(0x0112, 1)
+    width, height = image.size
+    original_size = (height, width) if orientation in (5, 6, 7, 8) else (width, height)
+
+    try:
+        # JPEG decodes at reduced scale in the DCT domain
+        ratio = analysis_max_side / max(width, height)
+        if image_format in ('JPEG', 'MPO') and ratio < 1:
+            image.draft('RGB', (max(1, round(width * ratio)), max(1, round(height * ratio))))
+        image.load()
+    except Exception as e:
+        raise ImageRejected(f"The image could not be decoded: {str(e)}")
+
+    # reduce() doesn't support palette or bilevel images, and the model wants RGB
+    if image.mode != 'RGB':
+        image = image.convert('RGB')
+
+    factor = math.ceil(max(image.size) / analysis_max_side)
+    if factor >= 2:
+        image = image.reduce(factor)
+
+    # Rotate upright only once the image is small
+    if orientation in _ORIENTATION_TRANSPOSE:
+        image = image.transpose(_ORIENTATION_TRANSPOSE[orientation])
+
+    thumbnail = image.copy()
+    thumbnail.thumbnail((display_max_side, display_max_side), Image.Resampling.LANCZOS)
+
+    return IngestedImage(
+        image=image,
+        thumbnail=thumbnail,
+        original_size=original_size,
+        format=image_format,
+        animated=animated,
+    )
@@ -0,0 +1,110 @@
+#!/usr/bin/env python3
+"""
+Load test for the Animal Classify inference server
+
+Fires concurrent requests at a running server.py and reports latency
+percentiles, throughput and status codes. Usage:
+
+    python server.py &
+    python load_test.py --concurrency 32 --requests 500
+    python load_test.py --endpoint predict_batch --images-per-request 8
+"""
+import argparse
+import base64
+import io
+import json
+import threading
+import time
+import urllib.error
+import urllib.request
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+
+from benchmark import make_synthetic_image, summarize, print_summary
+
+
+def encode_images(count, width, height):
+    """Encode distinct synthetic images as JPEG bytes"""
+    encoded = []
+    for seed in range(count):
+        buffer = io.BytesIO()
+        make_synthetic_image(width, height, seed=seed).save(buffer, format="JPEG", quality=90)
+        encoded.append(buffer.getvalue())
+    return encoded
+
+
+def build_request(args, images, index):
+    """Build the HTTP request for the index-th call"""
+    if args.endpoint == "predict":
+        return urllib.request.Request(
+            f"{args.url}/predict", data=images[index % len(images)],
+            headers={"Content-Type": "application/octet-stream"}
+        )
+
+    chosen = [images[(index + i) % len(images)] for i in range(args.images_per_request)]
+    body = json.dumps({"images": [base64.b64encode(data).decode() for data in chosen]}).encode()
+    return urllib.request.Request(
+        f"{args.url}/predict_batch", data=body, headers={"Content-Type": "application/json"}
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Animal Classify server load test")
+    parser.add_argument("--url", default="http://127.0.0.1:8000", help="Server base URL")
+    parser.add_argument("--endpoint", choices=["predict", "predict_batch"], default="predict")
+    parser.add_argument("--concurrency", type=int, default=16, help="Concurrent clients")
+    parser.add_argument("--requests", type=int, default=200, help="Total requests")
+    parser.add_argument("--images-per-request", type=int, default=4, help="Images per predict_batch call")
+    parser.add_argument("--distinct-images", type=int, default=32,
+                        help="Distinct images to cycle through (repeats hit the result cache)")
+    parser.add_argument("--width", type=int, default=640, help="Synthetic image width")
+    parser.add_argument("--height", type=int, default=480, help="Synthetic image height")
+    parser.add_argument("--timeout", type=float, default=30, help="Client timeout in seconds")
+    args = parser.parse_args()
+
+    images = encode_images(args.distinct_images, args.width, args.height)
+    latencies = []
+    statuses = Counter()
+    lock = threading.Lock()
+
+    def call(index):
+        request = build_request(args, images, index)
+        start = time.perf_counter()
+        try:
+            with urllib.request.urlopen(request, timeout=args.timeout) as response:
+                response.read()
+                status = response.status
+        except urllib.error.HTTPError as e:
+            status = e.code
+        except Exception as e:
+            status = type(e).__name__
+        elapsed = (time.perf_counter() - start) * 1000.0
+        with lock:
+            statuses[status] += 1
+            if status == 200:
+                latencies.append(elapsed)
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=args.concurrency) as pool:
+        list(pool.map(call, range(args.requests)))
+    wall = time.perf_counter() - start
+
+    images_per_call = 1 if args.endpoint == "predict" else args.images_per_request
+    print(f"{args.requests} requests to /{args.endpoint}, concurrency {args.concurrency}, "
+          f"{wall:.2f}s wall")
+    print(f"Status codes: {dict(statuses)}")
+    if latencies:
+        stats = summarize(latencies)
+        print_summary("successful requests", stats)
+        print(f"p99 {stats['p99_ms']:.2f} ms   "
+              f"{len(latencies) / wall:.1f} req/s   {len(latencies) * images_per_call / wall:.1f} images/s")
+
+    try:
+        with urllib.request.urlopen(f"{args.url}/health", timeout=args.timeout) as response:
+            print(f"Server: {json.loads(response.read())}")
+    except Exception as e:
+        print(f"Health check failed: {e}")
+
+
+if __name__ == "__main__":
+    main()
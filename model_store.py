@@ -0,0 +1,210 @@
+import hashlib
+import json
+import os
+import shutil
+import tempfile
+import logging
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_STORE_DIR = os.environ.get(
+    'ANIMAL_CLASSIFY_CACHE_DIR',
+    os.path.join(os.path.expanduser('~'), '.cache', 'animal_classify')
+)
+
+# Offline mode never touches the network: artifacts must already be stored
+OFFLINE_DEFAULT = os.environ.get('ANIMAL_CLASSIFY_OFFLINE', '').lower() in ('1', 'true', 'yes')
+
+MANIFEST_NAME = 'manifest.json'
+KERAS_MODEL_NAME = 'model.keras'
+
+
+def _framework_versions():
+    """TensorFlow and Keras versions, importing TensorFlow on first use"""
+    import tensorflow as tf
+    return tf.__version__, tf.keras.__version__
+
+
+def _sha256_file(path):
+    """Compute the SHA-256 hex digest of a file"""
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1 << 20), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+class ModelStore:
+    """
+    On-disk store of ready-to-serve model artifacts
+
+    Each artifact key gets its own directory holding the serialized files and
+    a manifest of their SHA-256 checksums. Keys include the TensorFlow and
+    Keras versions so an upgrade never loads an incompatible artifact.
+    """
+
+    def __init__(self, directory=DEFAULT_STORE_DIR, offline=OFFLINE_DEFAULT):
+        """
+        Args:
+            directory: Root directory of the store
+            offline: If True, callers must not fall back to downloading
+                anything that is missing from the store
+        """
+        self.directory = directory
+        self.offline = offline
+
+    def artifact_key(self, weights_key):
+        """
+        Build the versioned artifact key for a set of weights
+
+        Args:
+            weights_key: Identifier of the model weights
+
+        Returns:
+            str: Artifact key
+        """
+        tf_version, keras_version = _framework_versions()
+        return f"{weights_key}-tf{tf_version}-keras{keras_version}"
+
+    def _key_dir(self, key):
+        return os.path.join(self.directory, key)
+
+    def _read_manifest(self, key):
+        path = os.path.join(self._key_dir(key), MANIFEST_NAME)
+        try:
+            with open(path) as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {}
+
+    def _write_manifest(self, key, manifest):
+        path = os.path.join(self._key_dir(key), MANIFEST_NAME)
+        tmp_path = path + '.tmp'
+        with open(tmp_path, 'w') as f:
+            json.dump(manifest, f, indent=2, sort_keys=True)
+        os.replace(tmp_path, path)
+
+    def _verified_path(self, key, filename):
+        """
+        Return the path of a stored file if it exists and matches its checksum
+
+        Args:
+            key: Artifact key
+            filename: File name inside the artifact directory
+
+        Returns:
+            str or None: Path to the verified file
+        """
+        path = os.path.join(self._key_dir(key), filename)
+        expected = self._read_manifest(key).get('files', {}).get(filename)
+        if expected is None or not os.path.exists(path):
+            return None
+        if _sha256_file(path) != expected:
+            logger.warning(f"Checksum mismatch for {path}, ignoring stored artifact")
+            return None
+        return path
+
+    def _commit_file(self, key, filename, write_fn):
+        """
+        Write a file atomically into an artifact directory and record its
+        checksum in the manifest
+
+        Args:
+            key: Artifact key
+            filename: File name inside the artifact directory
+            write_fn: Callable taking a temporary path and writing the file
+        """
+        key_dir = self._key_dir(key)
+        os.makedirs(key_dir, exist_ok=True)
+
+        suffix = os.path.splitext(filename)[1]
+        fd, tmp_path = tempfile.mkstemp(dir=key_dir, suffix=suffix)
+        os.close(fd)
+        try:
+            write_fn(tmp_path)
+            checksum = _sha256_file(tmp_path)
+            os.replace(tmp_path, os.path.join(key_dir, filename))
+        finally:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+
+        manifest = self._read_manifest(key)
+        manifest.setdefault('files', {})[filename] = checksum
+        manifest['tensorflow'], manifest['keras'] = _framework_versions()
+        self._write_manifest(key, manifest)
+
+    def load_keras_model(self, key):
+        """
+        Load a stored Keras model
+
+        Args:
+            key: Artifact key
+
+        Returns:
+            tf.keras.Model or None if the artifact is missing or corrupt
+        """
+        path = self._verified_path(key, KERAS_MODEL_NAME)
+        if path is None:
+            return None
+        try:
+            import tensorflow as tf
+            return tf.keras.models.load_model(path, compile=False)
+        except Exception as e:
+            logger.warning(f"Failed to load stored model {path}: {str(e)}")
+            return None
+
+    def save_keras_model(self, key, model):
+        """
+        Serialize a Keras model (architecture and weights) into the store
+
+        Args:
+            key: Artifact key
+            model: tf.keras.Model to save
+        """
+        try:
+            self._commit_file(key, KERAS_MODEL_NAME, model.save)
+            logger.info(f"Saved model artifact to {self._key_dir(key)}")
+        except Exception as e:
+            logger.warning(f"Failed to save model artifact: {str(e)}")
+
+    def read_bytes(self, key, filename):
+        """
+        Read a stored binary artifact such as a converted TFLite model
+
+        Args:
+            key: Artifact key
+            filename: File name inside the artifact directory
+
+        Returns:
+            bytes or None if the artifact is missing or corrupt
+        """
+        path = self._verified_path(key, filename)
+        if path is None:
+            return None
+        with open(path, 'rb') as f:
+            return f.read()
+
+    def write_bytes(self, key, filename, data):
+        """
+        Store a binary artifact
+
+        Args:
+            key: Artifact key
+            filename: File name inside the artifact directory
+            data: Bytes to write
+        """
+        def write(path):
+            with open(path, 'wb') as f:
+                f.write(data)
+
+        try:
+            self._commit_file(key, filename, write)
+        except Exception as e:
+            logger.warning(f"Failed to save {filename}: {str(e)}")
+
+    def clear(self, key=None):
+        """
+        Remove one artifact directory, or the whole store when key is None
+        """
+        path = self._key_dir(key) if key else self.directory
+        shutil.rmtree(path, ignore_errors=True)
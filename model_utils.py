@@ -1,6 +1,11 @@
+import functools
+import io
+import json
+import os
+import time
 import numpy as np
 from PIL import Image
-import tensorflow as tf
+from metrics import span, timed
 
 # Try to import OpenCV with fallback
 try:
@@ -10,96 +15,484 @@ except ImportError:
     print("Warning: OpenCV not available, using PIL-only image processing")
     OPENCV_AVAILABLE = False
 
-def assess_image_quality(image):
+# Images scoring below this are rejected before inference
+QUALITY_REJECT_THRESHOLD = 40
+
+# Fast quality assessment works on a grayscale plane no larger than this
+QUALITY_MAX_SIDE = 640
+
+# Laplacian variance below this (at full resolution) means the image is blurry
+LAPLACIAN_BLUR_THRESHOLD = 100
+
+# Share of Canny edge pixels (at full resolution) below which an image lacks
+# clear features, and above which it is probably noisy
+EDGE_DENSITY_LOW = 0.05
+EDGE_DENSITY_HIGH = 0.3
+
+# Blur and noise are pixel-level properties that a downscaled plane hides
+# (a one-pixel blur on a 20 MP photo is invisible at 640 px), so fast mode
+# runs the sharpness and edge checks on a QUALITY_TILE_GRID square grid of
+# tiles cut at the image's own resolution. On resized and blurred copies of
+# the photos in attached_assets an 8 x 8 grid the size of the plane stays
+# within a few percent of the full-image Laplacian variance and edge density
+QUALITY_TILE_GRID = 8
+
+# When only a downscaled copy exists (e.g. an upload shrunk on ingestion),
+# blur shrinks in pixel terms and edges pack closer together, so the blur
+# threshold and the low edge-density bound grow with the downscale factor.
+# Fitted so verdicts on such copies match the full-resolution ones for the
+# photos in attached_assets up to a factor of 2, and held there beyond it.
+# The noise bound stays: downscaling averages noise away, so raising it would
+# only hide noise
+LAPLACIAN_SCALE_EXPONENT = 2.3
+EDGE_DENSITY_SCALE_EXPONENT = 0.85
+QUALITY_MAX_CALIBRATED_SCALE = 2.0
+
+def scaled_blur_threshold(scale):
+    """
+    Laplacian blur threshold for a plane downscaled by the given factor
+    
+    Args:
+        scale: Original width divided by the analysed plane's width
+    
+    Returns:
+        float: Threshold comparable to LAPLACIAN_BLUR_THRESHOLD at full size
+    """
+    scale = min(max(scale, 1.0), QUALITY_MAX_CALIBRATED_SCALE)
+    return LAPLACIAN_BLUR_THRESHOLD * scale ** LAPLACIAN_SCALE_EXPONENT
+
+def scaled_edge_bounds(scale):
+    """
+    Edge-density bounds for a plane downscaled by the given factor
+    
+    Args:
+        scale: Original width divided by the analysed plane's width
+    
+    Returns:
+        tuple: (low, high) comparable to EDGE_DENSITY_LOW and
+            EDGE_DENSITY_HIGH at full size
+    """
+    factor = min(max(scale, 1.0), QUALITY_MAX_CALIBRATED_SCALE) ** EDGE_DENSITY_SCALE_EXPONENT
+    return EDGE_DENSITY_LOW * factor, EDGE_DENSITY_HIGH
+
+@timed('quality')
+def assess_image_quality(image, fast=True, timings=None):
     """
     Assess image quality to determine if it's suitable for accurate recognition
     
+    Fast mode checks brightness and contrast on a bounded-size grayscale
+    plane and sharpness and edges on tiles sampled from the image (see
+    ImageContext.quality_plane and quality_detail), runs the cheap checks
+    first and stops as soon as the score is certain to fall below
+    QUALITY_REJECT_THRESHOLD, since checks only ever deduct.
+    
     Args:
-        image: PIL Image object
+        image: PIL Image object or ImageContext
+        fast: If False, analyse the full-resolution grayscale image and run
+            every check (original behaviour)
+        timings: Optional dict filled with seconds spent per stage
+            ('decode', 'brightness', 'contrast', 'laplacian', 'edges'); in
+            fast mode the first of the last two includes cutting the tiles
     
     Returns:
         tuple: (quality_score, quality_issues)
     """
     try:
-        # Convert PIL to numpy array
-        img_array = np.array(image)
+        context = ImageContext.of(image)
         
-        # Convert to grayscale for analysis
-        if len(img_array.shape) == 3:
-            gray = cv2.cvtColor(img_array, cv2.COLOR_RGB2GRAY)
+        # Grayscale plane for analysis (decoded once per ImageContext)
+        start = time.perf_counter()
+        if fast:
+            gray, _ = context.quality_plane()
         else:
-            gray = img_array
+            gray = context.gray
+        if timings is not None:
+            timings['decode'] = time.perf_counter() - start
         
         quality_score = 100.0
         quality_issues = []
         
-        # 1. Check image resolution
-        height, width = gray.shape
+        # 1. Check image resolution (of the original upload)
+        width, height = context.size
         if width < 200 or height < 200:
             quality_score -= 25
             quality_issues.append("Low resolution image")
         
+        # Planes for the sharpness and edge checks, fetched on first use so an
+        # early verdict never cuts tiles
+        def detail():
+            return context.quality_detail() if fast else ([gray], 1.0)
+        
         # 2. Check image sharpness using Laplacian variance
-        laplacian_var = cv2.Laplacian(gray, cv2.CV_64F).var()
-        if laplacian_var < 100:  # Threshold for blur detection
-            quality_score -= 30
-            quality_issues.append("Image appears blurry")
-        
-        # 3. Check brightness and contrast
-        mean_brightness = np.mean(gray)
-        if mean_brightness < 50:  # Too dark
-            quality_score -= 20
-            quality_issues.append("Image is too dark")
-        elif mean_brightness > 200:  # Too bright/overexposed
-            quality_score -= 15
-            quality_issues.append("Image is overexposed")
+        def check_sharpness():
+            planes, detail_scale = detail()
+            laplacian = np.concatenate([cv2.Laplacian(plane, cv2.CV_64F).ravel() for plane in planes])
+            if laplacian.var() < scaled_blur_threshold(detail_scale):  # Threshold for blur detection
+                return 30, "Image appears blurry"
+        
+        # 3. Check brightness
+        def check_brightness():
+            mean_brightness = np.mean(gray)
+            if mean_brightness < 50:  # Too dark
+                return 20, "Image is too dark"
+            elif mean_brightness > 200:  # Too bright/overexposed
+                return 15, "Image is overexposed"
         
         # 4. Check contrast (standard deviation)
-        contrast = np.std(gray)
-        if contrast < 30:  # Low contrast
-            quality_score -= 20
-            quality_issues.append("Low contrast image")
+        def check_contrast():
+            contrast = np.std(gray)
+            if contrast < 30:  # Low contrast
+                return 20, "Low contrast image"
         
         # 5. Check for noise (using edge detection if OpenCV available)
-        if OPENCV_AVAILABLE:
-            edges = cv2.Canny(gray, 50, 150)
-            edge_density = np.sum(edges > 0) / (height * width)
-            if edge_density > 0.3:  # Too many edges might indicate noise
-                quality_score -= 10
-                quality_issues.append("Potentially noisy image")
-            elif edge_density < 0.05:  # Too few edges might indicate poor quality
-                quality_score -= 15
-                quality_issues.append("Lack of clear features")
+        def check_features():
+            planes, detail_scale = detail()
+            if OPENCV_AVAILABLE:
+                low, high = scaled_edge_bounds(detail_scale)
+                edge_pixels = sum(np.count_nonzero(cv2.Canny(plane, 50, 150)) for plane in planes)
+                edge_density = edge_pixels / sum(plane.size for plane in planes)
+                if edge_density > high:  # Too many edges might indicate noise
+                    return 10, "Potentially noisy image"
+                elif edge_density < low:  # Too few edges might indicate poor quality
+                    return 15, "Lack of clear features"
+            else:
+                # Fallback: use variance as a proxy for image quality
+                variance = np.var(np.concatenate([plane.ravel() for plane in planes]))
+                if variance < 100:  # Low variance might indicate poor quality
+                    return 10, "Low image variance"
+        
+        if fast:
+            # Cheapest first, so an early verdict skips Laplacian and Canny
+            checks = [('brightness', check_brightness), ('contrast', check_contrast),
+                      ('laplacian', check_sharpness), ('edges', check_features)]
         else:
-            # Fallback: use variance as a proxy for image quality
-            variance = np.var(gray)
-            if variance < 100:  # Low variance might indicate poor quality
-                quality_score -= 10
-                quality_issues.append("Low image variance")
+            checks = [('laplacian', check_sharpness), ('brightness', check_brightness),
+                      ('contrast', check_contrast), ('edges', check_features)]
+        
+        for name, check in checks:
+            if fast and quality_score < QUALITY_REJECT_THRESHOLD:
+                break
+            
+            start = time.perf_counter()
+            result = check()
+            if timings is not None:
+                timings[name] = time.perf_counter() - start
+            
+            if result:
+                penalty, issue = result
+                quality_score -= penalty
+                quality_issues.append(issue)
         
         return max(0, quality_score), quality_issues
         
     except Exception as e:
         return 50.0, [f"Error assessing quality: {str(e)}"]
 
-def enhanced_preprocess_image(image, target_size=(224, 224)):
+# Enhancement filters run at this multiple of the model input size
+WORKING_SCALE = 2
+
+def _reopen_undecoded(image):
     """
-    Enhanced preprocessing with quality improvements for better recognition
+    Open a private, still undecoded copy of a JPEG from where it was read
+    
+    ``draft`` changes the image it is called on, so it is only ever applied
+    to such a copy, never to an image the caller passed in.
+    
+    Args:
+        image: Undecoded PIL Image opened from a file or in-memory buffer
+    
+    Returns:
+        PIL Image, or None if its source can't be read again
+    """
+    try:
+        filename = getattr(image, 'filename', None)
+        if filename:
+            return Image.open(filename)
+        getvalue = getattr(getattr(image, 'fp', None), 'getvalue', None)
+        if getvalue is not None:
+            return Image.open(io.BytesIO(getvalue()))
+    except Exception:
+        pass
+    return None
+
+def reduce_image(image, target_size=(224, 224), working_scale=WORKING_SCALE):
+    """
+    Cheaply shrink an image to roughly working_scale times the target size
+    
+    Large uploads are reduced before any filtering so OpenCV and LANCZOS work
+    on a few hundred thousand pixels instead of tens of millions. A JPEG that
+    has not been decoded yet is decoded at reduced scale in the DCT domain
+    (PIL ``draft``, on a private copy re-opened from its source, so the given
+    image is never changed); the rest of the reduction is an integer-factor
+    box (area) filter.
     
     Args:
         image: PIL Image object
+        target_size: Final target size (width, height)
+        working_scale: Multiple of target_size to keep for filtering
+    
+    Returns:
+        PIL Image no smaller than working_scale * target_size on either axis
+        (unless the input already was)
+    """
+    working_size = (target_size[0] * working_scale, target_size[1] * working_scale)
+    
+    # tile is only populated while the image is still undecoded
+    if image.format == 'JPEG' and getattr(image, 'tile', None):
+        private = _reopen_undecoded(image)
+        if private is not None and private.size == image.size:
+            private.draft('RGB', working_size)
+            image = private
+    
+    factor = min(image.width // working_size[0], image.height // working_size[1])
+    if factor >= 2:
+        # reduce() doesn't support palette or bilevel images
+        if image.mode not in ('RGB', 'RGBA', 'L'):
+            image = image.convert('RGB')
+        image = image.reduce(factor)
+    
+    return image
+
+class ImageContext:
+    """
+    Decode-once view of an image shared by quality assessment and both
+    preprocessing pipelines
+    
+    Each derived form (RGB image and array, grayscale plane, reduced working
+    copy, resized base) is computed on first access and memoized, so one
+    upload costs one decode and one reduction however many stages use it.
+    Memoized arrays are shared and must not be modified in place.
+    
+    Reduced forms let an undecoded JPEG decode at reduced scale (see
+    reduce_image) without touching the wrapped image; ``size`` always holds
+    the original dimensions.
+    """
+    
+    def __init__(self, image, original_size=None):
+        """
+        Args:
+            image: PIL Image object
+            original_size: Dimensions of the upload when ``image`` was already
+                shrunk on ingestion; quality checks are calibrated against them
+        """
+        self.source = image
+        self.size = tuple(original_size) if original_size is not None else image.size
+        self._image = None
+        self._rgb = None
+        self._gray = None
+        self._working = {}
+        self._resized = {}
+        self._quality = {}
+        self._detail = {}
+    
+    @classmethod
+    def of(cls, image):
+        """Wrap a PIL image, or return an existing ImageContext unchanged"""
+        if isinstance(image, cls):
+            return image
+        return cls(image)
+    
+    @property
+    def image(self):
+        """Full-resolution RGB PIL image"""
+        if self._image is None:
+            with span('decode'):
+                self._image = self.source if self.source.mode == 'RGB' else self.source.convert('RGB')
+        return self._image
+    
+    @property
+    def rgb(self):
+        """Full-resolution RGB uint8 array of shape (H, W, 3)"""
+        if self._rgb is None:
+            self._rgb = np.asarray(self.image)
+        return self._rgb
+    
+    @property
+    def gray(self):
+        """Full-resolution grayscale uint8 array of shape (H, W)"""
+        if self._gray is None:
+            if self.source.mode == 'L':
+                self._gray = np.asarray(self.source)
+            elif OPENCV_AVAILABLE:
+                self._gray = cv2.cvtColor(self.rgb, cv2.COLOR_RGB2GRAY)
+            else:
+                self._gray = np.asarray(self.image.convert('L'))
+        return self._gray
+    
+    def quality_plane(self, max_side=QUALITY_MAX_SIDE, target_size=(224, 224)):
+        """
+        Bounded-size grayscale plane for fast quality assessment
+        
+        Derived from the reduced working copy, so an undecoded JPEG is never
+        decoded at full resolution just to score it.
+        
+        Args:
+            max_side: Maximum width or height of the plane
+            target_size: Model input size the working copy was reduced for
+        
+        Returns:
+            tuple: (grayscale uint8 array, downscale factor from the original)
+        """
+        if max_side not in self._quality:
+            working = self.working(target_size)
+            if OPENCV_AVAILABLE:
+                gray = cv2.cvtColor(np.asarray(working), cv2.COLOR_RGB2GRAY)
+            else:
+                gray = np.asarray(working.convert('L'))
+            
+            height, width = gray.shape
+            if max(height, width) > max_side:
+                ratio = max_side / max(height, width)
+                size = (max(1, round(width * ratio)), max(1, round(height * ratio)))
+                if OPENCV_AVAILABLE:
+                    gray = cv2.resize(gray, size, interpolation=cv2.INTER_AREA)
+                else:
+                    gray = np.asarray(Image.fromarray(gray).resize(size, Image.Resampling.BOX))
+            
+            self._quality[max_side] = (gray, self.size[0] / gray.shape[1])
+        return self._quality[max_side]
+    
+    def quality_detail(self, max_side=QUALITY_MAX_SIDE, target_size=(224, 224)):
+        """
+        Grayscale planes for the fast sharpness and edge checks
+        
+        The quality plane itself when it is the image at its own resolution,
+        otherwise a QUALITY_TILE_GRID square grid of tiles cut at that
+        resolution, together about the size of the plane; an undecoded JPEG
+        is decoded for them in grayscale only.
+        
+        Args:
+            max_side: Maximum width or height of the quality plane
+            target_size: Model input size the working copy was reduced for
+        
+        Returns:
+            tuple: (list of grayscale uint8 arrays, downscale factor from the original)
+        """
+        if max_side not in self._detail:
+            plane, scale = self.quality_plane(max_side, target_size)
+            if plane.shape[1] == self.source.width:
+                self._detail[max_side] = ([plane], scale)
+            else:
+                luma = self._luma()
+                height, width = luma.shape
+                grid = QUALITY_TILE_GRID
+                tile_height = max(1, min(plane.shape[0] // grid, height // grid))
+                tile_width = max(1, min(plane.shape[1] // grid, width // grid))
+                tiles = []
+                for row in range(grid):
+                    for column in range(grid):
+                        # Each tile is centred in its cell of the grid
+                        top = (2 * row + 1) * height // (2 * grid) - tile_height // 2
+                        left = (2 * column + 1) * width // (2 * grid) - tile_width // 2
+                        tiles.append(luma[top:top + tile_height, left:left + tile_width].copy())
+                self._detail[max_side] = (tiles, self.size[0] / width)
+        return self._detail[max_side]
+    
+    def _luma(self):
+        """Grayscale array of the source at its own resolution (not memoized)"""
+        if self._gray is not None:
+            return self._gray
+        
+        source = self.source
+        if source.format == 'JPEG' and getattr(source, 'tile', None):
+            private = _reopen_undecoded(source)
+            if private is not None and private.size == source.size:
+                # Decodes only the luma channel, skipping colour conversion
+                private.draft('L', private.size)
+                source = private
+        with span('decode'):
+            return np.asarray(source if source.mode == 'L' else source.convert('L'))
+    
+    def working(self, target_size=(224, 224)):
+        """
+        Reduced RGB working copy for filtering (see reduce_image)
+        
+        Args:
+            target_size: Final target size (width, height)
+        
+        Returns:
+            PIL Image object
+        """
+        if target_size not in self._working:
+            image = self.image
+            with span('decode'):
+                # Load here so lazy JPEG decoding is attributed to this stage
+                working = reduce_image(image, target_size)
+                working.load()
+            self._working[target_size] = working
+        return self._working[target_size]
+    
+    def resized(self, target_size=(224, 224)):
+        """
+        Working copy resized to the model input size
+        
+        Args:
+            target_size: Target size (width, height)
+        
+        Returns:
+            np.ndarray: RGB uint8 array of shape (height, width, 3)
+        """
+        if target_size not in self._resized:
+            self._resized[target_size] = np.asarray(
+                self.working(target_size).resize(target_size, Image.Resampling.LANCZOS)
+            )
+        return self._resized[target_size]
+
+# uint8 -> [-1, 1] lookup table, computed with the same float32 arithmetic
+# as Keras' mobilenet_v2.preprocess_input so results are bit-identical
+MODEL_RANGE_LUT = np.arange(256, dtype=np.float32) / np.float32(127.5) - np.float32(1.0)
+
+def scale_to_model_range(pixels, out=None):
+    """
+    Scale uint8 RGB pixels to the [-1, 1] float32 range MobileNetV2 expects
+    
+    Same values as Keras' mobilenet_v2.preprocess_input, in plain NumPy so
+    preprocessing never needs TensorFlow. The conversion is a single pass
+    straight into ``out`` (a table lookup with OpenCV, otherwise an in-place
+    divide and subtract), so no float temporaries are allocated.
+    
+    Args:
+        pixels: uint8 array of shape (H, W, 3)
+        out: Optional float32 array of the same shape to write into, e.g. one
+            row of a preallocated batch buffer
+    
+    Returns:
+        np.ndarray: float32 array of the same shape (``out`` when given)
+    """
+    if out is None:
+        out = np.empty(pixels.shape, dtype=np.float32)
+    if (OPENCV_AVAILABLE and pixels.dtype == np.uint8 and pixels.flags.c_contiguous
+            and out.flags.c_contiguous):
+        cv2.LUT(pixels, MODEL_RANGE_LUT, dst=out)
+    else:
+        np.divide(pixels, np.float32(127.5), out=out, dtype=np.float32)
+        np.subtract(out, np.float32(1.0), out=out)
+    return out
+
+@timed('preprocess_enhanced')
+def enhanced_preprocess_image(image, target_size=(224, 224), downscale_first=True, out=None):
+    """
+    Enhanced preprocessing with quality improvements for better recognition
+    
+    Args:
+        image: PIL Image object or ImageContext
         target_size: Target size for the image (width, height)
+        downscale_first: If True, reduce the image before enhancement; False
+            filters at full resolution (original behaviour, for parity checks)
+        out: Optional float32 array of shape (height, width, 3) to write the
+            result into, e.g. one row of a batch buffer
     
     Returns:
-        Preprocessed image array ready for model prediction
+        Preprocessed image array of shape (1, height, width, 3) ready for
+        model prediction (a view of ``out`` when given)
     """
+    context = ImageContext.of(image)
     try:
-        # Convert to RGB if needed
-        if image.mode != 'RGB':
-            image = image.convert('RGB')
+        # RGB image, reduced once per ImageContext
+        image = context.working(target_size) if downscale_first else context.image
         
         # Convert to numpy for processing
-        img_array = np.array(image)
+        img_array = np.asarray(image)
         
         # Apply OpenCV enhancements if available
         if OPENCV_AVAILABLE:
@@ -122,60 +515,109 @@ def enhanced_preprocess_image(image, target_size=(224, 224)):
         # Resize image with high-quality resampling
         image = image.resize(target_size, Image.Resampling.LANCZOS)
         
-        # Convert to numpy array
-        img_array = np.array(image)
-        
-        # Normalize pixel values to [0, 1]
-        img_array = img_array.astype(np.float32) / 255.0
-        
-        # Add batch dimension
-        img_array = np.expand_dims(img_array, axis=0)
-        
-        # Preprocess for MobileNetV2 (scale to [-1, 1])
-        img_array = tf.keras.applications.mobilenet_v2.preprocess_input(img_array * 255.0)
+        # Scale to the MobileNetV2 input range and add batch dimension
+        img_array = np.expand_dims(scale_to_model_range(np.asarray(image), out), axis=0)
         
         return img_array
     
     except Exception as e:
         # Fallback to simple preprocessing
-        return preprocess_image(image, target_size)
+        return preprocess_image(context, target_size, downscale_first, out)
 
-def preprocess_image(image, target_size=(224, 224)):
+@timed('preprocess_standard')
+def preprocess_image(image, target_size=(224, 224), downscale_first=True, out=None):
     """
     Standard preprocessing for model prediction (fallback method)
     
     Args:
-        image: PIL Image object
+        image: PIL Image object or ImageContext
         target_size: Target size for the image (width, height)
+        downscale_first: If True, reduce the image before the final resize
+        out: Optional float32 array of shape (height, width, 3) to write the
+            result into, e.g. one row of a batch buffer
     
     Returns:
-        Preprocessed image array ready for model prediction
+        Preprocessed image array of shape (1, height, width, 3) ready for
+        model prediction (a view of ``out`` when given)
     """
     try:
-        # Convert to RGB if needed
-        if image.mode != 'RGB':
-            image = image.convert('RGB')
-        
-        # Resize image
-        image = image.resize(target_size, Image.Resampling.LANCZOS)
+        context = ImageContext.of(image)
         
-        # Convert to numpy array
-        img_array = np.array(image)
-        
-        # Normalize pixel values to [0, 1]
-        img_array = img_array.astype(np.float32) / 255.0
-        
-        # Add batch dimension
-        img_array = np.expand_dims(img_array, axis=0)
+        # Resized RGB array, computed once per ImageContext
+        if downscale_first:
+            img_array = context.resized(target_size)
+        else:
+            img_array = np.asarray(context.image.resize(target_size, Image.Resampling.LANCZOS))
         
-        # Preprocess for MobileNetV2 (scale to [-1, 1])
-        img_array = tf.keras.applications.mobilenet_v2.preprocess_input(img_array * 255.0)
+        # Scale to the MobileNetV2 input range and add batch dimension
+        img_array = np.expand_dims(scale_to_model_range(img_array, out), axis=0)
         
         return img_array
     
     except Exception as e:
         raise Exception(f"Error preprocessing image: {str(e)}")
 
+# Extra test-time views, in the order they are added as the view budget
+# grows: mirror image, center crop, tighter center crop (scale jitter), the
+# four corner crops, then the mirrored tighter crop
+TTA_VIEWS = (
+    'flip', 'crop_center', 'zoom', 'crop_top_left', 'crop_top_right',
+    'crop_bottom_left', 'crop_bottom_right', 'zoom_flip'
+)
+
+# Fraction of the working image's width and height kept by crop and zoom views
+TTA_CROP_FRACTION = 0.875
+TTA_ZOOM_FRACTION = 0.75
+
+@timed('preprocess_tta')
+def preprocess_tta_view(image, view, target_size=(224, 224), out=None):
+    """
+    Standard preprocessing of one test-time augmentation view
+    
+    Views are cut from the same reduced working copy the standard pipeline
+    uses, so they cost a crop and a resize each, never another decode.
+    
+    Args:
+        image: PIL Image object or ImageContext
+        view: One of TTA_VIEWS
+        target_size: Target size for the image (width, height)
+        out: Optional float32 array of shape (height, width, 3) to write the
+            result into, e.g. one row of a batch buffer
+    
+    Returns:
+        Preprocessed image array of shape (1, height, width, 3) (a view of
+        ``out`` when given)
+    """
+    if view not in TTA_VIEWS:
+        raise ValueError(f"Unknown test-time view: {view}")
+    
+    try:
+        context = ImageContext.of(image)
+        
+        if view == 'flip':
+            pixels = context.resized(target_size)[:, ::-1]
+        else:
+            working = context.working(target_size)
+            width, height = working.size
+            fraction = TTA_ZOOM_FRACTION if view.startswith('zoom') else TTA_CROP_FRACTION
+            crop_width, crop_height = max(1, round(width * fraction)), max(1, round(height * fraction))
+            
+            if view in ('crop_center', 'zoom', 'zoom_flip'):
+                left, top = (width - crop_width) // 2, (height - crop_height) // 2
+            else:
+                left = 0 if view.endswith('_left') else width - crop_width
+                top = 0 if view.startswith('crop_top') else height - crop_height
+            
+            crop = working.crop((left, top, left + crop_width, top + crop_height))
+            pixels = np.asarray(crop.resize(target_size, Image.Resampling.LANCZOS))
+            if view.endswith('_flip'):
+                pixels = pixels[:, ::-1]
+        
+        return np.expand_dims(scale_to_model_range(pixels, out), axis=0)
+    
+    except Exception as e:
+        raise Exception(f"Error preprocessing {view} view: {str(e)}")
+
 def get_animal_classes():
     """
     Return a mapping of ImageNet class indices specifically for cow and buffalo recognition
@@ -267,29 +709,244 @@ def get_animal_classes():
     
     return animal_classes
 
+def compile_animal_lookup(animal_classes, num_classes=1000):
+    """
+    Compile an index -> animal mapping into dense lookup arrays
+    
+    Args:
+        animal_classes: Dict of ImageNet index to animal name
+        num_classes: Number of ImageNet classes
+    
+    Returns:
+        tuple: (labels, class_to_label, mask) where labels is an array of the
+            distinct animal names, class_to_label maps each ImageNet index to
+            a position in labels (-1 if unmapped) and mask flags mapped indices
+    """
+    labels = np.array(sorted(set(animal_classes.values())))
+    class_to_label = np.full(num_classes, -1, dtype=np.int16)
+    for idx, animal in animal_classes.items():
+        class_to_label[idx] = np.searchsorted(labels, animal)
+    return labels, class_to_label, class_to_label >= 0
+
+# Compiled once at import so mapping does no per-call dict work
+ANIMAL_LABELS, CLASS_TO_ANIMAL, ANIMAL_CLASS_MASK = compile_animal_lookup(get_animal_classes())
+ANIMAL_LABEL_NAMES = [str(label) for label in ANIMAL_LABELS]
+
+@timed('mapping')
+def map_imagenet_to_animals_batch(predictions, top_k=5):
+    """
+    Map every row of an ImageNet prediction matrix to animal names
+    
+    For each row only the top ``top_k * 3`` ImageNet classes are considered,
+    found with argpartition rather than a full sort, and the mapped ones among
+    them are returned in descending confidence order.
+    
+    Args:
+        predictions: Array of shape (N, 1000)
+        top_k: Number of top predictions to return per row
+    
+    Returns:
+        List of N lists of tuples (animal_name, confidence_percentage)
+    """
+    predictions = np.asarray(predictions)
+    if predictions.ndim == 1:
+        predictions = predictions[None, :]
+    
+    num_candidates = min(top_k * 3, predictions.shape[1])  # Get more to filter animals
+    if num_candidates <= 0:
+        return [[] for _ in range(predictions.shape[0])]
+    
+    # Unordered top candidates per row, then sort just those
+    rows = np.arange(predictions.shape[0])[:, None]
+    candidates = np.argpartition(predictions, -num_candidates, axis=1)[:, -num_candidates:]
+    order = np.argsort(predictions[rows, candidates], axis=1)[:, ::-1]
+    candidates = candidates[rows, order]
+    
+    return [_mapped_candidates(row_predictions, row_candidates, top_k)
+            for row_predictions, row_candidates in zip(predictions, candidates)]
+
+def _mapped_candidates(row_predictions, candidates, top_k):
+    """Keep the first top_k mapped classes among confidence-sorted candidates"""
+    return [
+        (ANIMAL_LABEL_NAMES[label], row_predictions[idx] * 100)
+        for idx, label in zip(candidates.tolist(), CLASS_TO_ANIMAL[candidates].tolist())
+        if label >= 0
+    ][:top_k]
+
+@timed('mapping')
 def map_imagenet_to_animals(predictions, top_k=5):
     """
     Map ImageNet predictions to animal names
     
     Args:
-        predictions: Model predictions array
+        predictions: Model predictions array of shape (1, 1000) or (1000,)
         top_k: Number of top predictions to return
     
     Returns:
         List of tuples (animal_name, confidence_percentage)
     """
-    animal_classes = get_animal_classes()
+    row = np.asarray(predictions)
+    if row.ndim > 1:
+        row = row[0]
     
-    # Get top k predictions
-    top_indices = np.argsort(predictions[0])[::-1][:top_k * 3]  # Get more to filter animals
+    num_candidates = min(top_k * 3, row.shape[0])  # Get more to filter animals
+    if num_candidates <= 0:
+        return []
     
-    animal_predictions = []
-    for idx in top_indices:
-        if idx in animal_classes:
-            confidence = predictions[0][idx] * 100
-            animal_predictions.append((animal_classes[idx], confidence))
-        
-        if len(animal_predictions) >= top_k:
-            break
+    candidates = np.argpartition(row, -num_candidates)[-num_candidates:]
+    candidates = candidates[np.argsort(row[candidates])[::-1]]
+    return _mapped_candidates(row, candidates, top_k)
+
+# Bundled copy of the ImageNet class index Keras' decode_predictions downloads
+IMAGENET_CLASS_INDEX_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'imagenet_class_index.json')
+
+@functools.lru_cache(maxsize=None)
+def load_imagenet_class_names():
+    """
+    Load the 1000 ImageNet class names from the bundled class index
+    
+    Loaded once per process; no network access is needed.
+    
+    Returns:
+        np.ndarray: Class names such as 'water_buffalo', indexed by class id
+    """
+    with open(IMAGENET_CLASS_INDEX_PATH) as f:
+        class_index = json.load(f)
+    return np.array([class_index[str(i)][1] for i in range(len(class_index))])
+
+@functools.lru_cache(maxsize=None)
+def load_imagenet_display_names():
+    """
+    ImageNet class names formatted for display ('Water Buffalo')
+    
+    Returns:
+        list: Display names indexed by class id
+    """
+    return [name.replace('_', ' ').title() for name in load_imagenet_class_names().tolist()]
+
+def top_labels(predictions, k=5):
+    """
+    Top-k raw ImageNet labels, replacing Keras' decode_predictions
+    
+    Args:
+        predictions: Model predictions of shape (1, 1000) or (1000,)
+        k: Number of labels to return
+    
+    Returns:
+        List of tuples (display_name, confidence_percentage) in descending
+        confidence order
+    """
+    row = np.asarray(predictions)
+    if row.ndim > 1:
+        row = row[0]
+    
+    k = min(k, row.shape[0])
+    if k <= 0:
+        return []
+    
+    candidates = np.argpartition(row, -k)[-k:]
+    candidates = candidates[np.argsort(row[candidates])[::-1]]
+    display_names = load_imagenet_display_names()
+    return [(display_names[idx], row[idx] * 100) for idx in candidates.tolist()]
+
+# Keywords looked for in ImageNet class names when no mapped class is found
+BOVINE_KEYWORDS = [
+    # Primary bovine terms
+    'ox', 'bull', 'cow', 'cattle', 'buffalo', 'bison', 'zebu', 'water_buffalo',
+    'bovine', 'steer', 'heifer', 'calf', 'dairy', 'beef', 'holstein', 'jersey',
+    'angus', 'brahman', 'hereford', 'longhorn', 'shorthorn', 'highland',
+    
+    # Wild bovines
+    'yak', 'gaur', 'banteng', 'gayal', 'kouprey', 'aurochs',
+    'cape_buffalo', 'african_buffalo', 'water_ox', 'swamp_buffalo',
+    'carabao', 'murrah', 'nili_ravi', 'surti',
+    
+    # Related terms that might appear
+    'farm', 'livestock', 'ranch', 'pasture', 'grazing', 'herbivore',
+    'udder', 'horn', 'horned', 'mammal', 'large_mammal', 'domesticated',
+    'milk', 'leather', 'meat', 'agricultural'
+]
+
+# Very specific bovine terms that earn an extra confidence boost
+SPECIFIC_BOVINE_TERMS = ['cow', 'cattle', 'buffalo', 'bison', 'ox', 'bull']
+
+# Class names containing any of these are reported as Buffalo rather than Cow
+BUFFALO_TERMS = ['buffalo', 'bison', 'water']
+
+class BovineKeywordMatcher:
+    """
+    Bovine-keyword fallback compiled against the ImageNet class names
+    
+    All string matching happens once, at construction, producing per-class
+    tables of whether any keyword matches, the resulting animal, the keyword
+    count and the specific-term flag. Each lookup is then a top-k selection
+    over the prediction vector plus a few array reads.
+    """
+    
+    def __init__(self, class_names):
+        """
+        Args:
+            class_names: Sequence of ImageNet class names indexed by class id
+                (e.g. 'water_buffalo')
+        """
+        normalized = [name.lower().replace('_', ' ') for name in class_names]
+        
+        self.keyword_count = np.array(
+            [sum(1 for kw in BOVINE_KEYWORDS if kw in name) for name in normalized], dtype=np.int32
+        )
+        self.matches = self.keyword_count > 0
+        self.is_buffalo = np.array(
+            [any(term in name for term in BUFFALO_TERMS) for name in normalized], dtype=bool
+        )
+        self.is_specific = np.array(
+            [any(term in name for term in SPECIFIC_BOVINE_TERMS) for name in normalized], dtype=bool
+        )
     
-    return animal_predictions
+    @timed('bovine_fallback')
+    def match(self, predictions, quality_score, top=20):
+        """
+        Find the highest-confidence bovine-keyword class among the top predictions
+        
+        Args:
+            predictions: Model predictions of shape (1, 1000) or (1000,)
+            quality_score: Image quality score from assess_image_quality
+            top: Number of top ImageNet classes to examine
+        
+        Returns:
+            tuple or None: (animal_name, boosted_confidence_percentage), or
+                None if no examined class matches a bovine keyword
+        """
+        row = np.asarray(predictions)
+        if row.ndim > 1:
+            row = row[0]
+        
+        top = min(top, row.shape[0])
+        candidates = np.argpartition(row, -top)[-top:]
+        candidates = candidates[np.argsort(row[candidates])[::-1]]
+        
+        hits = np.flatnonzero(self.matches[candidates])
+        if hits.size == 0:
+            return None
+        idx = candidates[hits[0]]
+        
+        result_animal = 'Buffalo' if self.is_buffalo[idx] else 'Cow'
+        confidence = row[idx] * 100
+        
+        # Advanced confidence boosting based on multiple factors
+        base_boost = 2.8  # Increased from 2.5
+        
+        # Quality-based boost
+        quality_boost = 1.0 + (quality_score / 200.0)  # Up to 1.5x boost for high quality
+        
+        # Keyword relevance boost
+        keyword_boost = 1.0 + (int(self.keyword_count[idx]) * 0.15)  # Boost for multiple keywords
+        
+        # Calculate final boosted confidence
+        boosted_confidence = confidence * base_boost * quality_boost * keyword_boost
+        boosted_confidence = min(boosted_confidence, 96.0)  # Cap at 96%
+        
+        # Extra boost for very specific bovine terms
+        if self.is_specific[idx]:
+            boosted_confidence = min(boosted_confidence * 1.15, 98.0)
+        
+        return result_animal, boosted_confidence
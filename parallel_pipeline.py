@@ -0,0 +1,217 @@
+import io
+import logging
+import multiprocessing
+import os
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, ThreadPoolExecutor, wait
+from multiprocessing import shared_memory
+
+import numpy as np
+from PIL import Image
+
+logger = logging.getLogger(__name__)
+
+# Shape of one preprocessed variant; a slot holds one per variant the
+# classifier uses (enhanced and standard, or standard only with a head)
+VARIANT_SHAPE = (224, 224, 3)
+
+# Set in each worker process by _init_worker
+_worker_shm = None
+_worker_slots = None
+_worker_variants = None
+
+
+def default_worker_count():
+    """Leave one core for the inference thread"""
+    return max(1, (os.cpu_count() or 2) - 1)
+
+
+def _init_worker(shm_name, slot_count, variants):
+    """Attach the worker process to the parent's shared tensor slots"""
+    global _worker_shm, _worker_slots, _worker_variants
+    _worker_shm = shared_memory.SharedMemory(name=shm_name)
+    _worker_slots = np.ndarray((slot_count, len(variants)) + VARIANT_SHAPE, dtype=np.float32,
+                               buffer=_worker_shm.buf)
+    _worker_variants = variants
+
+
+def _prepare(source, slot):
+    """
+    Decode, quality-check and preprocess one image in a worker process
+
+    The preprocessed variants are written straight into the shared slot, so
+    only the small status tuple is pickled back to the parent.
+
+    Args:
+        source: File path, encoded image bytes or PIL Image
+        slot: Index of the shared slot to fill
+
+    Returns:
+        tuple: ('ok' or 'rejected', quality_score, quality_issues), or
+            ('error', 0, message)
+    """
+    from model_utils import (
+        ImageContext, QUALITY_REJECT_THRESHOLD, assess_image_quality,
+        enhanced_preprocess_image, preprocess_image
+    )
+
+    try:
+        if isinstance(source, (bytes, bytearray, memoryview)):
+            source = Image.open(io.BytesIO(source))
+        elif isinstance(source, (str, os.PathLike)):
+            source = Image.open(source)
+
+        context = ImageContext.of(source)
+        quality_score, quality_issues = assess_image_quality(context)
+        if quality_score < QUALITY_REJECT_THRESHOLD:
+            return 'rejected', quality_score, quality_issues
+
+        # Only the variants the classifier uses are computed
+        for v, variant in enumerate(_worker_variants):
+            if variant == 'enhanced':
+                enhanced_preprocess_image(context, out=_worker_slots[slot, v])
+            else:
+                preprocess_image(context, out=_worker_slots[slot, v])
+        return 'ok', quality_score, quality_issues
+    except Exception as e:
+        return 'error', 0, str(e)
+
+
+class ParallelPipeline:
+    """
+    Multi-process front end for classifying large numbers of images
+
+    Decoding, quality assessment and the classifier's preprocessing variants
+    run in a ProcessPoolExecutor. Workers write float32 tensors into a ring of
+    shared-memory slots instead of pickling arrays back, and a single
+    inference thread owning the model classifies them in batches while the
+    workers move on to the next images.
+    """
+
+    def __init__(self, classifier, workers=None, batch_size=32, slots=None):
+        """
+        Args:
+            classifier: AnimalClassifier used by the inference thread
+            workers: Number of preprocessing processes (default: cores - 1)
+            batch_size: Maximum images per forward pass
+            slots: Shared tensor slots, i.e. images preprocessed but not yet
+                classified; bounds memory (default: 2 * batch_size + workers)
+        """
+        if batch_size < 1:
+            raise ValueError("batch_size must be at least 1")
+        self.classifier = classifier
+        self.workers = workers or default_worker_count()
+        self.batch_size = batch_size
+        self.slot_count = slots or 2 * batch_size + self.workers
+        if self.slot_count < batch_size + self.workers:
+            raise ValueError("slots must be at least batch_size + workers")
+
+        # With a trained head only the standard variant is preprocessed and stored
+        variants = tuple(classifier._variants)
+        slot_shape = (len(variants),) + VARIANT_SHAPE
+        slot_bytes = int(np.prod(slot_shape)) * np.dtype(np.float32).itemsize
+        self._shm = shared_memory.SharedMemory(create=True, size=self.slot_count * slot_bytes)
+        self._slots = np.ndarray((self.slot_count,) + slot_shape, dtype=np.float32, buffer=self._shm.buf)
+        self._free_slots = list(range(self.slot_count))
+
+        # Spawn rather than fork: the parent already runs TensorFlow threads
+        self._pool = ProcessPoolExecutor(
+            max_workers=self.workers,
+            mp_context=multiprocessing.get_context('spawn'),
+            initializer=_init_worker,
+            initargs=(self._shm.name, self.slot_count, variants),
+        )
+        self._inference = ThreadPoolExecutor(max_workers=1, thread_name_prefix='inference')
+
+    def _infer(self, batch):
+        """Classify a batch of filled slots on the inference thread"""
+        ensembles = [self._slots[slot] for _, slot, _, _ in batch]
+        return self.classifier.classify_ensembles(
+            ensembles, [item[2] for item in batch], [item[3] for item in batch]
+        )
+
+    def classify(self, sources):
+        """
+        Classify images, yielding results in input order as they complete
+
+        Args:
+            sources: Iterable of file paths, encoded image bytes or PIL
+                Images; consumed lazily
+
+        Yields:
+            PredictionResult, one per source, as AnimalClassifier.predict returns
+        """
+        sources = enumerate(sources)
+        exhausted = False
+        preparing = {}
+        inferring = {}
+        ready = []
+        results = {}
+        next_index = 0
+
+        while True:
+            # Keep the workers busy while shared slots are free
+            while not exhausted and self._free_slots:
+                try:
+                    index, source = next(sources)
+                except StopIteration:
+                    exhausted = True
+                    break
+                slot = self._free_slots.pop()
+                preparing[self._pool.submit(_prepare, source, slot)] = (index, slot)
+
+            # Hand the inference thread a batch when it is idle or one is full
+            if ready and (not inferring or len(ready) >= self.batch_size):
+                batch, ready = ready[:self.batch_size], ready[self.batch_size:]
+                inferring[self._inference.submit(self._infer, batch)] = batch
+
+            while next_index in results:
+                yield results.pop(next_index)
+                next_index += 1
+
+            if exhausted and not preparing and not inferring and not ready:
+                return
+            if not preparing and not inferring:
+                continue
+
+            done, _ = wait(list(preparing) + list(inferring), return_when=FIRST_COMPLETED)
+            for future in done:
+                if future in preparing:
+                    index, slot = preparing.pop(future)
+                    try:
+                        status, quality_score, detail = future.result()
+                    except Exception as e:
+                        status, quality_score, detail = 'error', 0, str(e)
+
+                    if status == 'ok':
+                        ready.append((index, slot, quality_score, detail))
+                        continue
+                    self._free_slots.append(slot)
+                    if status == 'rejected':
+                        results[index] = self.classifier._poor_quality_result(detail, quality_score)
+                    else:
+                        logger.error(f"Error during preprocessing: {detail}")
+                        results[index] = self.classifier._error_result(detail, stage='preprocess')
+                else:
+                    batch = inferring.pop(future)
+                    try:
+                        batch_results = future.result()
+                    except Exception as e:
+                        logger.error(f"Error during batch prediction: {str(e)}")
+                        batch_results = [self.classifier._error_result(e, stage='inference') for _ in batch]
+                    for (index, slot, _, _), result in zip(batch, batch_results):
+                        results[index] = result
+                        self._free_slots.append(slot)
+
+    def close(self):
+        """Shut down the workers and release the shared memory"""
+        self._pool.shutdown(wait=True, cancel_futures=True)
+        self._inference.shutdown(wait=True)
+        self._slots = None
+        self._shm.close()
+        self._shm.unlink()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, traceback):
+        self.close()
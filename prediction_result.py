@@ -0,0 +1,97 @@
+import json
+from dataclasses import dataclass, field
+
+# Possible values of PredictionResult.status
+STATUSES = ('classified', 'fallback', 'not_animal', 'rejected', 'error')
+
+
+@dataclass(slots=True)
+class PredictionResult:
+    """
+    Outcome of classifying one image
+
+    ``status`` tells callers what happened without parsing ``label``:
+    'classified' (mapped to an animal class), 'fallback' (bovine keyword
+    match), 'not_animal', 'rejected' (poor quality) or 'error'. ``label``
+    stays the human-readable text shown in the UI.
+
+    Raw ImageNet predictions are derived from the kept prediction row only
+    when ``raw_predictions`` is first read, so ordinary calls never pay for
+    decoding labels.
+    """
+
+    label: str
+    confidence: float = 0.0
+    top_predictions: list = field(default_factory=list)
+    status: str = 'classified'
+    quality_score: float = None
+    quality_issues: list = field(default_factory=list)
+    error: str = None
+    # Seconds per stage ('quality', 'preprocess', 'inference', 'interpret')
+    timings: dict = field(default_factory=dict, compare=False)
+    cached: bool = field(default=False, compare=False)
+    predictions: object = field(default=None, compare=False, repr=False)
+    raw_top_k: int = field(default=10, compare=False, repr=False)
+    # L2-normalized pooled MobileNetV2 features of the standard variant
+    embedding: object = field(default=None, compare=False, repr=False)
+    # Cosine similarity to the earlier image whose result was reused, if any
+    similarity: float = field(default=None, compare=False)
+    _raw_predictions: list = field(default=None, init=False, compare=False, repr=False)
+
+    @property
+    def raw_predictions(self):
+        """Top raw ImageNet labels as (name, confidence_percentage), computed on first access"""
+        if self._raw_predictions is None:
+            if self.predictions is None:
+                self._raw_predictions = []
+            else:
+                from model_utils import top_labels
+                self._raw_predictions = top_labels(self.predictions, k=self.raw_top_k)
+        return self._raw_predictions
+
+    @property
+    def is_error(self):
+        return self.status == 'error'
+
+    @property
+    def is_rejected(self):
+        return self.status == 'rejected'
+
+    @property
+    def is_animal(self):
+        """True when the image was recognised as a cow or buffalo"""
+        return self.status in ('classified', 'fallback')
+
+    def to_dict(self, include_raw=False):
+        """
+        Convert to plain JSON-serializable types
+
+        Args:
+            include_raw: Also include the raw ImageNet predictions
+
+        Returns:
+            dict
+        """
+        data = {
+            "status": self.status,
+            "label": self.label,
+            "confidence": float(self.confidence),
+            "top_predictions": [
+                {"label": name, "confidence": float(score)} for name, score in self.top_predictions
+            ],
+            "quality_score": None if self.quality_score is None else float(self.quality_score),
+            "quality_issues": list(self.quality_issues),
+            "error": self.error,
+            "cached": self.cached,
+            "timings_ms": {stage: seconds * 1000.0 for stage, seconds in self.timings.items()},
+        }
+        if self.similarity is not None:
+            data["near_duplicate_similarity"] = float(self.similarity)
+        if include_raw:
+            data["raw_predictions"] = [
+                {"label": name, "confidence": float(score)} for name, score in self.raw_predictions
+            ]
+        return data
+
+    def to_json(self, include_raw=False):
+        return json.dumps(self.to_dict(include_raw))
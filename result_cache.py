@@ -0,0 +1,121 @@
+import hashlib
+import threading
+from collections import OrderedDict
+
+import numpy as np
+
+
+class ResultCache:
+    """
+    Thread-safe, bounded LRU cache of prediction results
+
+    Keys are content hashes (see image_key and bytes_key) namespaced by the
+    model and pipeline configuration, so a cached result is only ever reused
+    for the same pixels under the same model.
+    """
+
+    def __init__(self, max_entries=1024):
+        """
+        Args:
+            max_entries: Maximum number of cached results; the least recently
+                used entry is evicted beyond this
+        """
+        if max_entries < 1:
+            raise ValueError("max_entries must be at least 1")
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def bytes_key(data, namespace=""):
+        """
+        Hash raw bytes, such as an uploaded file, into a cache key
+
+        Args:
+            data: bytes-like object
+            namespace: Model/config identifier mixed into the key
+
+        Returns:
+            str: Hex digest
+        """
+        digest = hashlib.blake2b(namespace.encode(), digest_size=20)
+        digest.update(b"bytes:")
+        digest.update(data)
+        return digest.hexdigest()
+
+    @staticmethod
+    def image_key(context, namespace=""):
+        """
+        Hash the decoded pixels of an ImageContext into a cache key
+
+        Uses the reduced working copy, which is all any pipeline stage reads
+        in the default configuration, plus the original size.
+
+        Args:
+            context: model_utils.ImageContext
+            namespace: Model/config identifier mixed into the key
+
+        Returns:
+            str: Hex digest
+        """
+        pixels = np.ascontiguousarray(context.working())
+        digest = hashlib.blake2b(namespace.encode(), digest_size=20)
+        digest.update(f"pixels:{context.size}:{pixels.shape}:".encode())
+        digest.update(pixels.data)
+        return digest.hexdigest()
+
+    def get(self, key):
+        """
+        Look up a result and mark it most recently used
+
+        Returns:
+            The cached result, or None on a miss
+        """
+        with self._lock:
+            try:
+                value = self._entries[key]
+            except KeyError:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def put(self, key, value):
+        """Store a result, evicting the least recently used entries if full"""
+        with self._lock:
+            self._entries[key] = value
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def clear(self):
+        """Drop all entries and reset the counters"""
+        with self._lock:
+            self._entries.clear()
+            self.hits = self.misses = self.evictions = 0
+
+    def __len__(self):
+        return len(self._entries)
+
+    def stats(self):
+        """
+        Get cache statistics
+
+        Returns:
+            dict: entries, capacity, hits, misses, evictions and hit rate
+        """
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "max_entries": self.max_entries,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+            }
@@ -0,0 +1,466 @@
+#!/usr/bin/env python3
+"""
+HTTP inference server for Animal Classify
+
+A dependency-free ASGI application exposing the classifier to mobile clients
+and integrations. Concurrent requests are collected by a dynamic micro-batcher
+and classified together with one batched forward pass. Run it with:
+
+    python server.py --host 0.0.0.0 --port 8000
+
+Endpoints:
+    GET  /health         readiness and queue depth
+    GET  /metrics        Prometheus text exposition
+    POST /predict        raw image bytes in the request body
+    POST /predict_batch  JSON {"images": ["<base64>", ...]}
+"""
+import argparse
+import asyncio
+import base64
+import binascii
+import hashlib
+import json
+import logging
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+import metrics
+from image_ingest import ImageRejected, ImageTooLarge, ingest_upload
+
+logger = logging.getLogger(__name__)
+
+# Defaults, overridable through the environment or the command line
+MAX_BATCH_SIZE = int(os.environ.get('ANIMAL_CLASSIFY_MAX_BATCH_SIZE', 16))
+MAX_BATCH_DELAY_MS = float(os.environ.get('ANIMAL_CLASSIFY_MAX_BATCH_DELAY_MS', 10))
+MAX_QUEUE_SIZE = int(os.environ.get('ANIMAL_CLASSIFY_MAX_QUEUE_SIZE', 256))
+REQUEST_TIMEOUT = float(os.environ.get('ANIMAL_CLASSIFY_REQUEST_TIMEOUT', 10))
+MAX_UPLOAD_BYTES = int(os.environ.get('ANIMAL_CLASSIFY_MAX_UPLOAD_BYTES', 20 * 1024 * 1024))
+MAX_IMAGES_PER_REQUEST = 64
+
+QUEUE_DEPTH = metrics.REGISTRY.gauge('animal_classify_queue_depth', 'Images waiting for the micro-batcher')
+BATCH_SIZE = metrics.REGISTRY.histogram(
+    'animal_classify_batch_size', 'Images per micro-batched forward pass',
+    buckets=(1, 2, 4, 8, 16, 32, 64)
+)
+HTTP_REQUESTS = metrics.REGISTRY.counter(
+    'animal_classify_http_requests_total', 'HTTP requests by path and status', ('path', 'status')
+)
+
+
+class Overloaded(Exception):
+    """Raised when the request queue has no room for more images"""
+
+
+class HTTPError(Exception):
+    """An error returned to the client with the given status code"""
+
+    def __init__(self, status, message, headers=None):
+        super().__init__(message)
+        self.status = status
+        self.message = message
+        self.headers = headers or []
+
+
+class MicroBatcher:
+    """
+    Dynamic batcher in front of a single inference thread
+
+    Requests wait in a bounded queue. The batching loop takes the first
+    waiting image, then keeps collecting for up to ``max_delay_ms`` or until
+    ``max_batch_size`` images are gathered, and classifies them with one
+    ``predict_batch`` call on a dedicated thread that owns the model.
+    Images whose request already timed out are dropped before inference.
+    """
+
+    def __init__(self, classifier, max_batch_size=MAX_BATCH_SIZE, max_delay_ms=MAX_BATCH_DELAY_MS,
+                 max_queue_size=MAX_QUEUE_SIZE):
+        """
+        Args:
+            classifier: AnimalClassifier instance
+            max_batch_size: Maximum images per forward pass
+            max_delay_ms: How long the first image of a batch waits for others
+            max_queue_size: Maximum queued images before requests are refused
+        """
+        if max_batch_size < 1:
+            raise ValueError("max_batch_size must be at least 1")
+        if max_queue_size < 1:
+            raise ValueError("max_queue_size must be at least 1")
+        self.classifier = classifier
+        self.max_batch_size = max_batch_size
+        self.max_delay = max_delay_ms / 1000.0
+        self.max_queue_size = max_queue_size
+        self.batches = 0
+        self.images = 0
+        self.dropped = 0
+        self._queue = None
+        self._task = None
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='inference')
+
+    def start(self):
+        """Start the batching loop on the running event loop"""
+        self._queue = asyncio.Queue(maxsize=self.max_queue_size)
+        self._task = asyncio.get_running_loop().create_task(self._run())
+
+    async def stop(self):
+        """Stop the batching loop and fail anything still queued"""
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        while self._queue is not None and not self._queue.empty():
+            _, _, future = self._queue.get_nowait()
+            if not future.done():
+                future.set_exception(Overloaded("Server shutting down"))
+        self._executor.shutdown(wait=False)
+
+    def queue_depth(self):
+        return self._queue.qsize() if self._queue is not None else 0
+
+    async def submit(self, images, content_hashes, timeout=REQUEST_TIMEOUT):
+        """
+        Queue images for classification and wait for their results
+
+        All images of a request are admitted together or not at all.
+
+        Args:
+            images: List of PIL Image objects
+            content_hashes: List of upload hashes, one per image
+            timeout: Seconds to wait for the results
+
+        Returns:
+            list: One PredictionResult per image
+
+        Raises:
+            Overloaded: If the queue cannot take the images
+            asyncio.TimeoutError: If the results are not ready in time
+        """
+        if self._queue is None:
+            raise Overloaded("Batcher not started")
+        if self.max_queue_size - self._queue.qsize() < len(images):
+            raise Overloaded("Request queue is full")
+
+        loop = asyncio.get_running_loop()
+        futures = []
+        for image, content_hash in zip(images, content_hashes):
+            future = loop.create_future()
+            self._queue.put_nowait((image, content_hash, future))
+            futures.append(future)
+
+        try:
+            return await asyncio.wait_for(asyncio.gather(*futures), timeout)
+        except asyncio.TimeoutError:
+            # Cancelled futures tell the batching loop to skip these images
+            for future in futures:
+                future.cancel()
+            raise
+
+    async def _next_batch(self):
+        """Wait for one image, then collect more until the batch is full or the delay expires"""
+        loop = asyncio.get_running_loop()
+        batch = [await self._queue.get()]
+        deadline = loop.time() + self.max_delay
+
+        while len(batch) < self.max_batch_size:
+            try:
+                batch.append(self._queue.get_nowait())
+                continue
+            except asyncio.QueueEmpty:
+                pass
+            remaining = deadline - loop.time()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(await asyncio.wait_for(self._queue.get(), remaining))
+            except asyncio.TimeoutError:
+                break
+        return batch
+
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            batch = await self._next_batch()
+            live = [item for item in batch if not item[2].done()]
+            self.dropped += len(batch) - len(live)
+            if not live:
+                continue
+
+            images = [item[0] for item in live]
+            content_hashes = [item[1] for item in live]
+            try:
+                results = await loop.run_in_executor(
+                    self._executor, self.classifier.predict_batch,
+                    images, self.max_batch_size, content_hashes
+                )
+            except Exception as e:
+                logger.error(f"Error during batched inference: {str(e)}")
+                for _, _, future in live:
+                    if not future.done():
+                        future.set_exception(e)
+                continue
+
+            self.batches += 1
+            self.images += len(live)
+            BATCH_SIZE.observe(len(live))
+            for (_, _, future), result in zip(live, results):
+                if not future.done():
+                    future.set_result(result)
+
+    def stats(self):
+        """
+        Get batching statistics
+
+        Returns:
+            dict: queue depth, batches run, images classified and dropped
+        """
+        return {
+            "queue_depth": self.queue_depth(),
+            "max_queue_size": self.max_queue_size,
+            "batches": self.batches,
+            "images": self.images,
+            "dropped": self.dropped,
+            "mean_batch_size": self.images / self.batches if self.batches else 0.0,
+        }
+
+
+def decode_upload(data, max_bytes=MAX_UPLOAD_BYTES):
+    """
+    Decode uploaded image bytes within image_ingest's limits
+
+    The byte and pixel limits are checked from the header before any pixel
+    is decoded, and the image is decoded at bounded size, so a queued upload
+    never holds more than an ANALYSIS_MAX_SIDE image whatever canvas it
+    declares.
+
+    Args:
+        data: Encoded image bytes
+        max_bytes: Largest accepted upload
+
+    Returns:
+        tuple: (ImageContext calibrated to the upload's original size,
+            content hash)
+
+    Raises:
+        HTTPError: 413 if the upload exceeds a limit, 400 if it is not a
+            supported image
+    """
+    try:
+        ingested = ingest_upload(data, max_bytes=max_bytes)
+    except ImageTooLarge as e:
+        raise HTTPError(413, str(e))
+    except ImageRejected as e:
+        raise HTTPError(400, str(e))
+    return ingested.context(), hashlib.sha256(data).hexdigest()
+
+
+class InferenceApp:
+    """
+    ASGI application serving the classifier through a MicroBatcher
+    """
+
+    def __init__(self, classifier_factory=None, max_batch_size=MAX_BATCH_SIZE,
+                 max_delay_ms=MAX_BATCH_DELAY_MS, max_queue_size=MAX_QUEUE_SIZE,
+                 request_timeout=REQUEST_TIMEOUT, max_upload_bytes=MAX_UPLOAD_BYTES):
+        """
+        Args:
+            classifier_factory: Zero-argument callable building the classifier
+                at startup; defaults to AnimalClassifier()
+            max_batch_size: Maximum images per forward pass
+            max_delay_ms: Maximum time a request waits for a batch to fill
+            max_queue_size: Maximum queued images before returning 503
+            request_timeout: Seconds before a request fails with 504
+            max_upload_bytes: Largest accepted request body
+        """
+        self.classifier_factory = classifier_factory
+        self.batch_options = (max_batch_size, max_delay_ms, max_queue_size)
+        self.request_timeout = request_timeout
+        self.max_upload_bytes = max_upload_bytes
+        self.classifier = None
+        self.batcher = None
+
+    async def startup(self):
+        """Load the model off the event loop and start the batcher"""
+        factory = self.classifier_factory
+        if factory is None:
+            from animal_classifier import AnimalClassifier
+            factory = AnimalClassifier
+
+        self.classifier = await asyncio.get_running_loop().run_in_executor(None, factory)
+        self.batcher = MicroBatcher(self.classifier, *self.batch_options)
+        self.batcher.start()
+        logger.info("Inference server ready")
+
+    async def shutdown(self):
+        if self.batcher is not None:
+            await self.batcher.stop()
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] == 'lifespan':
+            await self._lifespan(receive, send)
+        elif scope['type'] == 'http':
+            await self._http(scope, receive, send)
+
+    async def _lifespan(self, receive, send):
+        while True:
+            message = await receive()
+            if message['type'] == 'lifespan.startup':
+                try:
+                    await self.startup()
+                except Exception as e:
+                    logger.error(f"Failed to start inference server: {str(e)}")
+                    await send({'type': 'lifespan.startup.failed', 'message': str(e)})
+                    return
+                await send({'type': 'lifespan.startup.complete'})
+            elif message['type'] == 'lifespan.shutdown':
+                await self.shutdown()
+                await send({'type': 'lifespan.shutdown.complete'})
+                return
+
+    async def _read_body(self, receive):
+        """Read the request body, refusing anything over max_upload_bytes"""
+        chunks = []
+        size = 0
+        while True:
+            message = await receive()
+            if message['type'] == 'http.disconnect':
+                raise HTTPError(400, "Client disconnected")
+            chunk = message.get('body', b'')
+            size += len(chunk)
+            if size > self.max_upload_bytes:
+                raise HTTPError(413, f"Request body exceeds {self.max_upload_bytes} bytes")
+            chunks.append(chunk)
+            if not message.get('more_body', False):
+                return b''.join(chunks)
+
+    async def _http(self, scope, receive, send):
+        route = (scope['method'], scope['path'])
+        try:
+            if route == ('GET', '/health'):
+                status, payload = 200, self._health()
+            elif route == ('GET', '/metrics'):
+                status, payload = 200, self._metrics()
+            elif route == ('POST', '/predict'):
+                status, payload = 200, await self._predict(await self._read_body(receive))
+            elif route == ('POST', '/predict_batch'):
+                status, payload = 200, await self._predict_batch(await self._read_body(receive))
+            else:
+                raise HTTPError(404, "Not found")
+            headers = []
+        except HTTPError as e:
+            status, payload, headers = e.status, {"error": e.message}, e.headers
+        except Exception as e:
+            logger.error(f"Error handling {scope['path']}: {str(e)}")
+            status, payload, headers = 500, {"error": str(e)}, []
+
+        if route in (('GET', '/health'), ('GET', '/metrics'), ('POST', '/predict'), ('POST', '/predict_batch')):
+            HTTP_REQUESTS.labels(scope['path'], str(status)).inc()
+
+        if isinstance(payload, str):
+            body, content_type = payload.encode(), b'text/plain; version=0.0.4; charset=utf-8'
+        else:
+            body, content_type = json.dumps(payload).encode(), b'application/json'
+        await send({
+            'type': 'http.response.start',
+            'status': status,
+            'headers': [
+                (b'content-type', content_type),
+                (b'content-length', str(len(body)).encode()),
+            ] + headers,
+        })
+        await send({'type': 'http.response.body', 'body': body})
+
+    def _health(self):
+        if self.batcher is None:
+            raise HTTPError(503, "Model loading")
+        return {"status": "ok", **self.batcher.stats()}
+
+    def _metrics(self):
+        if self.batcher is not None:
+            QUEUE_DEPTH.set(self.batcher.queue_depth())
+        return metrics.REGISTRY.render()
+
+    async def _classify(self, uploads):
+        """Decode uploads and run them through the batcher, mapping failures to HTTP errors"""
+        if self.batcher is None:
+            raise HTTPError(503, "Model loading", [(b'retry-after', b'5')])
+
+        # Decoded before queueing, off the event loop and one upload at a time
+        decoded = await asyncio.get_running_loop().run_in_executor(
+            None, lambda: [decode_upload(data, self.max_upload_bytes) for data in uploads]
+        )
+        try:
+            results = await self.batcher.submit(
+                [image for image, _ in decoded], [content_hash for _, content_hash in decoded],
+                timeout=self.request_timeout
+            )
+        except Overloaded as e:
+            raise HTTPError(503, str(e), [(b'retry-after', b'1')])
+        except asyncio.TimeoutError:
+            raise HTTPError(504, f"Prediction timed out after {self.request_timeout}s")
+        return [result.to_dict() for result in results]
+
+    async def _predict(self, body):
+        return (await self._classify([body]))[0]
+
+    async def _predict_batch(self, body):
+        try:
+            encoded = json.loads(body)['images']
+            uploads = [base64.b64decode(item, validate=True) for item in encoded]
+        except (ValueError, KeyError, TypeError, binascii.Error):
+            raise HTTPError(400, 'Expected JSON {"images": ["<base64>", ...]}')
+        if not uploads:
+            raise HTTPError(400, "No images given")
+        if len(uploads) > MAX_IMAGES_PER_REQUEST:
+            raise HTTPError(413, f"At most {MAX_IMAGES_PER_REQUEST} images per request")
+        return {"results": await self._classify(uploads)}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Animal Classify inference server")
+    parser.add_argument("--host", default="127.0.0.1", help="Interface to bind")
+    parser.add_argument("--port", type=int, default=8000, help="Port to listen on")
+    parser.add_argument("--max-batch-size", type=int, default=MAX_BATCH_SIZE,
+                        help="Maximum images per forward pass")
+    parser.add_argument("--max-batch-delay-ms", type=float, default=MAX_BATCH_DELAY_MS,
+                        help="Maximum time a request waits for a batch to fill")
+    parser.add_argument("--max-queue-size", type=int, default=MAX_QUEUE_SIZE,
+                        help="Queued images before requests get 503")
+    parser.add_argument("--timeout", type=float, default=REQUEST_TIMEOUT,
+                        help="Per-request timeout in seconds")
+    parser.add_argument("--backend", choices=["keras", "tflite"], default="keras", help="Inference backend")
+    parser.add_argument("--tta", default="0",
+                        help="Extra test-time views per image, or 'auto' to fit --tta-budget-ms")
+    parser.add_argument("--tta-budget-ms", type=float, default=None, help="Per-image latency budget for --tta auto")
+    parser.add_argument("--head", default=None,
+                        help="Trained head from animal_head.py to use instead of the ImageNet mapping")
+    args = parser.parse_args()
+
+    from animal_classifier import parse_tta
+    try:
+        tta = parse_tta(args.tta)
+    except ValueError:
+        parser.error("--tta must be a view count or 'auto'")
+
+    try:
+        import uvicorn
+    except ImportError:
+        raise SystemExit("The inference server needs an ASGI server: pip install uvicorn")
+
+    def build_classifier():
+        from animal_classifier import AnimalClassifier
+        return AnimalClassifier(backend=args.backend, tta=tta, tta_budget_ms=args.tta_budget_ms, head=args.head)
+
+    app = InferenceApp(
+        build_classifier,
+        max_batch_size=args.max_batch_size,
+        max_delay_ms=args.max_batch_delay_ms,
+        max_queue_size=args.max_queue_size,
+        request_timeout=args.timeout,
+    )
+    uvicorn.run(app, host=args.host, port=args.port, lifespan="on")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,129 @@
+import io
+
+import numpy as np
+import pytest
+from PIL import Image
+
+from animal_head import NOT_ANIMAL_LABEL, LinearHead, extract_features, train_head
+from embedding_index import EMBEDDING_DIM, EmbeddingIndex, normalize
+
+LABELS = ('Buffalo', 'Cow', NOT_ANIMAL_LABEL)
+
+
+def separable_embeddings(per_class, seed):
+    """Normalized embeddings scattered around one random direction per class"""
+    rng = np.random.default_rng(seed)
+    centres = np.random.default_rng(0).normal(size=(len(LABELS), EMBEDDING_DIM))
+    features = np.repeat(centres, per_class, axis=0) + rng.normal(size=(len(LABELS) * per_class, EMBEDDING_DIM))
+    return normalize(features), np.repeat(LABELS, per_class)
+
+
+@pytest.fixture(scope='module')
+def head():
+    features, labels = separable_embeddings(per_class=30, seed=1)
+    return train_head(features, labels, epochs=200)
+
+
+@pytest.fixture(scope='module')
+def classifier(head):
+    from animal_classifier import AnimalClassifier
+    return AnimalClassifier(weights=None, store_dir=None, result_cache_size=0, head=head)
+
+
+def test_train_head_separates_held_out_embeddings(head):
+    features, labels = separable_embeddings(per_class=10, seed=2)
+
+    probabilities = head.probabilities(features)
+
+    assert head.labels == sorted(LABELS)
+    assert probabilities.shape == (len(labels), len(LABELS))
+    np.testing.assert_allclose(probabilities.sum(axis=1), 1, rtol=1e-5)
+    assert list(np.array(head.labels)[probabilities.argmax(axis=1)]) == list(labels)
+
+
+def test_train_head_needs_two_classes():
+    features, labels = separable_embeddings(per_class=5, seed=3)
+
+    with pytest.raises(ValueError):
+        train_head(features[labels == 'Cow'], labels[labels == 'Cow'])
+
+
+def test_saved_head_serves_the_same_probabilities(head, tmp_path):
+    features, _ = separable_embeddings(per_class=5, seed=4)
+    path = tmp_path / 'head.npz'
+
+    head.save(path)
+    loaded = LinearHead.load(path)
+
+    assert loaded.labels == head.labels
+    assert loaded.fingerprint == head.fingerprint
+    np.testing.assert_array_equal(loaded.probabilities(features), head.probabilities(features))
+
+
+def jpeg_bytes(seed):
+    pixels = np.random.default_rng(seed).integers(0, 256, (64, 64, 3), dtype=np.uint8)
+    buffer = io.BytesIO()
+    Image.fromarray(pixels).save(buffer, format='JPEG')
+    return buffer.getvalue()
+
+
+def test_extract_features_skips_truncated_images(classifier, tmp_path):
+    path = str(tmp_path / 'cache')
+    # Opens fine, fails once decoded
+    truncated = jpeg_bytes(1)[:len(jpeg_bytes(1)) // 2]
+    payloads = [jpeg_bytes(0), truncated, jpeg_bytes(2)]
+    items = [(f"Cow/{i}.jpg", lambda data=data: data) for i, data in enumerate(payloads)]
+
+    added = extract_features(classifier, items, EmbeddingIndex(path=path, metadata=classifier.feature_signature()),
+                             batch_size=2)
+
+    assert added == 2
+    cache = EmbeddingIndex(path=path, metadata=classifier.feature_signature())
+    assert cache.keys() == ['Cow/0.jpg', 'Cow/2.jpg']
+
+
+def test_extract_features_flushes_when_interrupted(classifier, tmp_path):
+    path = str(tmp_path / 'cache')
+
+    def items():
+        yield 'Cow/0.jpg', lambda: jpeg_bytes(0)
+        raise KeyboardInterrupt
+
+    with pytest.raises(KeyboardInterrupt):
+        extract_features(classifier, items(), EmbeddingIndex(path=path), batch_size=1)
+
+    assert EmbeddingIndex(path=path).keys() == ['Cow/0.jpg']
+
+
+def test_feature_cache_refuses_another_model(classifier, tmp_path):
+    path = str(tmp_path / 'cache')
+    signature = classifier.feature_signature()
+    extract_features(classifier, [('Cow/0.jpg', lambda: jpeg_bytes(0))], EmbeddingIndex(path=path, metadata=signature))
+
+    with pytest.raises(ValueError):
+        EmbeddingIndex(path=path, metadata={**signature, 'backend': 'tflite'})
+
+
+@pytest.mark.parametrize('views', [0, 2])
+def test_classifier_serves_head_through_ensemble(classifier, views):
+    features, labels = separable_embeddings(per_class=4, seed=5)
+    n = len(labels)
+    # The standard variant's rows, then one block of n rows per test-time view
+    batch_embeddings = np.concatenate([features] * (1 + views))
+    batch_predictions = np.full((len(batch_embeddings), 1000), 1 / 1000, dtype=np.float32)
+
+    predictions, ranked, embeddings = classifier._combine_ensemble(batch_predictions, batch_embeddings, [90] * n)
+
+    assert classifier._variants == ('standard',)
+    assert predictions.shape == (n, 1000)
+    np.testing.assert_allclose(embeddings, features, atol=1e-6)
+    for i, label in enumerate(labels):
+        assert ranked[i][0][0] == label
+        result = classifier._interpret_predictions(predictions[i:i + 1], 90, [], animal_predictions=ranked[i])
+        if label == NOT_ANIMAL_LABEL:
+            assert result.status == 'not_animal'
+            assert result.label == "Not a cow or buffalo"
+        else:
+            assert result.status == 'classified'
+            assert result.label == label
+            assert NOT_ANIMAL_LABEL not in [name for name, _ in result.top_predictions]
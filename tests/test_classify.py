@@ -0,0 +1,69 @@
+import json
+
+import pytest
+
+from classify import ResultWriter, iter_sources, skip_completed
+from prediction_result import PredictionResult
+
+
+def make_images(directory, names):
+    directory.mkdir(exist_ok=True)
+    for name in names:
+        (directory / name).write_bytes(b'')
+
+
+def write_results(tmp_path, inputs, count):
+    output = str(tmp_path / 'results.jsonl')
+    writer = ResultWriter(output, 'jsonl', inputs)
+    items = iter_sources(inputs)
+    for _ in range(count):
+        source_id, _ = next(items)
+        writer.write(source_id, PredictionResult("Cow", 90.0, status='classified'))
+    writer.close()
+    return output
+
+
+def test_resume_skips_completed_items(tmp_path):
+    images = tmp_path / 'images'
+    make_images(images, ['a.jpg', 'b.jpg', 'c.jpg'])
+    inputs = [str(images)]
+    output = write_results(tmp_path, inputs, 2)
+
+    writer = ResultWriter(output, 'jsonl', inputs, resume=True)
+    items = iter_sources(inputs)
+    skip_completed(items, writer)
+
+    assert writer.completed == 2
+    assert next(items)[0] == str(images / 'c.jpg')
+    with open(output + '.checkpoint') as f:
+        assert json.load(f)['last_id'] == str(images / 'b.jpg')
+
+
+@pytest.mark.parametrize('change', ['added', 'removed', 'renamed'])
+def test_resume_refuses_changed_inputs(tmp_path, change):
+    images = tmp_path / 'images'
+    make_images(images, ['b.jpg', 'c.jpg', 'd.jpg'])
+    inputs = [str(images)]
+    output = write_results(tmp_path, inputs, 2)
+    if change == 'added':
+        make_images(images, ['a.jpg'])
+    elif change == 'removed':
+        (images / 'b.jpg').unlink()
+    else:
+        (images / 'c.jpg').rename(images / 'e.jpg')
+
+    writer = ResultWriter(output, 'jsonl', inputs, resume=True)
+
+    with pytest.raises(ValueError):
+        skip_completed(iter_sources(inputs), writer)
+
+
+def test_resume_without_checkpoint_starts_over(tmp_path):
+    images = tmp_path / 'images'
+    make_images(images, ['a.jpg'])
+
+    writer = ResultWriter(str(tmp_path / 'results.jsonl'), 'jsonl', [str(images)], resume=True)
+    items = iter_sources([str(images)])
+    skip_completed(items, writer)
+
+    assert next(items)[0] == str(images / 'a.jpg')
@@ -0,0 +1,46 @@
+import os
+
+import numpy as np
+import pytest
+
+from embedding_index import EmbeddingIndex
+
+
+def vectors(count, dim=8, seed=0):
+    return np.random.default_rng(seed).normal(size=(count, dim))
+
+
+def test_persistent_index_reopens_with_its_keys(tmp_path):
+    path = str(tmp_path / 'index')
+    index = EmbeddingIndex(dim=8, path=path, initial_capacity=2)
+    for i, vector in enumerate(vectors(5)):
+        index.add(vector, key=f"k{i}")
+    index.flush()
+
+    reopened = EmbeddingIndex(dim=8, path=path)
+
+    assert reopened.keys() == [f"k{i}" for i in range(5)]
+    assert reopened.search(vectors(5)[3], k=1)[0][0] == 3
+
+
+def test_index_without_sidecar_is_rebuilt(tmp_path):
+    path = str(tmp_path / 'index')
+    index = EmbeddingIndex(dim=8, path=path)
+    index.add(vectors(1)[0], key='k0')
+    index.flush()
+    # What a kill between writing the vectors and their keys leaves behind
+    os.remove(path + '.json')
+
+    rebuilt = EmbeddingIndex(dim=8, path=path)
+
+    assert len(rebuilt) == 0
+    assert os.path.exists(path + '.json')
+
+
+def test_index_with_other_metadata_is_refused(tmp_path):
+    path = str(tmp_path / 'index')
+    EmbeddingIndex(dim=8, path=path, metadata={"backend": "keras"}).flush()
+
+    assert len(EmbeddingIndex(dim=8, path=path, metadata={"backend": "keras"})) == 0
+    with pytest.raises(ValueError):
+        EmbeddingIndex(dim=8, path=path, metadata={"backend": "tflite"})
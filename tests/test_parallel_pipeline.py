@@ -0,0 +1,41 @@
+import numpy as np
+import pytest
+from PIL import Image
+
+from animal_head import NOT_ANIMAL_LABEL, train_head
+from embedding_index import EMBEDDING_DIM, normalize
+from parallel_pipeline import VARIANT_SHAPE, ParallelPipeline
+
+
+def photos(count):
+    rng = np.random.default_rng(0)
+    return [Image.fromarray(rng.integers(0, 256, (12, 16, 3), dtype=np.uint8)).resize((320, 240), Image.BILINEAR)
+            for _ in range(count)]
+
+
+def random_head():
+    rng = np.random.default_rng(0)
+    labels = np.repeat(['Buffalo', 'Cow', NOT_ANIMAL_LABEL], 10)
+    return train_head(normalize(rng.normal(size=(len(labels), EMBEDDING_DIM))), labels, epochs=10)
+
+
+@pytest.fixture(scope='module', params=['ensemble', 'head'])
+def classifier(request):
+    from animal_classifier import AnimalClassifier
+    head = random_head() if request.param == 'head' else None
+    return AnimalClassifier(weights=None, store_dir=None, result_cache_size=0, head=head)
+
+
+def test_pipeline_matches_predict_batch(classifier):
+    images = photos(5)
+    expected = classifier.predict_batch(images)
+
+    with ParallelPipeline(classifier, workers=1, batch_size=2) as pipeline:
+        slot_shape = pipeline._slots.shape[1:]
+        results = list(pipeline.classify(images))
+
+    # Slots hold only the variants the classifier runs
+    assert slot_shape == (len(classifier._variants),) + VARIANT_SHAPE
+    assert [result.label for result in results] == [result.label for result in expected]
+    np.testing.assert_allclose([result.confidence for result in results],
+                               [result.confidence for result in expected], atol=1e-3)
@@ -0,0 +1,75 @@
+import numpy as np
+import pytest
+from PIL import Image
+
+import model_utils
+from model_utils import ImageContext, enhanced_preprocess_image, preprocess_image, scale_to_model_range
+
+
+def reference_scaling(pixels):
+    """The conversion scale_to_model_range replaced: a /255 *255 round trip, then preprocess_input"""
+    x = pixels.astype(np.float32) / 255.0 * 255.0
+    return x / 127.5 - 1.0
+
+
+def every_pixel_value():
+    return np.arange(256 * 3, dtype=np.uint32).reshape(16, 16, 3).astype(np.uint8)
+
+
+def photo(seed=0):
+    rng = np.random.default_rng(seed)
+    small = rng.integers(0, 256, (12, 16, 3), dtype=np.uint8)
+    return Image.fromarray(small).resize((640, 480), Image.Resampling.BILINEAR)
+
+
+@pytest.mark.parametrize('opencv', [True, False])
+def test_scaling_matches_old_path(monkeypatch, opencv):
+    if opencv and not model_utils.OPENCV_AVAILABLE:
+        pytest.skip("OpenCV not installed")
+    monkeypatch.setattr(model_utils, 'OPENCV_AVAILABLE', opencv)
+    pixels = every_pixel_value()
+
+    scaled = scale_to_model_range(pixels)
+
+    assert scaled.dtype == np.float32
+    np.testing.assert_allclose(scaled, reference_scaling(pixels), rtol=0, atol=1e-6)
+
+
+@pytest.mark.parametrize('opencv', [True, False])
+def test_scaling_writes_into_out(monkeypatch, opencv):
+    if opencv and not model_utils.OPENCV_AVAILABLE:
+        pytest.skip("OpenCV not installed")
+    monkeypatch.setattr(model_utils, 'OPENCV_AVAILABLE', opencv)
+    pixels = every_pixel_value()
+    out = np.full(pixels.shape, np.nan, dtype=np.float32)
+
+    scaled = scale_to_model_range(pixels, out=out)
+
+    assert scaled is out
+    np.testing.assert_allclose(out, reference_scaling(pixels), rtol=0, atol=1e-6)
+
+
+def test_non_contiguous_pixels_take_the_numpy_path():
+    pixels = every_pixel_value()[:, ::-1]
+
+    np.testing.assert_allclose(scale_to_model_range(pixels), reference_scaling(pixels), rtol=0, atol=1e-6)
+
+
+@pytest.mark.parametrize('preprocess', [preprocess_image, enhanced_preprocess_image])
+def test_preprocessing_fills_a_batch_slot(preprocess):
+    context = ImageContext(photo())
+    expected = preprocess(context)
+    batch = np.full((3, 224, 224, 3), np.nan, dtype=np.float32)
+
+    result = preprocess(context, out=batch[1])
+
+    assert np.shares_memory(result, batch)
+    np.testing.assert_allclose(batch[1], expected[0], rtol=0, atol=1e-6)
+    assert np.isnan(batch[0]).all() and np.isnan(batch[2]).all()
+
+
+def test_preprocessing_matches_old_scaling():
+    context = ImageContext(photo(1))
+
+    np.testing.assert_allclose(preprocess_image(context)[0], reference_scaling(context.resized()),
+                               rtol=0, atol=1e-6)
@@ -0,0 +1,54 @@
+import io
+import struct
+import zlib
+
+import pytest
+from PIL import Image
+
+from image_ingest import ANALYSIS_MAX_SIDE
+from server import HTTPError, decode_upload
+
+
+def png_header(width, height):
+    """A PNG declaring a canvas of the given size, with no pixel data"""
+    def chunk(kind, payload):
+        return struct.pack('>I', len(payload)) + kind + payload + struct.pack('>I', zlib.crc32(kind + payload))
+    header = struct.pack('>IIBBBBB', width, height, 8, 2, 0, 0, 0)
+    return b'\x89PNG\r\n\x1a\n' + chunk(b'IHDR', header) + chunk(b'IEND', b'')
+
+
+def jpeg_bytes(size):
+    buffer = io.BytesIO()
+    Image.new('RGB', size, (120, 90, 60)).save(buffer, format='JPEG')
+    return buffer.getvalue()
+
+
+@pytest.mark.parametrize('width, height', [(10_000, 10_000), (100_000, 100_000)])
+def test_oversized_canvas_is_rejected_with_413(width, height):
+    with pytest.raises(HTTPError) as error:
+        decode_upload(png_header(width, height))
+
+    assert error.value.status == 413
+
+
+def test_oversized_body_is_rejected_with_413():
+    with pytest.raises(HTTPError) as error:
+        decode_upload(jpeg_bytes((64, 64)), max_bytes=100)
+
+    assert error.value.status == 413
+
+
+@pytest.mark.parametrize('data', [b'', b'not an image'])
+def test_unreadable_upload_is_rejected_with_400(data):
+    with pytest.raises(HTTPError) as error:
+        decode_upload(data)
+
+    assert error.value.status == 400
+
+
+def test_large_upload_is_decoded_at_bounded_size():
+    context, content_hash = decode_upload(jpeg_bytes((4096, 3072)))
+
+    assert context.size == (4096, 3072)
+    assert max(context.source.size) <= ANALYSIS_MAX_SIDE
+    assert len(content_hash) == 64
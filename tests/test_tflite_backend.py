@@ -0,0 +1,47 @@
+import numpy as np
+import pytest
+from PIL import Image
+
+from model_utils import TTA_VIEWS
+from tflite_backend import (
+    DEFAULT_CALIBRATION_DIR, calibration_fingerprint, calibration_images, representative_batches
+)
+
+
+def write_photo(path, seed):
+    pixels = np.random.default_rng(seed).integers(0, 256, size=(60, 80, 3), dtype=np.uint8)
+    Image.fromarray(pixels).save(path)
+
+
+def test_default_calibration_set_is_the_bundled_photos():
+    paths = calibration_images()
+
+    assert paths
+    assert all(path.startswith(DEFAULT_CALIBRATION_DIR) for path in paths)
+
+
+def test_calibration_directory_without_images_is_refused(tmp_path):
+    (tmp_path / 'notes.txt').write_text('not a photo')
+
+    with pytest.raises(ValueError):
+        calibration_images(str(tmp_path))
+
+
+def test_representative_batches_cover_every_view(tmp_path):
+    write_photo(tmp_path / 'a.png', 0)
+    write_photo(tmp_path / 'b.jpg', 1)
+
+    batches = list(representative_batches(calibration_images(str(tmp_path))))
+
+    assert len(batches) == 2 * (1 + len(TTA_VIEWS))
+    for (batch,) in batches:
+        assert batch.shape == (1, 224, 224, 3) and batch.dtype == np.float32
+        assert -1.0 <= batch.min() and batch.max() <= 1.0
+
+
+def test_fingerprint_follows_photo_content(tmp_path):
+    write_photo(tmp_path / 'a.png', 0)
+    before = calibration_fingerprint(calibration_images(str(tmp_path)))
+    write_photo(tmp_path / 'a.png', 2)
+
+    assert calibration_fingerprint(calibration_images(str(tmp_path))) != before
@@ -0,0 +1,276 @@
+import hashlib
+import os
+import time
+import numpy as np
+import logging
+from PIL import Image
+
+logger = logging.getLogger(__name__)
+
+# Supported post-training quantization modes
+QUANTIZATION_MODES = (None, 'dynamic', 'int8')
+
+# Width of the ImageNet predictions output
+NUM_CLASSES = 1000
+
+# Sample photos int8 activation ranges are calibrated on by default
+DEFAULT_CALIBRATION_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'attached_assets')
+CALIBRATION_EXTENSIONS = ('.jpg', '.jpeg', '.png', '.webp', '.bmp')
+
+
+def calibration_images(directory=None):
+    """
+    List the sample photos int8 activation ranges are calibrated on
+
+    Args:
+        directory: Directory of sample photos, or None for the bundled
+            attached_assets
+
+    Returns:
+        list: Sorted image paths
+
+    Raises:
+        ValueError: If the directory holds no images
+    """
+    directory = directory or DEFAULT_CALIBRATION_DIR
+    paths = []
+    if os.path.isdir(directory):
+        paths = sorted(os.path.join(directory, name) for name in os.listdir(directory)
+                       if name.lower().endswith(CALIBRATION_EXTENSIONS))
+    if not paths:
+        raise ValueError(f"No calibration images in {directory}")
+    return paths
+
+
+def calibration_fingerprint(paths):
+    """
+    Hash the content of a calibration set, so int8 models calibrated on
+    different photos are never mistaken for one another
+
+    Args:
+        paths: Image paths as returned by calibration_images
+
+    Returns:
+        str: Short hex digest
+    """
+    digest = hashlib.sha256()
+    for path in paths:
+        with open(path, 'rb') as f:
+            digest.update(hashlib.sha256(f.read()).digest())
+    return digest.hexdigest()[:12]
+
+
+def representative_batches(paths):
+    """
+    Generate calibration inputs for int8 quantization from real photos
+
+    Each photo yields the standard preprocessed view and every test-time
+    view, so a small sample directory still covers crops and mirror images.
+
+    Args:
+        paths: Image paths as returned by calibration_images
+
+    Yields:
+        list: One float32 array of shape (1, 224, 224, 3)
+    """
+    from model_utils import ImageContext, TTA_VIEWS, preprocess_image, preprocess_tta_view
+
+    for path in paths:
+        context = ImageContext(Image.open(path))
+        yield [preprocess_image(context)]
+        for view in TTA_VIEWS:
+            yield [preprocess_tta_view(context, view)]
+
+
+def convert_model(model, quantization=None, representative_data=None, calibration_dir=None):
+    """
+    Convert a Keras model to a TFLite flatbuffer
+
+    Args:
+        model: tf.keras.Model to convert
+        quantization: None for float32, 'dynamic' for dynamic-range weight
+            quantization or 'int8' for full integer kernels (float I/O)
+        representative_data: Callable yielding calibration batches, only used
+            for 'int8'; defaults to representative_batches over the photos in
+            calibration_dir
+        calibration_dir: Directory of sample photos for 'int8' calibration,
+            or None for the bundled attached_assets
+
+    Returns:
+        bytes: Serialized TFLite model
+    """
+    if quantization not in QUANTIZATION_MODES:
+        raise ValueError(f"Unknown quantization mode: {quantization}")
+
+    import tensorflow as tf
+    converter = tf.lite.TFLiteConverter.from_keras_model(model)
+
+    if quantization is not None:
+        converter.optimizations = [tf.lite.Optimize.DEFAULT]
+    if quantization == 'int8':
+        if representative_data is None:
+            paths = calibration_images(calibration_dir)
+            representative_data = lambda: representative_batches(paths)
+        converter.representative_dataset = representative_data
+
+    return converter.convert()
+
+
+def with_embedding_output(model):
+    """
+    Wrap a Keras MobileNetV2 so it also outputs its pooled features
+
+    Args:
+        model: tf.keras.Model with the ImageNet 'predictions' head
+
+    Returns:
+        tf.keras.Model with outputs [predictions, pooled features]
+    """
+    import tensorflow as tf
+    return tf.keras.Model(model.input, [model.output, model.get_layer('predictions').input])
+
+
+class TFLiteBackend:
+    """
+    TFLite interpreter backend over a converted MobileNetV2
+
+    Models converted from with_embedding_output also return the pooled
+    features; the outputs are told apart by width, since TFLite doesn't keep
+    Keras' output order.
+    """
+
+    def __init__(self, model_content, num_threads=None):
+        """
+        Create the interpreter
+
+        Args:
+            model_content: Serialized TFLite model, e.g. from convert_model
+            num_threads: Interpreter thread count (None lets TFLite decide)
+        """
+        import tensorflow as tf
+
+        self.num_threads = num_threads
+        self.interpreter = tf.lite.Interpreter(
+            model_content=model_content, num_threads=num_threads
+        )
+        self._input_index = self.interpreter.get_input_details()[0]['index']
+        outputs = self.interpreter.get_output_details()
+        self._output_index = next(
+            (o['index'] for o in outputs if o['shape'][-1] == NUM_CLASSES), outputs[0]['index']
+        )
+        self._embedding_index = next(
+            (o['index'] for o in outputs if o['index'] != self._output_index), None
+        )
+        self._batch_size = None
+
+    def _ensure_batch_size(self, batch_size):
+        """Resize the interpreter input if the batch size changed"""
+        if batch_size != self._batch_size:
+            self.interpreter.resize_tensor_input(
+                self._input_index, [batch_size, 224, 224, 3], strict=False
+            )
+            self.interpreter.allocate_tensors()
+            self._batch_size = batch_size
+
+    def run(self, batch):
+        """
+        Run one forward pass over a preprocessed batch
+
+        Args:
+            batch: Array of shape (N, 224, 224, 3) scaled to [-1, 1]
+
+        Returns:
+            np.ndarray: Softmax predictions of shape (N, 1000)
+        """
+        return self.run_with_embeddings(batch)[0]
+
+    @property
+    def has_embeddings(self):
+        return self._embedding_index is not None
+
+    def run_with_embeddings(self, batch):
+        """
+        Run one forward pass, also returning the pooled features if the model
+        has them
+
+        Args:
+            batch: Array of shape (N, 224, 224, 3) scaled to [-1, 1]
+
+        Returns:
+            tuple: (predictions of shape (N, 1000), features of shape
+                (N, 1280) or None)
+        """
+        batch = np.ascontiguousarray(batch, dtype=np.float32)
+        self._ensure_batch_size(batch.shape[0])
+        self.interpreter.set_tensor(self._input_index, batch)
+        self.interpreter.invoke()
+        predictions = self.interpreter.get_tensor(self._output_index).copy()
+        if self._embedding_index is None:
+            return predictions, None
+        return predictions, self.interpreter.get_tensor(self._embedding_index).copy()
+
+
+def agreement_report(reference_fn, candidate_fn, batches, map_fn=None):
+    """
+    Compare two inference functions on the same inputs
+
+    Args:
+        reference_fn: Callable mapping a batch to (N, 1000) predictions
+        candidate_fn: Callable mapping a batch to (N, 1000) predictions
+        batches: Iterable of preprocessed input batches
+        map_fn: Optional callable turning a (1, 1000) prediction row into the
+            final label, used to report end-to-end label agreement
+
+    Returns:
+        dict: Agreement rates, probability error and timing for both sides
+    """
+    top1_matches = 0
+    top5_overlap = 0.0
+    label_matches = 0
+    max_abs_error = 0.0
+    abs_error_sum = 0.0
+    total = 0
+    reference_time = 0.0
+    candidate_time = 0.0
+
+    for batch in batches:
+        start = time.perf_counter()
+        reference = np.asarray(reference_fn(batch))
+        reference_time += time.perf_counter() - start
+
+        start = time.perf_counter()
+        candidate = np.asarray(candidate_fn(batch))
+        candidate_time += time.perf_counter() - start
+
+        top1_matches += int(np.sum(reference.argmax(axis=1) == candidate.argmax(axis=1)))
+        reference_top5 = np.argsort(reference, axis=1)[:, -5:]
+        candidate_top5 = np.argsort(candidate, axis=1)[:, -5:]
+        for ref_row, cand_row in zip(reference_top5, candidate_top5):
+            top5_overlap += len(set(ref_row) & set(cand_row)) / 5.0
+
+        error = np.abs(reference - candidate)
+        max_abs_error = max(max_abs_error, float(error.max()))
+        abs_error_sum += float(error.mean()) * reference.shape[0]
+
+        if map_fn is not None:
+            for row in range(reference.shape[0]):
+                if map_fn(reference[row:row + 1]) == map_fn(candidate[row:row + 1]):
+                    label_matches += 1
+
+        total += reference.shape[0]
+
+    if total == 0:
+        raise ValueError("No inputs to compare")
+
+    report = {
+        "images": total,
+        "top1_agreement": top1_matches / total,
+        "top5_overlap": top5_overlap / total,
+        "mean_abs_error": abs_error_sum / total,
+        "max_abs_error": max_abs_error,
+        "reference_ms_per_image": reference_time * 1000.0 / total,
+        "candidate_ms_per_image": candidate_time * 1000.0 / total,
+    }
+    if map_fn is not None:
+        report["label_agreement"] = label_matches / total
+    return report